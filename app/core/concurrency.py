@@ -0,0 +1,83 @@
+# executors + per-route limits for async handlers: CPU work off the event loop, 429 when saturated
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable
+
+from fastapi import HTTPException
+
+from app.core.config import CPU_WORKERS
+
+# Dedicated pool for embedding + FAISS so it doesn't compete with Starlette's default threadpool
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+
+async def run_cpu(fn, *args, **kwargs):
+    """Run a blocking CPU-bound call on the dedicated executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, functools.partial(fn, *args, **kwargs))
+
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight requests for a route. Up to max_waiting more callers queue for a slot;
+    anyone beyond that gets 429 immediately instead of piling onto the event loop.
+    """
+    def __init__(self, name: str, max_concurrent: int, max_waiting: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+        self._in_flight = 0
+        self._rejected = 0
+
+    async def acquire(self):
+        """Wait for a slot, or raise 429 if max_waiting callers are already queued."""
+        if self._semaphore.locked() and self._waiting >= self.max_waiting:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many concurrent {self.name} requests, retry shortly.",
+                headers={"Retry-After": "1"}
+            )
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+
+    def release(self):
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    async def hold(self) -> Callable[[], None]:
+        """
+        acquire() and return a release callback that only releases once, for a slot handed from
+        the handler to a streaming body (released by the body when done, or by the response if it never ran).
+        """
+        await self.acquire()
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+        return release
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "rejected": self._rejected,
+        }
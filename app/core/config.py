@@ -4,6 +4,13 @@ import os
 LLM_MODEL_TYPE = "Together"
 LLM_MODEL_NAME = "meta-llama/Llama-3.3-70B-Instruct-Turbo"
 
+# === Corpus enhancement (app/llm/standardizer) ===
+# all worker threads share one token bucket; set these to the provider's real quota
+CORPUS_LLM_REQUESTS_PER_S = float(os.getenv("CORPUS_LLM_REQUESTS_PER_S", "0.5"))
+CORPUS_LLM_TOKENS_PER_MIN = int(os.getenv("CORPUS_LLM_TOKENS_PER_MIN", "0"))   # 0 = no token limit
+CORPUS_LLM_WORKERS = int(os.getenv("CORPUS_LLM_WORKERS", "4"))                 # concurrent requests in flight
+CORPUS_LLM_OUTPUT_TOKENS = 400                                                 # expected completion size (~250 words)
+
 # === Embedding model ===
 EMBED_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
 
@@ -11,13 +18,106 @@ EMBED_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
 INDEX_DIR = "app/data/rag/indexes"
 DESCRIPTION_INDEX_PATH = os.path.join(INDEX_DIR, "desc_index.faiss")
 COMMENT_INDEX_PATH     = os.path.join(INDEX_DIR, "comment_index.faiss")
+UNIFIED_INDEX_PATH     = os.path.join(INDEX_DIR, "unified_index.faiss")
+COMPANY_INDEX_PATH     = os.path.join(INDEX_DIR, "company_index.faiss")
+
+# === Index layout ===
+# "split": one index per entry type | "unified": one id index over both, ids encode (type, row), searched once for
+# all types (k = sum of the per-type budgets, then capped per type; a type crowded out by closer hits of another gets fewer)
+INDEX_LAYOUT = os.getenv("FAISS_INDEX_LAYOUT", "split")
+
+# === Candidate over-fetch (app/services/retriever) ===
+# "adaptive": start at top_k * START_RATIO hits per index per query and double until the pool holds top_k
+# distinct companies (or MAX_RATIO / the index runs out) | "fixed": always top_k * 2
+# START_RATIO 2 makes adaptive's first search the fixed one, so it only ever widens the candidate pool
+RETRIEVAL_OVERFETCH = os.getenv("RETRIEVAL_OVERFETCH", "adaptive")
+OVERFETCH_START_RATIO = int(os.getenv("OVERFETCH_START_RATIO", "2"))
+OVERFETCH_MAX_RATIO = int(os.getenv("OVERFETCH_MAX_RATIO", "32"))
+
+# === Company centroid index (coarse-to-fine retrieval) ===
+# one vector per company: blend of its description and mean comment embedding, renormalized
+COMPANY_CENTROID_DESC_WEIGHT = 0.5
+# "chunks": search every description / comment chunk | "coarse": pick top_k * COARSE_COMPANY_RATIO companies per
+# query from the company index, then search only their chunks (falls back to "chunks" without a company index)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "chunks")
+COARSE_COMPANY_RATIO = int(os.getenv("COARSE_COMPANY_RATIO", "4"))
 
 # === Metadata paths ===
 META_DIR = "app/data/rag/meta"
 DESCRIPTION_META_PATH = os.path.join(META_DIR, "desc_metadata.json")
 COMMENT_META_PATH = os.path.join(META_DIR, "comment_metadata.json")
+COMPANY_IDS_PATH = os.path.join(META_DIR, "company_ids.json")  # company index row -> company_id
+META_STORE_PATH = os.path.join(META_DIR, "metadata.sqlite")  # projection store, preferred over the JSON lists when present
+
+# === Index generations ===
+# build_corpus_index writes every build to GENERATIONS_DIR/<id>/ (indexes + metadata + manifest.json),
+# then points CURRENT_GENERATION_PATH at it; running workers hot-swap to it without a restart.
+# The INDEX_DIR / META_DIR paths above are only read when no generation has been published.
+GENERATIONS_DIR = "app/data/rag/generations"
+CURRENT_GENERATION_PATH = os.path.join(GENERATIONS_DIR, "CURRENT")
+GENERATIONS_KEEP = 3                                                   # older generation dirs are pruned on publish
+GENERATION_WATCH_INTERVAL = float(os.getenv("GENERATION_WATCH_INTERVAL", "10"))  # seconds, 0 disables the watcher
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")                             # X-Admin-Token for /api/admin/*, empty = open
 
 # === Corpus paths ===
 CORPUS_DIR = "app/data/corpus"
-RAW_CORPUS_PATH = os.path.join(CORPUS_DIR, "ph_raw_corpus.json")
-ENHANCED_CORPUS_PATH = os.path.join(CORPUS_DIR, "ph_enhanced_corpus.json")
+# scraped posts, corpus entries and enhancement state (SQLite, WAL), accessed through app/core/corpus_db
+CORPUS_DB_PATH = os.getenv("CORPUS_DB_PATH", os.path.join(CORPUS_DIR, "corpus.sqlite"))
+# JSON Lines exports / imports (app/utils/corpus_io, scripts/chores/migrate_corpus_to_db.py)
+RAW_CORPUS_PATH = os.path.join(CORPUS_DIR, "ph_raw_corpus.jsonl")
+ENHANCED_CORPUS_PATH = os.path.join(CORPUS_DIR, "ph_enhanced_corpus.jsonl")
+
+# === Index type ===
+# "flat" (exact, brute force) | "ivf" (IVF-Flat) | "ivfpq" (IVF-PQ) | "hnsw"
+# Build params are baked into the index; search params are applied at load time by faiss_loader
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+IVF_NLIST = 1024              # max inverted lists, capped by corpus size at build time
+PQ_M = 16                     # PQ sub-quantizers, must divide the embedding dim (768)
+PQ_NBITS = 8                  # bits per PQ code
+HNSW_M = 32                   # graph neighbors per node
+HNSW_EF_CONSTRUCTION = 200
+IVF_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+# === Index loading ===
+# "memory": read the whole index onto each worker's heap (default)
+# "mmap": map index files read-only so every uvicorn worker shares one copy in the page cache
+#         (flat indexes via the .vectors.npy written next to them, IVF lists via FAISS IO_FLAG_MMAP;
+#         indexes built without .vectors.npy are read with the mmap IO flags)
+INDEX_LOAD_MODE = os.getenv("FAISS_LOAD_MODE", "memory")
+
+# === Query expansion cache ===
+EXPANSION_CACHE_SIZE = 1024                # in-memory LRU entries per worker
+EXPANSION_CACHE_TTL = 24 * 60 * 60         # seconds
+# SQLite tier shared across workers and restarts (async handlers read / write it on a worker thread);
+# set EXPANSION_CACHE_DB="" to keep it in-memory only. .cache/ is git-ignored
+EXPANSION_CACHE_DB = os.getenv("EXPANSION_CACHE_DB", ".cache/query/expansions.sqlite")
+
+# === Query embedding cache ===
+QUERY_EMBED_CACHE_BYTES = 64 * 1024 * 1024  # ~21k cached 768-dim float32 query vectors per worker
+
+# === Build-time embedding store ===
+# corpus vectors by content hash, one store per EMBED_MODEL_NAME; rebuilds only encode unseen texts (.cache/ is git-ignored)
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", ".cache/embeddings")
+EMBED_BUILD_WORKERS = int(os.getenv("EMBED_BUILD_WORKERS", "1"))         # >1: encode in a process pool (scripts/rag/embed_pipeline)
+EMBED_BUILD_BATCH_SIZE = int(os.getenv("EMBED_BUILD_BATCH_SIZE", "16"))
+EMBED_SHARD_SIZE = 1024                                                  # texts per pool task; finished shards go straight to the store
+
+# === Startup ===
+# "background": the server accepts requests at once and loads the embedding model + indexes on a thread
+#               (GET /api/ready answers 503 until done) | "blocking": startup waits for them | "off": first query loads them
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+# a failed warm-up (GET /api/ready reports status "failed" + the error) is retried after WARMUP_RETRY_S, doubling up to the max
+WARMUP_RETRY_S = float(os.getenv("WARMUP_RETRY_S", "5"))
+WARMUP_RETRY_MAX_S = 300.0
+
+# === Serving concurrency ===
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", "2"))                          # embedding + FAISS threads per process
+MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "8"))    # in-flight /api/query per process
+MAX_CONCURRENT_ANALYSES = int(os.getenv("MAX_CONCURRENT_ANALYSES", "4"))  # in-flight /api/analyze per process
+MAX_WAITING_REQUESTS = int(os.getenv("MAX_WAITING_REQUESTS", "16"))       # queued per route before answering 429
+
+# === Query embedding micro-batching ===
+# concurrent requests' texts are coalesced into one encode() call
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
@@ -0,0 +1,197 @@
+# local corpus database: scraped posts, corpus entries and their enhancement state in one SQLite file (WAL)
+# Every pipeline stage goes through CorpusDB; nothing else issues SQL against the corpus.
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+WRITE_CHUNK = 500  # rows per executemany / commit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    scraped_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    company_id TEXT,
+    raw TEXT NOT NULL,
+    enhanced TEXT,
+    enhancement_version TEXT,
+    enhanced_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_company ON entries (company_id, type);
+CREATE INDEX IF NOT EXISTS idx_entries_type ON entries (type);
+CREATE INDEX IF NOT EXISTS idx_entries_version ON entries (enhancement_version);
+"""
+
+
+def _chunks(items: Iterable, size: int = WRITE_CHUNK) -> Iterator[List]:
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+class CorpusDB:
+    """
+    posts:   scraped Product Hunt posts (latest scrape wins), JSON in data.
+    entries: one row per corpus entry; raw is the entry built from its post, enhanced the
+             LLM-standardized entry (NULL until enhanced). company_id, enhancement_version and
+             enhanced_at are columns so lookups and backfills are indexed queries / UPDATEs,
+             and they override the same fields inside the JSON on read.
+    Rebuilding raw entries keeps their enhancement state. One connection per thread.
+    """
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")  # readers (API workers) never block the writer (a pipeline script)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, query: str, rows: Iterable[tuple]) -> int:
+        conn = self._conn()
+        count = 0
+        for chunk in _chunks(rows):
+            conn.executemany(query, chunk)
+            conn.commit()
+            count += len(chunk)
+        return count
+
+    def _update(self, query: str, params: tuple = ()) -> int:
+        conn = self._conn()
+        updated = conn.execute(query, params).rowcount
+        conn.commit()
+        return updated
+
+    def count(self, table: str = "entries", entry_type: str = None, enhanced: bool = None) -> int:
+        if table == "posts":
+            return self._conn().execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+        where, params = self._where(entry_type, enhanced)
+        return self._conn().execute(f"SELECT COUNT(*) FROM entries{where}", params).fetchone()[0]
+
+    @staticmethod
+    def _where(entry_type: Optional[str], enhanced: Optional[bool]) -> tuple:
+        clauses, params = [], []
+        if entry_type is not None:
+            clauses.append("type = ?")
+            params.append(entry_type)
+        if enhanced is not None:
+            clauses.append("enhanced IS NOT NULL" if enhanced else "enhanced IS NULL")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
+
+    # --- posts (scraper) ---
+    def upsert_posts(self, posts: Iterable[Dict]) -> int:
+        now = time.time()
+        return self._write(
+            "INSERT INTO posts VALUES (?, ?, ?) ON CONFLICT(id) DO UPDATE SET data = excluded.data, scraped_at = excluded.scraped_at",
+            ((post["id"], json.dumps(post, ensure_ascii=False), now) for post in posts)
+        )
+
+    def iter_posts(self) -> Iterator[Dict]:
+        for (data,) in self._conn().execute("SELECT data FROM posts ORDER BY rowid"):
+            yield json.loads(data)
+
+    # --- raw entries (corpus builder) ---
+    def upsert_entries(self, entries: Iterable[Dict]) -> int:
+        return self._write(
+            "INSERT INTO entries (id, type, company_id, raw) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET type = excluded.type, company_id = excluded.company_id, raw = excluded.raw",
+            ((e["id"], e["type"], e.get("company_id"), json.dumps(e, ensure_ascii=False)) for e in entries)
+        )
+
+    def iter_entries(self, entry_type: str = None, enhanced: bool = None) -> Iterator[Dict]:
+        """Raw entries, in insertion order; enhanced=False gives the ones still waiting for the LLM."""
+        where, params = self._where(entry_type, enhanced)
+        for raw, company_id in self._conn().execute(f"SELECT raw, company_id FROM entries{where} ORDER BY rowid", params):
+            entry = json.loads(raw)
+            if company_id is not None:
+                entry["company_id"] = company_id
+            yield entry
+
+    # --- enhancement state (enhancer, indexer) ---
+    def save_enhanced(self, entries: Iterable[Dict]) -> int:
+        """Store standardized entries; an id without a raw row gets one from the entry itself."""
+        rows = (
+            (e["id"], e["type"], e.get("company_id"), data, data, e.get("enhancementVersion"), e.get("enhancedAt"))
+            for e in entries for data in [json.dumps(e, ensure_ascii=False)]
+        )
+        return self._write(
+            "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+            "company_id = COALESCE(entries.company_id, excluded.company_id), enhanced = excluded.enhanced, "
+            "enhancement_version = excluded.enhancement_version, enhanced_at = excluded.enhanced_at",
+            rows
+        )
+
+    def iter_enhanced(self, entry_type: str = None) -> Iterator[Dict]:
+        where, params = self._where(entry_type, True)
+        query = f"SELECT enhanced, company_id, enhancement_version, enhanced_at FROM entries{where} ORDER BY rowid"
+        for enhanced, company_id, version, enhanced_at in self._conn().execute(query, params):
+            entry = json.loads(enhanced)
+            entry["isEnhanced"] = True
+            for field, value in (("company_id", company_id), ("enhancementVersion", version), ("enhancedAt", enhanced_at)):
+                if value is not None:
+                    entry[field] = value
+            yield entry
+
+    # --- point lookups (retriever) ---
+    def company_description(self, company_id: str) -> Optional[Dict]:
+        """The raw description entry of a company (every scraped company has one), via idx_entries_company."""
+        row = self._conn().execute(
+            "SELECT raw FROM entries WHERE company_id = ? AND type = 'description' LIMIT 1", (company_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # --- backfills ---
+    def backfill_company_ids(self) -> int:
+        return self._update(
+            "UPDATE entries SET company_id = CASE type WHEN 'description' THEN id "
+            "ELSE json_extract(raw, '$.meta.parent_id') END WHERE company_id IS NULL"
+        )
+
+    def backfill_enhancement_flags(self, version: str) -> int:
+        return self._update(
+            "UPDATE entries SET enhancement_version = ?, enhanced_at = ? WHERE enhanced IS NOT NULL AND enhancement_version IS NULL",
+            (version, datetime.now(timezone.utc).isoformat())
+        )
+
+    def backfill_websites(self) -> int:
+        """Copy each company's website from its raw description into the enhanced description and comments."""
+        website = "COALESCE(json_extract(d.raw, '$.website'), json_extract(d.raw, '$.meta.website'))"
+        field = "CASE entries.type WHEN 'description' THEN '$.meta.website' ELSE '$.meta.parent_website' END"
+        return self._update(
+            f"UPDATE entries SET enhanced = json_set(enhanced, {field}, "
+            f"(SELECT {website} FROM entries d WHERE d.company_id = entries.company_id AND d.type = 'description')) "
+            f"WHERE enhanced IS NOT NULL AND EXISTS "
+            f"(SELECT 1 FROM entries d WHERE d.company_id = entries.company_id AND d.type = 'description' AND {website} IS NOT NULL)"
+        )
+
+    # --- maintenance ---
+    def backup(self, path: str):
+        """Consistent copy of the database (safe while other processes read or write it)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        target = sqlite3.connect(path)
+        with target:
+            self._conn().backup(target)
+        target.close()
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -1,26 +1,305 @@
-# handles loading + caching FAISS indexes and metadata in retrieval 
+# handles loading + caching FAISS indexes and metadata in retrieval, one index generation at a time
 import faiss
 import json
-from typing import Tuple, List, Dict
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Tuple, List, Dict, Optional
+
+import numpy as np
 
 from app.core.config import (
-    DESCRIPTION_INDEX_PATH,
-    COMMENT_INDEX_PATH,
-    DESCRIPTION_META_PATH,
-    COMMENT_META_PATH
+    EMBED_MODEL_NAME,
+    INDEX_LAYOUT,
+    RETRIEVAL_MODE,
+    CORPUS_DB_PATH,
+    IVF_NPROBE,
+    HNSW_EF_SEARCH,
+    INDEX_LOAD_MODE,
+    GENERATIONS_DIR
+)
+from app.core.generations import (
+    LEGACY_PATHS, generation_paths, read_manifest, current_generation_id, acquire_lease, release_lease
 )
+from app.core.index_factory import ENTRY_TYPES, MemmapFlatIndex, set_search_params, vectors_path
+from app.core.meta_store import ListMetaStore, SqliteMetaStore
+from app.core.corpus_db import CorpusDB
+
+INDEX_NAMES = ("description", "comment", "unified", "company")
+
+# Runtime search knobs applied to every loaded index (no-ops for flat indexes)
+_search_params = {"nprobe": IVF_NPROBE, "ef_search": HNSW_EF_SEARCH}
 
-# Internal cache for loaded indexes and metadata
-_index_cache = {}
+# Corpus database, opened on first company lookup (only needed without a SQLite metadata store)
+_corpus_db = None
+
+# IVF inverted lists are mapped instead of read; newer FAISS builds can also map flat / HNSW storage (IFC),
+# but refuse to combine that with mapped IVF lists, hence the retry without it
+MMAP_IO_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+MMAP_IFC_IO_FLAGS = MMAP_IO_FLAGS | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
 
 # helpers
 def _load_faiss_index(index_path: str) -> faiss.Index:
-    return faiss.read_index(index_path)
+    if INDEX_LOAD_MODE != "mmap":
+        return set_search_params(faiss.read_index(index_path), **_search_params)
+    if os.path.exists(vectors_path(index_path)):
+        return MemmapFlatIndex(index_path)
+    try:
+        index = faiss.read_index(index_path, MMAP_IFC_IO_FLAGS)
+    except RuntimeError:
+        index = faiss.read_index(index_path, MMAP_IO_FLAGS)
+    return set_search_params(index, **_search_params)
 
 def _load_metadata(meta_path: str) -> List[Dict]:
     with open(meta_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+
+class IndexGeneration:
+    """
+    One published build: its indexes, metadata lists and metadata store, loaded lazily and
+    never modified afterwards. A request pins the generation it started on (pinned_generation())
+    so index rows and metadata rows always come from the same build. A published generation is
+    leased (app.core.generations) while it is live or pinned, so its files outlive a prune.
+    """
+    def __init__(self, generation_id: Optional[str], paths: Dict[str, str], manifest: Dict = None, lease: str = None):
+        self.generation_id = generation_id
+        self.lease = lease  # this object's own lease (acquire_lease), released by retire / the last unpin
+        self.paths = paths
+        self.manifest = manifest or {}
+        self.loaded_at = None
+        self._indexes = {}
+        self._metadata = {}
+        self._company_ids = None
+        self._store = None
+        self._lock = threading.Lock()
+        self._pins = 0
+        self._retired = False
+
+    def index(self, name: str) -> faiss.Index:
+        if name not in INDEX_NAMES:
+            raise ValueError(f"Unknown index: {name}")
+        if name not in self._indexes:
+            with self._lock:
+                if name not in self._indexes:
+                    self._indexes[name] = _load_faiss_index(self.paths[name])
+        return self._indexes[name]
+
+    def metadata(self, entry_type: str) -> List[Dict]:
+        if entry_type not in ENTRY_TYPES:
+            raise ValueError(f"Unknown entry_type: {entry_type}")
+        if entry_type not in self._metadata:
+            with self._lock:
+                if entry_type not in self._metadata:
+                    self._metadata[entry_type] = _load_metadata(self.paths[f"{entry_type}_meta"])
+        return self._metadata[entry_type]
+
+    def has_index(self, name: str) -> bool:
+        return name in self._indexes or os.path.exists(self.paths[name])
+
+    def company_ids(self) -> List[str]:
+        """company_id of each company index row."""
+        if self._company_ids is None:
+            with self._lock:
+                if self._company_ids is None:
+                    self._company_ids = _load_metadata(self.paths["company_ids"])
+        return self._company_ids
+
+    def meta_store(self):
+        if self._store is None:
+            if os.path.exists(self.paths["meta_store"]):
+                store = SqliteMetaStore(self.paths["meta_store"])
+            else:
+                store = ListMetaStore(
+                    {entry_type: self.metadata(entry_type) for entry_type in ENTRY_TYPES},
+                    describe=describe_company
+                )
+            with self._lock:
+                if self._store is None:
+                    self._store = store
+        return self._store
+
+    def loaded_indexes(self) -> List[faiss.Index]:
+        return list(self._indexes.values())
+
+    def warm(self, names: List[str]):
+        """Load indexes + metadata store and run one search each, so the first real query pays no load cost."""
+        for name in names:
+            if os.path.exists(self.paths[name]):
+                index = self.index(name)
+                index.search(np.zeros((1, index.d), dtype=np.float32), 1)
+                if name == "company":
+                    self.company_ids()
+        self.meta_store().count(ENTRY_TYPES[0])
+        self.loaded_at = time.time()
+
+    def pin(self) -> bool:
+        """Count a request using this generation; False once it has been retired (swapped out and released)."""
+        with self._lock:
+            if self._retired and self._pins == 0:
+                return False
+            self._pins += 1
+            return True
+
+    def unpin(self):
+        with self._lock:
+            self._pins -= 1
+            release = self._retired and self._pins == 0
+        if release:
+            self._release()
+
+    def retire(self):
+        """Swapped out: drop the lease once the last pinned request is done."""
+        with self._lock:
+            self._retired = True
+            release = self._pins == 0
+        if release:
+            self._release()
+
+    def _release(self):
+        if self.lease is not None:
+            release_lease(self.generation_id, self.lease)
+
+    def info(self) -> Dict:
+        return {
+            "generation": self.generation_id,
+            "built_at": self.manifest.get("built_at"),
+            "loaded_at": self.loaded_at,
+            "indexes": sorted(self._indexes),
+            "counts": self.manifest.get("counts"),
+        }
+
+
+def load_generation(generation_id: Optional[str]) -> IndexGeneration:
+    """IndexGeneration for a published id, or for the legacy INDEX_DIR / META_DIR files when None."""
+    if generation_id is None:
+        return IndexGeneration(None, dict(LEGACY_PATHS))
+    generation_dir = os.path.join(GENERATIONS_DIR, generation_id)
+    manifest = read_manifest(generation_dir)
+    if manifest.get("embed_model") != EMBED_MODEL_NAME:
+        raise ValueError(
+            f"Generation {generation_id} was embedded with {manifest.get('embed_model')}, "
+            f"this server encodes queries with {EMBED_MODEL_NAME}"
+        )
+    lease = acquire_lease(generation_id)
+    return IndexGeneration(generation_id, generation_paths(generation_dir), manifest, lease)
+
+# Read-copy-update: readers grab the current generation without locking; a reload builds and warms
+# a new one off to the side, then replaces the reference in one assignment. In-flight requests keep
+# the generation they pinned; its lease is dropped when the last of them finishes.
+_generation = None
+_reload_lock = threading.Lock()
+
+def current_generation() -> IndexGeneration:
+    global _generation
+    if _generation is None:
+        with _reload_lock:
+            if _generation is None:
+                _generation = load_generation(current_generation_id())
+    return _generation
+
+@contextmanager
+def pinned_generation(generation: IndexGeneration = None):
+    """The given or current generation, kept leased until the block exits even if a reload swaps it out."""
+    if generation is None:
+        generation = current_generation()
+        while not generation.pin():  # retired between the read and the pin: take the new one
+            generation = current_generation()
+    else:
+        generation.pin()
+    try:
+        yield generation
+    finally:
+        generation.unpin()
+
+def live_generation() -> Optional[IndexGeneration]:
+    """The generation serving queries, or None if nothing has been loaded yet (never triggers a load)."""
+    return _generation
+
+def warm_generation() -> IndexGeneration:
+    """Load and warm the current generation's indexes + metadata store now instead of on the first query."""
+    generation = current_generation()
+    if generation.loaded_at is None:
+        generation.warm(_warm_names(None))
+    return generation
+
+def _warm_names(previous: Optional[IndexGeneration]) -> List[str]:
+    names = ["unified"] if INDEX_LAYOUT == "unified" else list(ENTRY_TYPES)
+    if RETRIEVAL_MODE == "coarse":
+        names.append("company")
+    if previous is not None:
+        names += [name for name in previous._indexes if name not in names]
+    return names
+
+def reload_generation(force: bool = False) -> Dict:
+    """
+    Swap to the generation named by CURRENT if it differs from the live one (or force).
+    The new generation is fully loaded and warmed before the swap, so queries never wait on it;
+    on any error the live generation stays in place and the error propagates.
+    """
+    global _generation
+    with _reload_lock:
+        previous = _generation
+        generation_id = current_generation_id()
+        if not force and previous is not None and previous.generation_id == generation_id:
+            return {"swapped": False, **previous.info()}
+
+        start = time.perf_counter()
+        generation = load_generation(generation_id)
+        try:
+            generation.warm(_warm_names(previous))
+        except Exception:
+            generation.retire()
+            raise
+        _generation = generation
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if previous is not None:
+            previous.retire()  # its own lease only: a reload of the same id holds a separate one
+
+    old_id = previous.generation_id if previous is not None else None
+    print(f"🔄 Index generation {old_id} -> {generation_id} (loaded + warmed in {elapsed_ms:.0f} ms)")
+    return {"swapped": True, "previous": old_id, "load_ms": round(elapsed_ms, 1), **generation.info()}
+
+def start_generation_watcher(interval: float) -> Optional[threading.Thread]:
+    """Poll CURRENT every interval seconds and hot-swap when a new generation is published (0 disables)."""
+    if interval <= 0:
+        return None
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                if current_generation_id() != current_generation().generation_id:
+                    reload_generation()
+            except Exception as e:
+                print(f"❌ Index generation reload failed, keeping the current one: {e}")
+
+    thread = threading.Thread(target=watch, name="generation-watcher", daemon=True)
+    thread.start()
+    return thread
+
+def get_faiss_index(name: str) -> faiss.Index:
+    """
+    Returns the FAISS index for 'description', 'comment', 'unified' (id index whose ids
+    encode (type code, metadata row), see app.core.index_factory.decode_ids) or 'company'
+    (company centroids, row -> IndexGeneration.company_ids()) of the current generation.
+    Loads and caches on first use; in mmap mode (INDEX_LOAD_MODE) a flat index is a MemmapFlatIndex.
+    """
+    return current_generation().index(name)
+
+def get_metadata(entry_type: str) -> List[Dict]:
+    """Full metadata list for an entry type (JSON files). Retrieval reads through get_meta_store instead."""
+    return current_generation().metadata(entry_type)
+
+def get_meta_store():
+    """
+    Returns the metadata store used by retrieval: rows by (entry type, FAISS row) with field projections.
+    Uses the SQLite store written by build_corpus_index when present (no JSON parse at startup),
+    otherwise falls back to the JSON metadata lists + corpus database point queries.
+    """
+    return current_generation().meta_store()
+
 # based on entry type, load appropriate index and metadata -> return as tuple
 def get_faiss_resources(entry_type: str) -> Tuple[faiss.Index, List[Dict]]:
     """
@@ -28,16 +307,38 @@ def get_faiss_resources(entry_type: str) -> Tuple[faiss.Index, List[Dict]]:
     Supports 'description' or 'comment'.
     Loads and caches on first use.
     """
-    if entry_type not in _index_cache:
-        if entry_type == "description":
-            index = _load_faiss_index(DESCRIPTION_INDEX_PATH)
-            meta = _load_metadata(DESCRIPTION_META_PATH)
-        elif entry_type == "comment":
-            index = _load_faiss_index(COMMENT_INDEX_PATH)
-            meta = _load_metadata(COMMENT_META_PATH)
-        else:
-            raise ValueError(f"Unknown entry_type: {entry_type}")
-        
-        _index_cache[entry_type] = (index, meta)
+    generation = current_generation()
+    return generation.index(entry_type), generation.metadata(entry_type)
+
+def get_unified_resources() -> Tuple[faiss.Index, Dict[str, List[Dict]]]:
+    """Returns (unified id index, {entry type: metadata list}) for the unified layout."""
+    generation = current_generation()
+    return generation.index("unified"), {entry_type: generation.metadata(entry_type) for entry_type in ENTRY_TYPES}
 
-    return _index_cache[entry_type]
\ No newline at end of file
+def configure_search(nprobe: int = None, ef_search: int = None):
+    """
+    Update nprobe (IVF) / efSearch (HNSW) for cached and future indexes.
+    Lets the recall vs. latency trade-off be tuned without rebuilding.
+    """
+    if nprobe is not None:
+        _search_params["nprobe"] = nprobe
+    if ef_search is not None:
+        _search_params["ef_search"] = ef_search
+    for index in current_generation().loaded_indexes():
+        set_search_params(index, **_search_params)
+
+def get_corpus_db() -> Optional[CorpusDB]:
+    """The corpus database, or None when it hasn't been built on this host."""
+    global _corpus_db
+    if _corpus_db is None and os.path.exists(CORPUS_DB_PATH):
+        _corpus_db = CorpusDB(CORPUS_DB_PATH)
+    return _corpus_db
+
+def describe_company(company_id: str) -> Optional[Dict]:
+    """
+    A company's raw description entry by point query on the corpus database.
+    In raw_corpus every company has its description entry, which is not guaranteed
+    in the enhanced metadata.
+    """
+    db = get_corpus_db()
+    return db.company_description(company_id) if db else None
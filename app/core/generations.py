@@ -0,0 +1,145 @@
+# index generations: each build lives in its own directory with a manifest; CURRENT names the live one
+import itertools
+import json
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+from app.core.config import (
+    DESCRIPTION_INDEX_PATH,
+    COMMENT_INDEX_PATH,
+    UNIFIED_INDEX_PATH,
+    COMPANY_INDEX_PATH,
+    DESCRIPTION_META_PATH,
+    COMMENT_META_PATH,
+    COMPANY_IDS_PATH,
+    META_STORE_PATH,
+    GENERATIONS_DIR,
+    CURRENT_GENERATION_PATH,
+    GENERATIONS_KEEP
+)
+
+MANIFEST_NAME = "manifest.json"
+LEASES_DIR = "leases"  # <generation>/leases/<pid>-<n>: a worker process is (or may still be) serving the generation
+_lease_numbers = itertools.count()
+
+# Paths of the pre-generation layout (INDEX_DIR + META_DIR), used when nothing has been published
+LEGACY_PATHS = {
+    "description": DESCRIPTION_INDEX_PATH,
+    "comment": COMMENT_INDEX_PATH,
+    "unified": UNIFIED_INDEX_PATH,
+    "company": COMPANY_INDEX_PATH,
+    "description_meta": DESCRIPTION_META_PATH,
+    "comment_meta": COMMENT_META_PATH,
+    "company_ids": COMPANY_IDS_PATH,
+    "meta_store": META_STORE_PATH
+}
+
+def generation_paths(generation_dir: str) -> Dict[str, str]:
+    """Same file names as the legacy layout, all inside one generation directory."""
+    paths = {name: os.path.join(generation_dir, os.path.basename(path)) for name, path in LEGACY_PATHS.items()}
+    paths["manifest"] = os.path.join(generation_dir, MANIFEST_NAME)
+    return paths
+
+def new_generation() -> tuple:
+    """
+    Create an empty generation directory; returns (generation id, directory).
+    Ids sort in build order (prune keeps the newest), also for several builds in the same second
+    and after an older build of that second was pruned.
+    """
+    os.makedirs(GENERATIONS_DIR, exist_ok=True)
+    latest = max((name for name in os.listdir(GENERATIONS_DIR) if os.path.isdir(os.path.join(GENERATIONS_DIR, name))), default="")
+    base_id = time.strftime("%Y%m%d-%H%M%S")
+    generation_id, suffix = base_id, 0
+    while generation_id <= latest or os.path.exists(os.path.join(GENERATIONS_DIR, generation_id)):
+        suffix += 1
+        generation_id = f"{base_id}-{suffix:03d}"
+    generation_dir = os.path.join(GENERATIONS_DIR, generation_id)
+    os.makedirs(generation_dir)
+    return generation_id, generation_dir
+
+def write_manifest(generation_dir: str, manifest: Dict):
+    with open(os.path.join(generation_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def read_manifest(generation_dir: str) -> Dict:
+    with open(os.path.join(generation_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def current_generation_id() -> Optional[str]:
+    """Id in the CURRENT pointer file, or None before the first publish."""
+    try:
+        with open(CURRENT_GENERATION_PATH, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def publish_generation(generation_id: str):
+    """
+    Atomically point CURRENT at a fully written generation (manifest last), then prune old ones.
+    Generations a worker still holds a lease on are kept (see prune_generations).
+    """
+    tmp_path = CURRENT_GENERATION_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(generation_id)
+    os.replace(tmp_path, CURRENT_GENERATION_PATH)
+    prune_generations(GENERATIONS_KEEP)
+
+def prune_generations(keep: int = GENERATIONS_KEEP):
+    """
+    Delete all but the newest keep generations, except CURRENT and generations leased by a running
+    worker: those may still load files lazily (an index they never warmed, a new SQLite connection).
+    """
+    current = current_generation_id()
+    generation_ids = sorted(
+        name for name in os.listdir(GENERATIONS_DIR)
+        if os.path.isfile(os.path.join(GENERATIONS_DIR, name, MANIFEST_NAME))
+    )
+    for generation_id in generation_ids[:-keep] if keep > 0 else generation_ids:
+        if generation_id != current and not is_leased(generation_id):
+            shutil.rmtree(os.path.join(GENERATIONS_DIR, generation_id), ignore_errors=True)
+
+# --- Leases: one empty file per loaded generation object, named <pid>-<n> ---
+# A worker can hold two leases on one generation (A -> B -> A reload: the stale A object and the live one),
+# so each object releases only its own.
+def _lease_path(generation_id: str, lease: str) -> str:
+    return os.path.join(GENERATIONS_DIR, generation_id, LEASES_DIR, lease)
+
+def acquire_lease(generation_id: str) -> str:
+    """
+    Keep generation_id from being pruned while this process uses it (fails if it's already gone).
+    Returns the lease to pass to release_lease.
+    """
+    lease = f"{os.getpid()}-{next(_lease_numbers)}"
+    path = _lease_path(generation_id, lease)
+    try:
+        os.mkdir(os.path.dirname(path))  # not makedirs: a pruned generation must not be recreated
+    except FileExistsError:
+        pass
+    open(path, "w").close()
+    return lease
+
+def release_lease(generation_id: str, lease: str):
+    try:
+        os.remove(_lease_path(generation_id, lease))
+    except FileNotFoundError:
+        pass
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+def is_leased(generation_id: str) -> bool:
+    """Whether a running process holds a lease; leases left behind by dead workers don't count."""
+    try:
+        leases = os.listdir(os.path.join(GENERATIONS_DIR, generation_id, LEASES_DIR))
+    except FileNotFoundError:
+        return False
+    pids = {lease.split("-")[0] for lease in leases}
+    return any(pid.isdigit() and _process_alive(int(pid)) for pid in pids)
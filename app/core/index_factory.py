@@ -0,0 +1,288 @@
+# builds FAISS indexes by type (flat / ivf / ivfpq / hnsw) and applies their runtime search knobs
+import math
+import os
+import faiss
+import numpy as np
+
+from app.core.config import (
+    INDEX_TYPE,
+    IVF_NLIST,
+    PQ_M,
+    PQ_NBITS,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    IVF_NPROBE,
+    HNSW_EF_SEARCH
+)
+
+INDEX_TYPES = ("flat", "ivf", "ivfpq", "hnsw")
+
+# Entry types by code -> ENTRY_TYPES[code]; the code is the high half of unified index ids
+ENTRY_TYPES = ("description", "comment")
+TYPE_SHIFT = 32
+ROW_MASK = (1 << TYPE_SHIFT) - 1
+
+# FAISS wants ~39 training points per centroid, fewer just triggers warnings + poor clusters
+MIN_POINTS_PER_CENTROID = 39
+
+def _effective_nlist(n: int, nlist: int) -> int:
+    return max(1, min(nlist, n // MIN_POINTS_PER_CENTROID))
+
+def _effective_nbits(n: int, nbits: int) -> int:
+    # each PQ codebook has 2^nbits centroids, which need at least as many training points
+    return max(1, min(nbits, int(math.log2(max(n, 2)))))
+
+def index_factory_string(index_type: str, n: int, dim: int) -> str:
+    """FAISS factory string for index_type, with params scaled down for small corpora."""
+    match index_type:
+        case "flat":
+            return "Flat"
+        case "ivf":
+            return f"IVF{_effective_nlist(n, IVF_NLIST)},Flat"
+        case "ivfpq":
+            if dim % PQ_M != 0:
+                raise ValueError(f"PQ_M={PQ_M} must divide embedding dim {dim}")
+            return f"IVF{_effective_nlist(n, IVF_NLIST)},PQ{PQ_M}x{_effective_nbits(n, PQ_NBITS)}"
+        case "hnsw":
+            return f"HNSW{HNSW_M},Flat"
+        case _:
+            raise ValueError(f"Unknown index type: {index_type} (expected one of {INDEX_TYPES})")
+
+def make_index(embeddings: np.ndarray, index_type: str = INDEX_TYPE) -> faiss.Index:
+    """Create and train (but don't populate) an L2 index of index_type for these embeddings."""
+    n, dim = embeddings.shape
+    index = faiss.index_factory(dim, index_factory_string(index_type, n, dim), faiss.METRIC_L2)
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    if not index.is_trained:
+        index.train(embeddings)
+    return index
+
+def build_index(embeddings: np.ndarray, index_type: str = INDEX_TYPE) -> faiss.Index:
+    """Create, train and populate an index of index_type."""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    index = make_index(embeddings, index_type)
+    index.add(embeddings)
+    return index
+
+def set_search_params(index: faiss.Index, nprobe: int = IVF_NPROBE, ef_search: int = HNSW_EF_SEARCH) -> faiss.Index:
+    """
+    Apply runtime knobs to a loaded index: nprobe for IVF, efSearch for HNSW.
+    Parameters that don't apply to the index type are skipped (flat has none).
+    """
+    if not isinstance(index, faiss.Index):
+        return index  # MemmapFlatIndex: exact search, nothing to tune
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass  # not applicable to this index type
+    return index
+
+
+# --- Unified layout: one id index, id = (type code << 32) | metadata row ---
+def encode_ids(type_code: int, rows: np.ndarray) -> np.ndarray:
+    return (np.int64(type_code) << TYPE_SHIFT) | np.asarray(rows, dtype=np.int64)
+
+def decode_ids(ids: np.ndarray) -> tuple:
+    """Split unified ids into (type codes, rows). FAISS -1 padding decodes to row -1."""
+    ids = np.asarray(ids, dtype=np.int64)
+    missing = ids < 0
+    codes = np.where(missing, 0, ids >> TYPE_SHIFT).astype(np.int8)
+    rows = np.where(missing, -1, ids & ROW_MASK)
+    return codes, rows
+
+def build_unified_index(embeddings_by_type: dict, index_type: str = INDEX_TYPE) -> faiss.Index:
+    """
+    Build one id index (see build_id_index) over every entry type in ENTRY_TYPES order.
+    embeddings_by_type maps entry type -> embeddings whose rows match that type's metadata.
+    """
+    blocks, ids = [], []
+    for code, entry_type in enumerate(ENTRY_TYPES):
+        embeddings = embeddings_by_type.get(entry_type)
+        if embeddings is None or len(embeddings) == 0:
+            continue
+        blocks.append(np.ascontiguousarray(embeddings, dtype=np.float32))
+        ids.append(encode_ids(code, np.arange(len(embeddings))))
+    return build_id_index(np.concatenate(blocks), np.concatenate(ids), index_type)
+
+def _ivf(index: faiss.Index):
+    """The IVF index inside index (IVF, IVF-PQ), or None."""
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+def build_id_index(embeddings: np.ndarray, ids: np.ndarray, index_type: str = INDEX_TYPE) -> faiss.Index:
+    """
+    Index labelled with ids, so later builds can append / remove vectors by id. IVF indexes keep
+    the ids in their inverted lists; flat and HNSW indexes are wrapped in an IndexIDMap.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    index = make_index(embeddings, index_type)
+    if _ivf(index) is None:
+        index = faiss.IndexIDMap(index)
+    index.add_with_ids(embeddings, np.asarray(ids, dtype=np.int64))
+    return index
+
+def update_index(index: faiss.Index, embeddings: np.ndarray, ids: np.ndarray, removed_ids: np.ndarray) -> int:
+    """
+    Apply an incremental change in place: drop removed_ids, then append embeddings under ids.
+    IVF keeps its trained centroids. Returns how many removed ids stay in the index as tombstones
+    (HNSW can't delete; their metadata rows are gone, so retrieval skips them).
+    Raises ValueError for an IVF index under an IndexIDMap (built before IVF kept its own ids):
+    removing from it compacts the id map but not the IVF's sequential ids, so it needs a full build.
+    """
+    removed = 0
+    if len(removed_ids):
+        base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(base, faiss.IndexHNSW):
+            pass  # tombstones
+        elif base is not index and not isinstance(base, faiss.IndexFlat):
+            raise ValueError(f"can't remove ids from an IndexIDMap over {type(base).__name__}")
+        else:
+            removed = index.remove_ids(id_selector(removed_ids))
+    if len(ids):
+        index.add_with_ids(np.ascontiguousarray(embeddings, dtype=np.float32), np.asarray(ids, dtype=np.int64))
+    return len(removed_ids) - removed
+
+def type_selector(type_codes: list) -> faiss.IDSelector:
+    """Selector matching unified ids of the given type codes (contiguous id ranges per type)."""
+    selectors = [faiss.IDSelectorRange(int(encode_ids(c, 0)), int(encode_ids(c + 1, 0))) for c in type_codes]
+    selector = selectors[0]
+    for other in selectors[1:]:
+        selector = faiss.IDSelectorOr(selector, other)
+    selector.referenced = selectors  # keep sub-selectors alive alongside the python wrapper
+    return selector
+
+def id_selector(ids: np.ndarray) -> faiss.IDSelector:
+    return faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64))
+
+def make_search_params(index: faiss.Index, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """
+    Search parameters carrying an id selector, typed for the underlying index so the
+    current nprobe / efSearch are kept (IVF and HNSW reject generic parameters).
+    """
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    ivf = _ivf(base)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+# --- Memory-mapped flat indexes: raw float32 vectors next to the .faiss file ---
+def vectors_path(index_path: str) -> str:
+    return os.path.splitext(index_path)[0] + ".vectors.npy"
+
+def ids_path(index_path: str) -> str:
+    return os.path.splitext(index_path)[0] + ".ids.npy"
+
+def _save_npy(path: str, array: np.ndarray):
+    # write + rename so workers still mapping the previous file keep a valid inode
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+def save_mmap_vectors(index: faiss.Index, index_path: str) -> bool:
+    """
+    Write a flat index's vectors (and IndexIDMap ids) as .npy files that MemmapFlatIndex maps.
+    Other index types get nothing, and stale files from an earlier flat build are removed.
+    """
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if not isinstance(base, faiss.IndexFlat):
+        for path in (vectors_path(index_path), ids_path(index_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        return False
+
+    vectors = base.reconstruct_n(0, base.ntotal)
+    if base is not index:
+        # sorted by id, so MemmapFlatIndex finds labels by binary search and each type is one slice
+        ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+        order = np.argsort(ids, kind="stable")
+        _save_npy(vectors_path(index_path), vectors[order])
+        _save_npy(ids_path(index_path), ids[order])
+        return True
+    _save_npy(vectors_path(index_path), vectors)
+    if os.path.exists(ids_path(index_path)):
+        os.remove(ids_path(index_path))
+    return True
+
+class MemmapFlatIndex:
+    """
+    Exact L2 search over vectors memory-mapped from .npy files, same results as IndexFlatL2.
+    Pages are shared through the OS page cache, so N workers hold one copy and opening is instant.
+    Labels are the stored ids (unified layout, sorted by save_mmap_vectors) or the row itself (split layout).
+    Filters binary-search the sorted ids, so a filtered search reads O(len(ids) * log N) id pages, not all N.
+    """
+    def __init__(self, index_path: str):
+        self.vectors = np.load(vectors_path(index_path), mmap_mode="r")
+        self.ids = np.load(ids_path(index_path), mmap_mode="r") if os.path.exists(ids_path(index_path)) else None
+        self.ntotal, self.d = self.vectors.shape
+        self._order = None  # position of each sorted id, only for id files written unsorted (older builds)
+        self._sorted_ids = self.ids
+        if self.ids is not None and np.any(self.ids[1:] < self.ids[:-1]):  # once per load; ids are 8 bytes a row
+            print(f"⚠️ {ids_path(index_path)} isn't sorted (older build), keeping a sorted copy of the ids in memory")
+            self._order = np.argsort(self.ids, kind="stable")
+            self._sorted_ids = np.asarray(self.ids)[self._order]
+
+    def _id_positions(self, ids: np.ndarray) -> np.ndarray:
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        sorted_ids = self._sorted_ids
+        found = np.searchsorted(sorted_ids, ids)
+        inside = found < self.ntotal
+        found, ids = found[inside], ids[inside]
+        found = found[np.asarray(sorted_ids[found]) == ids]  # reads only the pages holding these ids
+        return found if self._order is None else np.sort(self._order[found])
+
+    def _positions(self, ids: np.ndarray = None, type_codes: list = None):
+        """Rows to search: None (all), a slice (one contiguous block) or an array of rows."""
+        if ids is not None:
+            if self.ids is not None:
+                return self._id_positions(ids)
+            rows = np.unique(np.asarray(ids, dtype=np.int64))
+            return rows[(rows >= 0) & (rows < self.ntotal)]
+        if type_codes is not None and self.ids is not None:
+            sorted_ids = self._sorted_ids
+            bounds = [np.searchsorted(sorted_ids, [encode_ids(c, 0), encode_ids(c + 1, 0)]) for c in sorted(set(type_codes))]
+            if self._order is None and all(end == start for (_, end), (start, _) in zip(bounds, bounds[1:])):
+                return slice(int(bounds[0][0]), int(bounds[-1][1]))  # adjacent type blocks: a view, nothing copied
+            positions = np.concatenate([np.arange(start, end) for start, end in bounds])
+            return positions if self._order is None else np.sort(self._order[positions])
+        return None
+
+    def search(self, x: np.ndarray, k: int, ids: np.ndarray = None, type_codes: list = None) -> tuple:
+        """knn over every row, or only rows whose label is in ids / whose type code is in type_codes."""
+        positions = self._positions(ids, type_codes)
+        if isinstance(positions, slice) and positions.stop > positions.start:
+            scores, hits = faiss.knn(x, self.vectors[positions], k)
+            hits = np.where(hits >= 0, hits + positions.start, -1)
+        elif positions is None:
+            scores, hits = faiss.knn(x, self.vectors, k)
+        elif isinstance(positions, slice) or len(positions) == 0:
+            return np.full((len(x), k), np.finfo(np.float32).max, dtype=np.float32), np.full((len(x), k), -1, dtype=np.int64)
+        else:
+            scores, hits = faiss.knn(x, self.vectors[positions], k)
+            hits = np.where(hits >= 0, positions[hits], -1)
+        if self.ids is not None:
+            hits = np.where(hits >= 0, self.ids[hits], -1)
+        return scores, hits
+
+def search_index(index, x: np.ndarray, k: int, ids: np.ndarray = None, type_codes: list = None) -> tuple:
+    """
+    index.search restricted to labels in ids, or (unified indexes) to entry type codes.
+    FAISS indexes get the matching id selector; MemmapFlatIndex filters its rows directly.
+    """
+    if isinstance(index, MemmapFlatIndex):
+        return index.search(x, k, ids=ids, type_codes=type_codes)
+    selector = None
+    if ids is not None:
+        selector = id_selector(ids)
+    elif type_codes is not None:
+        selector = type_selector(type_codes)
+    params = make_search_params(index, selector) if selector is not None else None
+    return index.search(x, k, params=params)
@@ -0,0 +1,146 @@
+# projection-based metadata store: rows are fetched by (entry type, row) with only the requested fields
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Fields shipped in API responses / analysis prompts (enhancement bookkeeping is left out)
+RESPONSE_FIELDS = ("id", "type", "company_id", "text", "standardized", "meta")
+
+# Fields kept for a match's product (company) metadata
+PRODUCT_FIELDS = ("id", "company_id", "meta")
+
+# Fields needed to group candidates by company
+GROUPING_FIELDS = ("id", "company_id")
+
+SQLITE_MAX_PARAMS = 900  # stay under SQLITE_MAX_VARIABLE_NUMBER on older builds
+
+
+def _project(entry: Dict, fields: Optional[Iterable[str]]) -> Dict:
+    if fields is None:
+        return dict(entry)
+    return {field: entry[field] for field in fields if field in entry}
+
+
+class ListMetaStore:
+    """
+    Store over in-memory metadata lists (the JSON files), used when no SQLite store is built.
+    describe looks up a company's description entry (e.g. a corpus database point query).
+    Tombstoned rows (removed by an incremental build) are None and read back as empty documents.
+    """
+    def __init__(self, metas_by_type: Dict[str, List[Dict]], describe: Callable[[str], Optional[Dict]] = None):
+        self._metas = metas_by_type
+        self._describe = describe
+        self._company_rows = None
+
+    def count(self, entry_type: str) -> int:
+        return sum(1 for entry in self._metas[entry_type] if entry is not None)
+
+    def get_rows(self, entry_type: str, rows: List[int], fields: Iterable[str] = None) -> List[Dict]:
+        meta = self._metas[entry_type]
+        return [_project(meta[row] or {}, fields) for row in rows]
+
+    def company_description(self, company_id: str, fields: Iterable[str] = None) -> Optional[Dict]:
+        entry = self._describe(company_id) if self._describe else None
+        return _project(entry, fields) if entry else None
+
+    def company_rows(self, company_ids: List[str], entry_type: str) -> List[int]:
+        if self._company_rows is None:
+            company_rows = {}
+            for t, meta in self._metas.items():
+                for row, entry in enumerate(meta):
+                    if entry and entry.get("company_id"):
+                        company_rows.setdefault((entry["company_id"], t), []).append(row)
+            self._company_rows = company_rows
+        return [row for company_id in company_ids for row in self._company_rows.get((company_id, entry_type), [])]
+
+
+class SqliteMetaStore:
+    """
+    Read-only SQLite metadata store. Every top-level entry field is its own JSON-encoded
+    column, so a projection only reads and decodes the requested fields. Pages are shared
+    between workers through the OS page cache instead of one parsed copy per process.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()  # one connection per thread (CPU executor workers)
+        self.fields = [row[1][2:] for row in self._conn().execute("PRAGMA table_info(entries)") if row[1].startswith("f_")]
+        self._field_set = set(self.fields)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def _columns(self, fields: Optional[Iterable[str]]) -> List[str]:
+        return [f for f in (self.fields if fields is None else fields) if f in self._field_set]
+
+    @staticmethod
+    def _decode(fields: List[str], values: tuple) -> Dict:
+        return {field: json.loads(value) for field, value in zip(fields, values) if value is not None}
+
+    def count(self, entry_type: str) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM entries WHERE entry_type = ?", (entry_type,)).fetchone()[0]
+
+    def get_rows(self, entry_type: str, rows: List[int], fields: Iterable[str] = None) -> List[Dict]:
+        columns = self._columns(fields)
+        select = ", ".join(["row"] + [f'"f_{c}"' for c in columns])
+        found = {}
+        unique_rows = list(dict.fromkeys(int(row) for row in rows))
+        for i in range(0, len(unique_rows), SQLITE_MAX_PARAMS):
+            chunk = unique_rows[i:i + SQLITE_MAX_PARAMS]
+            query = f"SELECT {select} FROM entries WHERE entry_type = ? AND row IN ({','.join('?' * len(chunk))})"
+            for row, *values in self._conn().execute(query, (entry_type, *chunk)):
+                found[row] = self._decode(columns, values)
+        return [found.get(int(row), {}) for row in rows]  # tombstoned rows have no entry
+
+    def company_description(self, company_id: str, fields: Iterable[str] = None) -> Optional[Dict]:
+        columns = self._columns(fields)
+        select = ", ".join(f'"f_{c}"' for c in columns)
+        values = self._conn().execute(f"SELECT {select} FROM companies WHERE company_id = ?", (company_id,)).fetchone()
+        return self._decode(columns, values) if values else None
+
+    def company_rows(self, company_ids: List[str], entry_type: str) -> List[int]:
+        rows = []
+        for i in range(0, len(company_ids), SQLITE_MAX_PARAMS):
+            chunk = company_ids[i:i + SQLITE_MAX_PARAMS]
+            query = f"SELECT row FROM entries WHERE entry_type = ? AND company_id IN ({','.join('?' * len(chunk))})"
+            rows.extend(row for (row,) in self._conn().execute(query, (entry_type, *chunk)))
+        return rows
+
+
+def build_meta_store(path: str, metas_by_type: Dict[str, List[Dict]], descriptions: Iterable[Dict]):
+    """
+    Write the SQLite metadata store: entries (entry_type, row) aligned with the FAISS rows,
+    plus companies (company_id -> description entry) for comment-first matches.
+    None entries are tombstoned rows and get no entry.
+    """
+    descriptions = list(descriptions)
+    fields = sorted({key for meta in metas_by_type.values() for entry in meta if entry for key in entry}
+                    | {key for entry in descriptions for key in entry})
+    columns = ", ".join(f'"f_{f}" TEXT' for f in fields)
+    placeholders = ", ".join("?" * len(fields))
+    encode = lambda entry: [json.dumps(entry[f]) if f in entry else None for f in fields]
+
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute(f"CREATE TABLE entries (entry_type TEXT NOT NULL, row INTEGER NOT NULL, company_id TEXT, {columns}, PRIMARY KEY (entry_type, row)) WITHOUT ROWID")
+    conn.execute(f"CREATE TABLE companies (company_id TEXT PRIMARY KEY, {columns}) WITHOUT ROWID")
+    for entry_type, meta in metas_by_type.items():
+        conn.executemany(
+            f"INSERT INTO entries VALUES (?, ?, ?, {placeholders})",
+            ((entry_type, row, entry.get("company_id"), *encode(entry)) for row, entry in enumerate(meta) if entry is not None)
+        )
+    conn.executemany(
+        f"INSERT OR REPLACE INTO companies VALUES (?, {placeholders})",
+        ((entry["company_id"], *encode(entry)) for entry in descriptions if entry.get("company_id"))
+    )
+    conn.execute("CREATE INDEX idx_entries_company ON entries (company_id, entry_type)")
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, path)  # readers never see a half-written store
@@ -1,10 +1,6 @@
-from typing import List, Dict
-from together import Together
-import os
-
+from typing import List, Dict, Tuple, AsyncIterator
 from app.core.config import LLM_MODEL_NAME
-
-client = Together(api_key=os.getenv("QUERY_LLM_API_KEY"))
+from app.llm.clients import query_client, query_async_client
 
 ANALYSIS_PROMPT_TEMPLATE =ANALYSIS_PROMPT_TEMPLATE = """
 You are an expert analyst for AI startup ideas.
@@ -80,62 +76,97 @@ def format_company_block(company: Dict, index: int) -> str:
 
     return block.strip()
 
-def parse_markdown_sections(markdown: str) -> Dict[str, str]:
-    sections = {
-        "similarities": "",
-        "differences": "",
-        "suggestions": "",
-        "uniqueness_score": ""
-    }
-
-    current_key = None
-    buffer = []
-
-    section_headers = {
-        "**similarities**": "similarities",
-        "**differences**": "differences",
-        "**suggestions**": "suggestions",
-        "**uniqueness**": "uniqueness_score"
-    }
-
-    for line in markdown.splitlines():
+SECTION_HEADERS = {
+    "**similarities**": "similarities",
+    "**differences**": "differences",
+    "**suggestions**": "suggestions",
+    "**uniqueness**": "uniqueness_score"
+}
+
+class SectionStreamParser:
+    """
+    Incremental parser for the 4 analysis sections.
+    feed() takes raw model output as it streams and returns the sections that just
+    closed (a section closes when the next header line arrives); close() flushes the last one.
+    """
+    def __init__(self):
+        self.sections = {key: "" for key in SECTION_HEADERS.values()}
+        self._current_key = None
+        self._buffer = []
+        self._partial = ""  # text after the last newline, not yet a full line
+
+    def _close_current(self) -> List[Tuple[str, str]]:
+        if not self._current_key:
+            return []
+        content = "\n".join(self._buffer).strip()
+        self.sections[self._current_key] = content
+        return [(self._current_key, content)]
+
+    def _feed_line(self, line: str) -> List[Tuple[str, str]]:
         line = line.strip()
         lower_line = line.lower()
 
-        if lower_line in section_headers:
-            if current_key:
-                sections[current_key] = "\n".join(buffer).strip()
-            current_key = section_headers[lower_line]
-            buffer = []
-        elif current_key:
-            buffer.append(line)
-
-    if current_key and buffer:
-        sections[current_key] = "\n".join(buffer).strip()
+        if lower_line in SECTION_HEADERS:
+            closed = self._close_current()
+            self._current_key = SECTION_HEADERS[lower_line]
+            self._buffer = []
+            return closed
+        if self._current_key:
+            self._buffer.append(line)
+        return []
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        text = self._partial + chunk
+        complete, newline, self._partial = text.rpartition("\n")
+        closed = []
+        if newline:
+            for line in complete.splitlines():
+                closed.extend(self._feed_line(line))
+        return closed
+
+    def close(self) -> List[Tuple[str, str]]:
+        closed = []
+        if self._partial:
+            for line in self._partial.splitlines():
+                closed.extend(self._feed_line(line))
+            self._partial = ""
+        closed.extend(self._close_current())
+        self._current_key = None
+        return closed
 
-    return sections
+def parse_markdown_sections(markdown: str) -> Dict[str, str]:
+    parser = SectionStreamParser()
+    parser.feed(markdown)
+    parser.close()
+    return parser.sections
 
-def generate_analysis(idea: str, results: List[Dict], model_name=LLM_MODEL_NAME) -> Dict:
-    if not results:
-        return {
-            "idea": idea,
-            "analysis": {
-                "similarities": "",
-                "differences": "",
-                "suggestions": "",
-                "uniqueness_score": ""
-            }
+def empty_analysis(idea: str) -> Dict:
+    return {
+        "idea": idea,
+        "analysis": {
+            "similarities": "",
+            "differences": "",
+            "suggestions": "",
+            "uniqueness_score": ""
         }
+    }
 
+def build_analysis_prompt(idea: str, results: List[Dict]) -> str:
     company_blocks = "\n\n".join(format_company_block(company, i + 1) for i, company in enumerate(results))
 
-    prompt = ANALYSIS_PROMPT_TEMPLATE.format(
+    return ANALYSIS_PROMPT_TEMPLATE.format(
         idea=idea.strip(),
         n=len(results),
         company_blocks=company_blocks
     )
 
-    response = client.chat.completions.create(
+def generate_analysis(idea: str, results: List[Dict], model_name=LLM_MODEL_NAME) -> Dict:
+    if not results:
+        return empty_analysis(idea)
+
+    prompt = build_analysis_prompt(idea, results)
+
+    response = query_client.get().chat.completions.create(
         model=model_name,
         messages=[{"role": "user", "content": prompt}],
         temperature=0.7,
@@ -150,4 +181,57 @@ def generate_analysis(idea: str, results: List[Dict], model_name=LLM_MODEL_NAME)
     return {
         "idea": idea,
         "analysis": parsed
-    }
\ No newline at end of file
+    }
+
+# Same as generate_analysis on the async client
+async def generate_analysis_async(idea: str, results: List[Dict], model_name=LLM_MODEL_NAME) -> Dict:
+    if not results:
+        return empty_analysis(idea)
+
+    prompt = build_analysis_prompt(idea, results)
+
+    response = await query_async_client.get().chat.completions.create(
+        model=model_name,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.7,
+        max_tokens=1200
+    )
+
+    raw_output = response.choices[0].message.content.strip()
+    print("🧾 Raw model output:\n", raw_output)
+
+    return {
+        "idea": idea,
+        "analysis": parse_markdown_sections(raw_output)
+    }
+
+# Streams the analysis: {"event": "token"} per model chunk, {"event": "section"} as soon as
+# each section's header closes, then {"event": "done"} with the full parsed analysis
+async def stream_analysis_async(idea: str, results: List[Dict], model_name=LLM_MODEL_NAME) -> AsyncIterator[Dict]:
+    if not results:
+        yield {"event": "done", "data": empty_analysis(idea)}
+        return
+
+    prompt = build_analysis_prompt(idea, results)
+    stream = await query_async_client.get().chat.completions.create(
+        model=model_name,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.7,
+        max_tokens=1200,
+        stream=True
+    )
+
+    parser = SectionStreamParser()
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        token = chunk.choices[0].delta.content or ""
+        if not token:
+            continue
+        yield {"event": "token", "data": token}
+        for key, content in parser.feed(token):
+            yield {"event": "section", "data": {"key": key, "content": content}}
+
+    for key, content in parser.close():
+        yield {"event": "section", "data": {"key": key, "content": content}}
+    yield {"event": "done", "data": {"idea": idea, "analysis": parser.sections}}
\ No newline at end of file
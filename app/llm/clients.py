@@ -0,0 +1,18 @@
+# LLM clients, created on first use so importing app.llm modules doesn't construct (or even import) the SDK
+import os
+
+from app.utils.lazy import Lazy
+
+
+def _together(api_key_env: str):
+    from together import Together
+    return Together(api_key=os.getenv(api_key_env))
+
+def _async_together(api_key_env: str):
+    from together import AsyncTogether
+    return AsyncTogether(api_key=os.getenv(api_key_env))
+
+# query-time calls (expansion, analysis) and corpus enhancement use separate keys / quotas
+query_client = Lazy(lambda: _together("QUERY_LLM_API_KEY"), "query LLM client")
+query_async_client = Lazy(lambda: _async_together("QUERY_LLM_API_KEY"), "async query LLM client")
+corpus_client = Lazy(lambda: _together("CORPUS_LLM_API_KEY"), "corpus LLM client")
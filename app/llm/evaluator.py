@@ -1,26 +1,63 @@
-# not used
+# company scoring for retrieval: per-company aggregates, match_percent and uniqueness over flat match-score arrays
 from typing import List, Dict
 import numpy as np
 
-from typing import List, Dict
-import numpy as np
+# Convert L2 distances into similarity scores
+def sim(d): return np.exp(-d) # exponential decay making distant matches drop off faster
 
-def calculate_uniqueness(top_k_companies: List[Dict], expected_k: int = 5) -> int:
-    if not top_k_companies:
+def uniqueness_score(avg_scores: np.ndarray, min_scores: np.ndarray) -> int:
+    """0-100 from each company's average and best L2 distance; close matches lower it."""
+    if len(avg_scores) == 0:
         return 100
 
-
-    # Convert L2 distances into similarity scores
-    def sim(d): return np.exp(-d) # exponential decay making distant matches drop off faster
-
-    for company in top_k_companies:
-        chunk_scores = [match["score"] for match in company["matches"]]  # these are L2 distances
-        company["avg_score"] = np.mean(chunk_scores)  # <- new per-company signal
-
-    avg_sim = np.mean([sim(c["avg_score"]) for c in top_k_companies]) # base uniqueness score
-    max_sim = max(sim(c["min_score"]) for c in top_k_companies)
+    avg_sim = np.mean(sim(avg_scores)) # base uniqueness score
+    max_sim = np.max(sim(min_scores))
 
     combined = 0.2 * max_sim + 0.8 * avg_sim
 
     uniqueness = int((1 - combined) * 100)
-    return max(0, min(100, uniqueness))
\ No newline at end of file
+    return max(0, min(100, uniqueness))
+
+def score_companies(scores: np.ndarray, companies: np.ndarray, n_companies: int) -> Dict:
+    """
+    Score grouped matches in one vectorized pass. scores holds every match's (best, query-weighted) L2 distance
+    and companies its company's position (0..n_companies-1); a company's matches appear in its match order.
+    Returns per-company arrays avg_score (mean), min_score, match_percent (avg normalized by the
+    batch L2 range and inverted) plus the uniqueness of the whole batch.
+
+    Bit-identical to the per-company loops it replaces: match_percent comes from the match-order sum
+    (bincount adds sequentially, like sum()), avg_score from np.mean's pairwise sum (reduceat per segment),
+    and match_percent is rounded with round() since np.round can differ in the last digit.
+    """
+    if n_companies == 0:
+        return {"avg_score": np.empty(0), "min_score": np.empty(0), "match_percent": np.empty(0), "uniqueness": 100}
+    scores = np.asarray(scores, dtype=np.float64)
+    companies = np.asarray(companies, dtype=np.int64)
+
+    counts = np.bincount(companies, minlength=n_companies)
+    order = np.argsort(companies, kind="stable")  # each company's matches contiguous, still in match order
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    avg_score = np.add.reduceat(scores[order], starts) / counts
+    min_score = np.minimum.reduceat(scores[order], starts)
+
+    # Normalize l2 distance with dynamic range and invert to get match_percent
+    match_avg = np.bincount(companies, weights=scores, minlength=n_companies) / counts
+    l2_min, l2_max = scores.min(), scores.max()
+    if l2_max != l2_min:
+        normalized = (match_avg - l2_min) / (l2_max - l2_min)
+    else:
+        normalized = np.zeros(n_companies)  # all the same
+    match_percent = np.array([round(p, 4) for p in (1.0 - normalized).tolist()])
+
+    return {
+        "avg_score": avg_score,
+        "min_score": min_score,
+        "match_percent": match_percent,
+        "uniqueness": uniqueness_score(avg_score, min_score),
+    }
+
+def calculate_uniqueness(top_k_companies: List[Dict], expected_k: int = 5) -> int:
+    """Uniqueness of grouped companies (dicts with matches + min_score); the companies aren't modified."""
+    companies = list(top_k_companies)
+    avg_scores = np.array([np.mean([match["score"] for match in c["matches"]]) for c in companies])  # these are L2 distances
+    return uniqueness_score(avg_scores, np.array([c["min_score"] for c in companies]))
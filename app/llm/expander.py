@@ -1,14 +1,14 @@
-from together import Together
 from typing import List
-import os
 from dotenv import load_dotenv
 import json
+import hashlib
 
-from app.core.config import LLM_MODEL_NAME
+from app.core.config import LLM_MODEL_NAME, EXPANSION_CACHE_SIZE, EXPANSION_CACHE_TTL, EXPANSION_CACHE_DB
+from app.utils.cache import TTLCache, SqliteCache
+from app.llm.clients import query_client, query_async_client
 
 load_dotenv()
 
-client = Together(api_key=os.getenv("QUERY_LLM_API_KEY"))
 # --- Prompt Templates ---
 QUERY_EXPANSION_PROMPT_TEMPLATE = """
 Expand the following startup idea into {n_expansions} semantically diverse paraphrases. 
@@ -33,11 +33,61 @@ Startup Idea:
 \"\"\"{idea}\"\"\"
 """
 
+# Expansion cache - same idea (modulo case/whitespace), n_expansions and model -> same paraphrases
+# (the SQLite tier is opened on the first lookup, so importing this module touches no files)
+expansion_cache = TTLCache(
+    maxsize=EXPANSION_CACHE_SIZE,
+    ttl=EXPANSION_CACHE_TTL,
+    disk=SqliteCache(EXPANSION_CACHE_DB) if EXPANSION_CACHE_DB else None
+)
+
+def normalize_idea(idea: str) -> str:
+    return " ".join(idea.lower().split())
+
+def expansion_cache_key(idea: str, n_expansions: int, model_name: str) -> str:
+    raw = json.dumps([model_name, n_expansions, normalize_idea(idea)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
 # Query Expansion - user query -> list of semantically diverse paraphrases
-def expand_query(idea: str, n_expansions: int = 3) -> List[str]:
+def expand_query(idea: str, n_expansions: int = 3, model_name: str = LLM_MODEL_NAME) -> List[str]:
+    prompt = QUERY_EXPANSION_PROMPT_TEMPLATE.format(idea=idea, n_expansions=n_expansions)
+    response = query_client.get().chat.completions.create(
+        model=model_name,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return json.loads(response.choices[0].message.content.strip()) #returns list of n_expansions strings
+
+# Same as expand_query on the async client, so handlers don't block a thread on the round trip
+async def expand_query_async(idea: str, n_expansions: int = 3, model_name: str = LLM_MODEL_NAME) -> List[str]:
     prompt = QUERY_EXPANSION_PROMPT_TEMPLATE.format(idea=idea, n_expansions=n_expansions)
-    response = client.chat.completions.create(
-        model=LLM_MODEL_NAME,
+    response = await query_async_client.get().chat.completions.create(
+        model=model_name,
         messages=[{"role": "user", "content": prompt}]
     )
-    return json.loads(response.choices[0].message.content.strip()) #returns list of n_expansions strings
\ No newline at end of file
+    return json.loads(response.choices[0].message.content.strip())
+
+def _is_valid(expansions) -> bool:
+    return isinstance(expansions, list) and all(isinstance(e, str) for e in expansions)
+
+# Cached Query Expansion - only successful, well-formed expansions are cached
+def expand_query_cached(idea: str, n_expansions: int = 3, model_name: str = LLM_MODEL_NAME) -> List[str]:
+    key = expansion_cache_key(idea, n_expansions, model_name)
+    cached = expansion_cache.get(key)
+    if cached is not None:
+        return cached
+
+    expansions = expand_query(idea, n_expansions, model_name)
+    if _is_valid(expansions):
+        expansion_cache.set(key, expansions)
+    return expansions
+
+async def expand_query_cached_async(idea: str, n_expansions: int = 3, model_name: str = LLM_MODEL_NAME) -> List[str]:
+    key = expansion_cache_key(idea, n_expansions, model_name)
+    cached = await expansion_cache.get_async(key)  # SQLite tier off the event loop
+    if cached is not None:
+        return cached
+
+    expansions = await expand_query_async(idea, n_expansions, model_name)
+    if _is_valid(expansions):
+        await expansion_cache.set_async(key, expansions)
+    return expansions
\ No newline at end of file
@@ -1,17 +1,24 @@
-from together import Together
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Callable
-import os
 import time
 from tqdm import tqdm
 from dotenv import load_dotenv
 from datetime import datetime, timezone
 
-from app.core.config import LLM_MODEL_NAME
+from app.core.config import (
+    LLM_MODEL_NAME,
+    CORPUS_LLM_REQUESTS_PER_S,
+    CORPUS_LLM_TOKENS_PER_MIN,
+    CORPUS_LLM_WORKERS,
+    CORPUS_LLM_OUTPUT_TOKENS
+)
+from app.utils.rate_limiter import TokenBucketLimiter, rate_limit_delay
+from app.llm.clients import corpus_client
 
 load_dotenv()
 
-client = Together(api_key=os.getenv("CORPUS_LLM_API_KEY"))
+# one limiter for every thread calling the LLM, sized to the provider quota
+rate_limiter = TokenBucketLimiter(CORPUS_LLM_REQUESTS_PER_S, CORPUS_LLM_TOKENS_PER_MIN)
 
 CORPUS_DESCRIPTION_PROMPT_TEMPLATE = """
 You're an AI assistant helping analyze early-stage AI startups for comparison with other startup ideas in the future. 
@@ -75,24 +82,38 @@ def build_prompt(entry: dict) -> str:
             raise ValueError("Invalid entry type")
 
 
-def call_llm_with_retry(prompt: str, retries: int = 2, delay: float = 2.0) -> str:
+def estimate_tokens(prompt: str) -> int:
+    # ~4 characters per token, plus the completion we expect back
+    return len(prompt) // 4 + CORPUS_LLM_OUTPUT_TOKENS
+
+def call_llm_with_retry(prompt: str, retries: int = 2, delay: float = 2.0, limiter: TokenBucketLimiter = None) -> str:
+    limiter = limiter or rate_limiter
+    tokens = estimate_tokens(prompt)
     for attempt in range(retries):
+        limiter.acquire(tokens)  # 🧘 waits for the shared request / token budget
         try:
-            time.sleep(2)  # 🧘 1 QPS throttle
-            response = client.chat.completions.create(
+            response = corpus_client.get().chat.completions.create(
                 model=LLM_MODEL_NAME,
                 messages=[{"role": "user", "content": prompt}],
             )
+            limiter.on_success()
+            usage = getattr(response, "usage", None)
+            limiter.record_usage(tokens, getattr(usage, "total_tokens", None))
             return response.choices[0].message.content.strip()
         except Exception as e:
-            print(f"❌ Retry {attempt+1}: {e}")
-            time.sleep(delay * (2 ** attempt))
+            retry_after = rate_limit_delay(e)
+            if retry_after is not None:
+                pause = limiter.on_rate_limited(retry_after)
+                print(f"⏳ Rate limited (retry {attempt+1}), all workers pausing {pause:.1f}s at {limiter.rate:.2f} req/s")
+            else:
+                print(f"❌ Retry {attempt+1}: {e}")
+                time.sleep(delay * (2 ** attempt))
     return ""
 
-def standardize_entry(entry: dict, version: str) -> str:
+def standardize_entry(entry: dict, version: str, limiter: TokenBucketLimiter = None) -> dict:
     prompt = build_prompt(entry)
     try:
-        standardized = call_llm_with_retry(prompt)
+        standardized = call_llm_with_retry(prompt, limiter=limiter)
         if standardized:
             entry["standardized"] = standardized
             entry["isEnhanced"] = True
@@ -103,41 +124,51 @@ def standardize_entry(entry: dict, version: str) -> str:
         print(f"❌ Error standardizing entry {entry['id']}: {e}")
     return None
 
-# FOLLOWING IS NOT SUPPORTED BY TOGETHER.AI DUE TO 1 QPS LIMIT - but good to implement for future use
-# --- Batched, Threaded Standardization ---
-def standardize_batch(entries: List[dict], version: str) -> List[dict]:
+# --- Batched Standardization ---
+def standardize_batch(entries: List[dict], version: str, limiter: TokenBucketLimiter = None) -> List[dict]:
     enhanced = []
     for entry in entries:
-        result = standardize_entry(entry, version)
+        result = standardize_entry(entry, version, limiter)
         if result:
             enhanced.append(result)
     return enhanced
 
-# multi-threaded standardization - not supported by together.ai due to 1 QPS limit
+# --- Threaded Standardization ---
 def standardize_concurrently(
     entries: List[dict],
+    version: str,
     batch_size: int = 5,
-    max_workers: int = 8,
-    on_batch_complete: Callable[[List[dict]], None] = None
+    max_workers: int = CORPUS_LLM_WORKERS,
+    on_batch_complete: Callable[[List[dict], List[dict]], None] = None,
+    limiter: TokenBucketLimiter = None
 ) -> List[dict]:
-    global current_results
-    
-    results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = []
-        for i in range(0, len(entries), batch_size):
-            batch = entries[i:i + batch_size]
-            futures.append(executor.submit(standardize_batch, batch))
-
-        for future in tqdm(futures):
-            try:
-                batch_result = future.result()
-                results.extend(batch_result)
-                current_results.extend(batch_result)
-
+    """
+    Standardize entries on max_workers threads; throughput is set by the shared rate limiter, not the
+    thread count. Entries finish out of order, but on_batch_complete(enhanced, batch) runs on the calling
+    thread once per batch_size chunk, in input order, so a checkpoint always covers a prefix of the input.
+    If the callback raises, queued entries are cancelled (in-flight requests finish) and the error propagates.
+    Returns the enhanced entries in input order (failed entries are left out).
+    """
+    batches = [entries[i:i + batch_size] for i in range(0, len(entries), batch_size)]
+    results = [None] * len(entries)
+    pending = [len(batch) for batch in batches]
+    next_batch = 0
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {executor.submit(standardize_entry, entry, version, limiter): i for i, entry in enumerate(entries)}
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            i = futures[future]
+            results[i] = future.result()
+            pending[i // batch_size] -= 1
+            # flush every batch that is now complete and next in line
+            while next_batch < len(batches) and pending[next_batch] == 0:
+                start = next_batch * batch_size
+                enhanced = [r for r in results[start:start + batch_size] if r]
                 if on_batch_complete:
-                    on_batch_complete(batch_result)
-            except Exception as e:
-                print(f"❌ Error in batch: {e}")
+                    on_batch_complete(enhanced, batches[next_batch])
+                next_batch += 1
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
 
-    return results
\ No newline at end of file
+    return [r for r in results if r]
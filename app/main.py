@@ -1,9 +1,28 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import query, analyze 
+from app.routes import query, analyze, idea, metrics, admin, health
+from app.core.config import GENERATION_WATCH_INTERVAL, WARMUP_MODE
+from app.core.faiss_loader import start_generation_watcher
+from app.services.retriever import warm_up, warm_up_until_ready
+import asyncio
 import os
 
-app = FastAPI()
+# Imports stay cheap (model, LLM clients and indexes are lazy); this is where they get loaded
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_generation_watcher(GENERATION_WATCH_INTERVAL)
+    warming = None
+    if WARMUP_MODE == "blocking":
+        if not (await asyncio.to_thread(warm_up))["ready"]:
+            warming = asyncio.create_task(warm_up_until_ready())  # serve anyway; /api/ready says "failed" until a retry works
+    elif WARMUP_MODE == "background":
+        warming = asyncio.create_task(warm_up_until_ready())
+    yield
+    if warming is not None:
+        warming.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 FRONTEND_URL = (os.getenv("FRONTEND_URL") or "http://localhost:3000").rstrip("/")
 
@@ -25,3 +44,7 @@ async def log_origin_header(request: Request, call_next):
 
 app.include_router(query.router, prefix="/api")
 app.include_router(analyze.router, prefix="/api")
+app.include_router(idea.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(health.router, prefix="/api")
@@ -0,0 +1,24 @@
+import asyncio
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException
+from app.core.config import ADMIN_TOKEN
+from app.core.faiss_loader import current_generation, reload_generation
+
+router = APIRouter()
+
+def require_admin(x_admin_token: str = Header(default="")):
+    if ADMIN_TOKEN and not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+# Loads + warms the published generation on a side thread, then swaps it in; queries keep being served.
+# Only this worker swaps here, the generation watcher brings the other uvicorn workers along.
+@router.post("/admin/reload", dependencies=[Depends(require_admin)])
+async def reload_index(force: bool = False):
+    try:
+        return await asyncio.to_thread(reload_generation, force)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=409, detail=f"Reload failed, still serving the current generation: {e}")
+
+@router.get("/admin/generation", dependencies=[Depends(require_admin)])
+def generation():
+    return current_generation().info()
@@ -2,10 +2,15 @@ from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any
-from app.services.analyzer import generate_analysis
+from app.services.analyzer import generate_analysis_async, stream_analysis_async
+from app.utils.sse import sse_stream, SSEResponse
+from app.core.concurrency import ConcurrencyLimiter
+from app.core.config import MAX_CONCURRENT_ANALYSES, MAX_WAITING_REQUESTS
 
 router = APIRouter()
 
+analyze_limiter = ConcurrencyLimiter("analyze", MAX_CONCURRENT_ANALYSES, MAX_WAITING_REQUESTS)
+
 class MatchMetadata(BaseModel):
     type: str
     score: float
@@ -30,9 +35,17 @@ class AnalysisResponse(BaseModel):
     analysis: Dict[str, str]  # sections: similarities, differences, suggestions, uniqueness_score
 
 @router.post("/analyze", response_model=AnalysisResponse)
-def analyze(request: AnalysisRequest):
-    analysis = generate_analysis(request.idea, [company.model_dump() for company in request.results])
+async def analyze(request: AnalysisRequest):
+    async with analyze_limiter.slot():
+        analysis = await generate_analysis_async(request.idea, [company.model_dump() for company in request.results])
     return JSONResponse(content={
         "idea": request.idea,
         "analysis": analysis["analysis"]
-    })
\ No newline at end of file
+    })
+
+# SSE: "token" events as the model writes, a "section" event as each section closes, then "done"
+@router.post("/analyze/stream")
+async def analyze_stream(request: AnalysisRequest):
+    release = await analyze_limiter.hold()  # 429 before the stream opens, slot held until the response ends
+    results = [company.model_dump() for company in request.results]
+    return SSEResponse(sse_stream(stream_analysis_async(request.idea, results)), on_close=release)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Response
+from app.services.retriever import readiness
+
+router = APIRouter()
+
+# Liveness: the process is up and serving HTTP
+@router.get("/health")
+def health():
+    return {"status": "ok"}
+
+# Readiness: embedding model + index generation loaded; 503 until then (load balancers hold traffic back),
+# with status "failed" and warmup.error while warm-up keeps failing
+@router.get("/ready")
+def ready(response: Response):
+    status = readiness()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from pydantic import BaseModel
+from app.services.retriever import retrieve_top_k_async
+from app.services.analyzer import stream_analysis_async
+from app.routes.query import query_limiter
+from app.routes.analyze import analyze_limiter
+from app.utils.sse import sse_stream, SSEResponse
+
+router = APIRouter()
+
+class IdeaRequest(BaseModel):
+    idea: str
+    top_k: int = 5  # optional, default to 5
+
+# Fused query + analyze: retrieval results are streamed first, then the analysis runs
+# on the same in-process result dicts, so the client never uploads them back
+@router.post("/idea")
+async def idea(request: IdeaRequest):
+    release_query = await query_limiter.hold()  # 429 before the stream opens
+
+    async def events():
+        try:
+            results, uniqueness = await retrieve_top_k_async(request.idea, top_k=request.top_k)
+        finally:
+            release_query()
+        yield {"event": "results", "data": {"idea": request.idea, "results": results, "uniqueness": uniqueness}}
+
+        async with analyze_limiter.slot():
+            async for event in stream_analysis_async(request.idea, results):
+                yield event
+
+    # the response releases the query slot too, in case the client left before events() started
+    return SSEResponse(sse_stream(events()), on_close=release_query)
@@ -0,0 +1,23 @@
+import os
+from fastapi import APIRouter
+from app.services.retriever import query_encoder, query_embedding_cache, overfetch_stats
+from app.llm.expander import expansion_cache
+from app.routes.query import query_limiter
+from app.routes.analyze import analyze_limiter
+from app.utils.memory import memory_usage
+
+router = APIRouter()
+
+@router.get("/metrics")
+def metrics():
+    return {
+        "embed_batcher": query_encoder.stats(),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "expansion_cache": expansion_cache.stats(),
+        "overfetch": overfetch_stats.stats(),
+        "limiters": {
+            "query": query_limiter.stats(),
+            "analyze": analyze_limiter.stats(),
+        },
+        "worker": {"pid": os.getpid(), "memory_mb": memory_usage()},
+    }
@@ -1,10 +1,14 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import List, Dict
-from app.services.retriever import retrieve_top_k
+from app.services.retriever import retrieve_top_k_async
+from app.core.concurrency import ConcurrencyLimiter
+from app.core.config import MAX_CONCURRENT_QUERIES, MAX_WAITING_REQUESTS
 
 router = APIRouter()
 
+query_limiter = ConcurrencyLimiter("query", MAX_CONCURRENT_QUERIES, MAX_WAITING_REQUESTS)
+
 class QueryRequest(BaseModel):
     idea: str
     top_k: int = 5  # optional, default to 5
@@ -29,8 +33,9 @@ class QueryResponse(BaseModel):
     results: List[CompanyGroup]
 
 @router.post("/query", response_model=QueryResponse)
-def query_similar_ideas(request: QueryRequest):
-    results, uniqueness = retrieve_top_k(request.idea, top_k=request.top_k)
+async def query_similar_ideas(request: QueryRequest):
+    async with query_limiter.slot():
+        results, uniqueness = await retrieve_top_k_async(request.idea, top_k=request.top_k)
     return {
         "idea": request.idea,
         "results": results,
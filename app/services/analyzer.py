@@ -1,5 +1,13 @@
 from app.llm.analyzer import generate_analysis as llm_generate_analysis
-from typing import List, Dict
+from app.llm.analyzer import generate_analysis_async as llm_generate_analysis_async
+from app.llm.analyzer import stream_analysis_async as llm_stream_analysis_async
+from typing import List, Dict, AsyncIterator
 
 def generate_analysis(idea: str, results: List[Dict]) -> Dict:
-    return llm_generate_analysis(idea, results)
\ No newline at end of file
+    return llm_generate_analysis(idea, results)
+
+async def generate_analysis_async(idea: str, results: List[Dict]) -> Dict:
+    return await llm_generate_analysis_async(idea, results)
+
+def stream_analysis_async(idea: str, results: List[Dict]) -> AsyncIterator[Dict]:
+    return llm_stream_analysis_async(idea, results)
\ No newline at end of file
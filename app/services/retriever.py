@@ -1,68 +1,265 @@
+import asyncio
+import threading
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from dotenv import load_dotenv
-import json
-from app.llm.expander import expand_query
-from app.llm.evaluator import calculate_uniqueness
+from app.llm.expander import expand_query_cached, expand_query_cached_async, expansion_cache
+from app.llm.evaluator import calculate_uniqueness, score_companies
 
 load_dotenv()
 
-from app.core.faiss_loader import get_faiss_resources
-from app.core.config import EMBED_MODEL_NAME, RAW_CORPUS_PATH
+from app.core.faiss_loader import IndexGeneration, current_generation, get_meta_store, live_generation, pinned_generation, warm_generation
+from app.core.meta_store import RESPONSE_FIELDS, PRODUCT_FIELDS, GROUPING_FIELDS
+from app.core.index_factory import ENTRY_TYPES, encode_ids, decode_ids, search_index
+from app.core.config import EMBED_MODEL_NAME, INDEX_LAYOUT, QUERY_EMBED_CACHE_BYTES, EMBED_BATCH_WINDOW_MS, EMBED_MAX_BATCH
+from app.core.config import RETRIEVAL_OVERFETCH, OVERFETCH_START_RATIO, OVERFETCH_MAX_RATIO, RETRIEVAL_MODE, COARSE_COMPANY_RATIO
+from app.core.config import WARMUP_RETRY_S, WARMUP_RETRY_MAX_S
+from app.core.concurrency import run_cpu
+from app.utils.cache import VectorCache
+from app.utils.batcher import MicroBatcher
+from app.utils.lazy import Lazy
 
-# Initialize the embedding model globally
-model = SentenceTransformer(EMBED_MODEL_NAME)
+def _load_embedder():
+    from sentence_transformers import SentenceTransformer  # imports torch, so only when the model is needed
+    return SentenceTransformer(EMBED_MODEL_NAME)
+
+# Embedding model, loaded on first encode or by warm_up() (app startup), not at import
+embedder = Lazy(_load_embedder, f"embedding model {EMBED_MODEL_NAME}")
+
+# Query vectors keyed by content hash; namespaced by model name so a model change drops them
+query_embedding_cache = VectorCache(max_bytes=QUERY_EMBED_CACHE_BYTES, namespace=EMBED_MODEL_NAME)
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    return embedder.get().encode(
+        texts,
+        convert_to_numpy=True, 
+        normalize_embeddings=True, # must match index creation
+        show_progress_bar=False,
+        batch_size=EMBED_MAX_BATCH,
+        num_workers=0
+    )
+
+# Coalesces cache misses from concurrent requests into one forward pass
+query_encoder = MicroBatcher(_encode_batch, window_ms=EMBED_BATCH_WINDOW_MS, max_batch=EMBED_MAX_BATCH)
+
+# Source codes used in candidate arrays -> SOURCE_TYPES[code] is the entry type
+SOURCE_TYPES = ENTRY_TYPES
+
+
+class OverfetchStats:
+    """Per-query over-fetch ratio (hits per index per query / top_k) of search_vectors, for /metrics."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"queries": 0, "searches": 0, "underfilled": 0, "capped": 0, "ratio_total": 0, "ratio_max": 0, "ratios": {}}
+
+    def record(self, ratio: int, searches: int, underfilled: bool, capped: bool):
+        with self._lock:
+            s = self._stats
+            s["queries"] += 1
+            s["searches"] += searches
+            s["underfilled"] += underfilled
+            s["capped"] += capped
+            s["ratio_total"] += ratio
+            s["ratio_max"] = max(s["ratio_max"], ratio)
+            s["ratios"][ratio] = s["ratios"].get(ratio, 0) + 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            s = dict(self._stats, ratios=dict(sorted(self._stats["ratios"].items())))
+        s["ratio_mean"] = round(s.pop("ratio_total") / s["queries"], 3) if s["queries"] else 0.0
+        return s
+
+overfetch_stats = OverfetchStats()
 
 def create_query_expansions(raw_query: str, n_expansions: int = 2) -> List[str]:
     """Expand a user query into semantically diverse paraphrases."""
     try:
-        expanded_queries = expand_query(raw_query, n_expansions)
-        print(f"Expanded query: {expanded_queries}")
+        expanded_queries = expand_query_cached(raw_query, n_expansions)
+        print(f"Expanded query: {expanded_queries} | cache: {expansion_cache.stats()}")
         return expanded_queries # as list of n_expansions strings
     except Exception as e:
         print(f"⚠️ Query expansion failed: {e}")
         expanded_queries = [raw_query] # fallback to original query
     return expanded_queries
+
+async def create_query_expansions_async(raw_query: str, n_expansions: int = 2) -> List[str]:
+    """Async create_query_expansions: the LLM round trip doesn't hold a thread."""
+    try:
+        expanded_queries = await expand_query_cached_async(raw_query, n_expansions)
+        print(f"Expanded query: {expanded_queries} | cache: {expansion_cache.stats()}")
+        return expanded_queries
+    except Exception as e:
+        print(f"⚠️ Query expansion failed: {e}")
+    return [raw_query] # fallback to original query
         
 # Embedding user prompt query into dense vector -> single query
-def embed_queries(queries: List[str], weights: List[float]) -> np.ndarray:
-    """Embed a list of query expansions into vectors."""
-    return model.encode(
-        queries,
-        weights=weights,
-        convert_to_numpy=True, 
-        normalize_embeddings=True, # must match index creation
-        show_progress_bar=True,
-        batch_size=16,
-        num_workers=0
-    )
+def embed_queries(queries: List[str]) -> np.ndarray:
+    """Embed a list of query expansions into vectors. Only cache misses hit the model, via the micro-batcher."""
+    return query_embedding_cache.get_or_compute(queries, query_encoder.submit, namespace=EMBED_MODEL_NAME)
 
-def extract_product_description_meta(id: str) -> Dict:
+async def embed_queries_async(queries: List[str]) -> np.ndarray:
+    """Async embed_queries: waits on the micro-batcher without holding an executor thread."""
+    found, missing = query_embedding_cache.lookup(queries, namespace=EMBED_MODEL_NAME)
+    if missing:
+        vectors = await query_encoder.submit_async(missing)
+        query_embedding_cache.store(missing, vectors)
+        found.update(zip(missing, vectors))
+    return np.stack([found[q] for q in queries])
+
+def extract_product_description_meta(id: str, store=None) -> Dict:
     """
     Extract product metadata from a comment entry using raw_corpus (not enhanced).
     In raw_corpus, all comments have a corresponding description entry, 
     but not necessarily in enhanced_corpus, as we are randomly batching comments and descriptions.
+    Lookup is a point read in the metadata store instead of scanning the corpus.
+    """
+    return (store or get_meta_store()).company_description(id, PRODUCT_FIELDS)
+
+def merge_search_results(
+    searches: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+    weights: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flatten batched FAISS results into candidate arrays (indices, scores, source codes).
+    Each search is (scores, rows, source codes) shaped (n_queries, k); codes may be a
+    single SOURCE_TYPES code for the whole search (one search per entry type) or per hit.
+    The returned scores are weighted distances (L2 distance / query weight), sorted ascending:
+    a hit from the raw query (weight 2) counts at half its distance, so it wins the per-match
+    dedupe and pulls its company up in match_percent and uniqueness (dedupe_by_company).
     """
-    total_corpus = json.load(open(RAW_CORPUS_PATH))
-    for entry in total_corpus:
-        if entry.get("company_id") == id:
-            return entry
+    all_indices, all_scores, all_sources = [], [], []
+    for scores, indices, codes in searches:
+        codes = np.broadcast_to(np.asarray(codes, dtype=np.int8), indices.shape)
+        valid = indices >= 0  # FAISS pads with -1 when an index has fewer than k entries
+        all_indices.append(indices[valid])
+        all_scores.append((scores / weights[:, None])[valid])
+        all_sources.append(codes[valid])
+
+    scores = np.concatenate(all_scores)
+    order = np.argsort(scores, kind="stable")
+    return (
+        np.concatenate(all_indices)[order],
+        scores[order],
+        np.concatenate(all_sources)[order],
+    )
+
+def _company_filter_rows(store, company_ids: List[str], code: int) -> np.ndarray:
+    return np.asarray(store.company_rows(list(company_ids), SOURCE_TYPES[code]), dtype=np.int64)
+
+def select_companies(query_vecs: np.ndarray, n_companies: int, generation: IndexGeneration) -> List[str]:
+    """Coarse pass: company_ids of the n_companies nearest company centroids of each query, first-seen order."""
+    _, rows = search_index(generation.index("company"), query_vecs, n_companies)
+    company_ids = generation.company_ids()
+    return [company_ids[row] for row in dict.fromkeys(rows.ravel().tolist()) if row >= 0]
+
+def search_split(
+    query_vecs: np.ndarray,
+    search_limit: int,
+    entry_types: List[str],
+    company_ids: List[str] = None,
+    type_quotas: Dict[str, int] = None,
+    generation: IndexGeneration = None
+) -> List[Tuple]:
+    """One batched search per entry type index (default layout)."""
+    generation = generation or current_generation()
+    searches = []
+    for entry_type in entry_types:
+        code = SOURCE_TYPES.index(entry_type)
+        index = generation.index(entry_type)
+        k = min(search_limit, (type_quotas or {}).get(entry_type, search_limit))
+
+        allowed = None
+        if company_ids is not None:
+            allowed = _company_filter_rows(generation.meta_store(), company_ids, code)
+            if len(allowed) == 0:
+                continue
+
+        scores, rows = search_index(index, query_vecs, k, ids=allowed)
+        searches.append((scores, rows, code))
+    return searches
+
+def search_unified(
+    query_vecs: np.ndarray,
+    search_limit: int,
+    entry_types: List[str],
+    company_ids: List[str] = None,
+    type_quotas: Dict[str, int] = None,
+    generation: IndexGeneration = None
+) -> List[Tuple]:
+    """
+    One batched search over the unified index for all entry types: k is the sum of the per-type budgets
+    search_split uses (search_limit, capped by type_quotas), restricted to the requested types (or, with
+    company_ids, to their rows of those types in one id selector), then each type keeps its first budget
+    hits per query. The pool is the nearest hits across types: a type crowded out by closer hits of
+    another gets fewer candidates than in search_split, whose hits per type are a superset of these.
+    """
+    generation = generation or current_generation()
+    budgets = {}
+    for entry_type in entry_types:
+        k = min(search_limit, (type_quotas or {}).get(entry_type, search_limit))
+        if k > 0:
+            budgets[SOURCE_TYPES.index(entry_type)] = k
+    if not budgets:
+        return []
+
+    allowed, allowed_codes = None, (list(budgets) if len(budgets) < len(SOURCE_TYPES) else None)
+    if company_ids is not None:
+        store = generation.meta_store()
+        allowed = np.concatenate([encode_ids(code, _company_filter_rows(store, company_ids, code)) for code in budgets])
+        allowed_codes = None
+        if len(allowed) == 0:
+            return []
+
+    scores, ids = search_index(generation.index("unified"), query_vecs, sum(budgets.values()), ids=allowed, type_codes=allowed_codes)
+    codes, rows = decode_ids(ids)
+    # hits come sorted by distance: the running count per type marks hits past that type's budget
+    keep = rows >= 0
+    for code, k in budgets.items():
+        of_type = keep & (codes == code)
+        keep &= ~of_type | (np.cumsum(of_type, axis=1) <= k)
+    return [(scores, np.where(keep, rows, -1), codes)]
+
+def load_grouping_rows(candidates: Tuple[np.ndarray, np.ndarray, np.ndarray], store) -> Dict[int, Dict[int, Dict]]:
+    """id/company_id projections of the candidate rows: source code -> {row: doc}, one store read per entry type."""
+    indices, _, sources = candidates
+    grouping = {}
+    for code in np.unique(sources).tolist():
+        rows = indices[sources == code].tolist()
+        grouping[code] = dict(zip(rows, store.get_rows(SOURCE_TYPES[code], rows, GROUPING_FIELDS)))
+    return grouping
+
+def count_companies(grouping: Dict[int, Dict[int, Dict]]) -> int:
+    return len({doc.get("company_id") for docs in grouping.values() for doc in docs.values()} - {None, ""})
 
 def dedupe_by_company(
-    results: List[tuple], 
-    desc_meta: List[Dict], 
-    comm_meta: List[Dict], 
-    top_k: int = 5
+    candidates: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    store,
+    top_k: int = 5,
+    grouping: Dict[int, Dict[int, Dict]] = None
 ) -> List[Dict]:
     """
     Group matches by companyId. Aggregate scores and return top_k unique companies.
+    candidates is the (indices, scores, source codes) arrays from merge_search_results,
+    store is the metadata store the indices point into. Grouping only reads id/company_id
+    (pass grouping from load_grouping_rows if already loaded); full match documents are
+    fetched for the returned top_k companies only.
     """
     company_groups = {}
+    match_rows = {}   # (company_id, source_id) -> (source, row) of the best-scoring hit
+    match_index = {}  # (company_id, source_id) -> slot of that match, so repeats are found in O(1)
+    # flat per-match arrays for scoring (app.llm.evaluator.score_companies), indexed by slot
+    match_dicts, match_scores, match_companies = [], [], []
+    company_position = {}  # company_id -> position in company_groups
+
+    indices, scores, sources = candidates
+    print(f"Deduplicating {len(indices)} results...")
+    grouping = grouping or load_grouping_rows(candidates, store)
 
-    print(f"Deduplicating {len(results)} results...")
-    for idx, score, source in results:
-        doc = desc_meta[idx] if source == "description" else comm_meta[idx]
+    # One pass: each candidate is an O(1) dict lookup
+    for idx, score, code in zip(indices.tolist(), scores.tolist(), sources.tolist()):
+        source = SOURCE_TYPES[code]
+        doc = grouping[code][idx]
         company_id = doc.get("company_id")
         source_id = doc.get("id")
 
@@ -72,15 +269,17 @@ def dedupe_by_company(
         # Initialize company group if it doesn't exist
         # Company groups are stored as a dictionary, each containing:
         # - company_id: company ID
-        # - product_meta: metadata for the company - scraped once
-        # - min_score: minimum similarity score
+        # - product_meta: metadata for the company - scraped once (filled in for the top_k below)
+        # - min_score: minimum similarity score (set with the other metrics after deduplication)
         # - match_percent: percentage of matches found in the company
         # - matches: list of matches
-        if company_id not in company_groups:
-            company_groups[company_id] = {
+        company = company_groups.get(company_id)
+        if company is None:
+            company_position[company_id] = len(company_groups)
+            company = company_groups[company_id] = {
                 "company_id": company_id,
-                "product_meta": doc if source == "description" else extract_product_description_meta(company_id),
-                "min_score": float(score),
+                "product_meta": (source, idx) if source == "description" else None,
+                "min_score": 0,
                 "matches": [],
 
                 # metrics that are calculated after deduplication
@@ -92,79 +291,215 @@ def dedupe_by_company(
         # - type: "description" or "comment"
         # - score: similarity score
         # - match_meta: metadata for the matched document
-        # Use a mapping from source_id to match index for fast lookup
-        existing_ids = {match["match_meta"]["id"]: idx for idx, match in enumerate(company_groups[company_id]["matches"])}
-
-        if source_id in existing_ids:
-            existing_match = company_groups[company_id]["matches"][existing_ids[source_id]]
+        key = (company_id, source_id)
+        slot = match_index.get(key)
+        if slot is None:
+            match = {"type": source, "score": float(score), "match_meta": doc}
+            company["matches"].append(match)
+            match_index[key] = len(match_dicts)
+            match_dicts.append(match)
+            match_scores.append(match["score"])
+            match_companies.append(company_position[company_id])
+            match_rows[key] = (source, idx)
+        elif score < match_scores[slot]:
             # Keep the lower (better) L2 score
-            if score < existing_match["score"]:
-                existing_match["score"] = float(score)
-                existing_match["match_meta"] = doc
-        else:
-            company_groups[company_id]["matches"].append({
-                "type": source,
-                "score": float(score),
-                "match_meta": doc
-            })
-
-            
-
-        # Update minimum score if current match is better
-        if score < company_groups[company_id]["min_score"]:
-            company_groups[company_id]["min_score"] = float(score)
-
-    # Calculate avg_score and match_percent for each company
-    # Normalize l2 distance with dynamic range and invert to get match_percent
-    all_l2 = [match["score"] for company in company_groups.values() for match in company["matches"]]
-    L2_MIN = min(all_l2)
-    L2_MAX = max(all_l2)
-
-    for company in company_groups.values():
-        avg_l2 = sum(m["score"] for m in company["matches"]) / len(company["matches"])
-        company["avg_score"] = avg_l2
-        
-        # Normalize with batch range
-        if L2_MAX != L2_MIN:
-            normalized = (avg_l2 - L2_MIN) / (L2_MAX - L2_MIN)
+            match_dicts[slot]["score"] = match_scores[slot] = float(score)
+            match_rows[key] = (source, idx)
+
+    if not company_groups:
+        return [], calculate_uniqueness([], top_k)
+
+    # avg_score, min_score, match_percent (batch-normalized) and uniqueness in one vectorized pass
+    scored = score_companies(np.asarray(match_scores), np.asarray(match_companies), len(company_groups))
+    uniqueness = scored["uniqueness"]
+
+    # Return top_k companies by match_percent; stable, so ties keep first-seen order as sorted(reverse=True) did
+    companies = list(company_groups.values())
+    top = np.argsort(-scored["match_percent"], kind="stable")[:top_k].tolist()
+    top_companies = [companies[i] for i in top]
+    for company, i in zip(top_companies, top):
+        company["min_score"] = scored["min_score"][i].item()
+        company["avg_score"] = scored["avg_score"][i].item()
+        company["match_percent"] = scored["match_percent"][i].item()
+    hydrate_companies(top_companies, match_rows, store)
+    return top_companies, uniqueness
+
+def hydrate_companies(companies: List[Dict], match_rows: Dict[Tuple[str, str], Tuple[str, int]], store):
+    """Replace grouping projections with response projections, one store read per entry type."""
+    wanted = {}
+    for company in companies:
+        for match in company["matches"]:
+            source, row = match_rows[(company["company_id"], match["match_meta"]["id"])]
+            wanted.setdefault(source, set()).add(row)
+    docs = {}
+    for source, rows in wanted.items():
+        rows = sorted(rows)
+        docs[source] = dict(zip(rows, store.get_rows(source, rows, RESPONSE_FIELDS)))
+
+    for company in companies:
+        for match in company["matches"]:
+            source, row = match_rows[(company["company_id"], match["match_meta"]["id"])]
+            match["match_meta"] = docs[source][row]
+        if company["product_meta"] is None:
+            company["product_meta"] = extract_product_description_meta(company["company_id"], store)
         else:
-            normalized = 0.0  # all the same
-        company["match_percent"] = round(1.0 - normalized, 4)
+            source, row = company["product_meta"]
+            company["product_meta"] = {field: docs[source][row][field] for field in PRODUCT_FIELDS if field in docs[source][row]}
 
-    # Return top_k companies sorted by minimum score + uniqueness score
-    return sorted(company_groups.values(), key=lambda x: x["match_percent"], reverse=True)[:top_k], calculate_uniqueness(company_groups.values(), top_k)
 
+# -----STARTUP-----
+warmup_state = {"started_at": None, "finished_at": None, "warmup_s": None, "error": None, "attempts": 0}
 
-def retrieve_top_k(raw_query: str, top_k: int = 5) -> List[Dict]:
+def warm_up() -> Dict:
     """
-    Given a startup idea (query), retrieve top_k most relevant entries
-    across both description and comment indexes, ranked by similarity.
+    Load the embedding model and the current index generation, then encode one text and search each index,
+    so the first request pays no load cost. Called on app startup (WARMUP_MODE); safe to call again.
     """
-    # -----EXPAND & EMBED QUERY-----
-    expanded_queries = create_query_expansions(raw_query)  # expand raw query into n_expansions strings
-    queries = [raw_query] + expanded_queries
-    weights = [2.0] + [1.0] * len(expanded_queries)
-    query_vecs = embed_queries(queries, weights)  # embed all expansions
+    warmup_state.update(started_at=time.time(), finished_at=None, error=None, attempts=warmup_state["attempts"] + 1)
+    start = time.perf_counter()
+    try:
+        _encode_batch(["warm up"])
+        warm_generation()
+    except Exception as e:
+        warmup_state["error"] = f"{type(e).__name__}: {e}"
+        print(f"❌ Warm-up failed: {e}")
+    warmup_state.update(finished_at=time.time(), warmup_s=round(time.perf_counter() - start, 3))
+    return readiness()
+
+async def warm_up_until_ready(retry_s: float = None) -> Dict:
+    """
+    warm_up() on a thread until an attempt succeeds, waiting retry_s (default WARMUP_RETRY_S, doubling up to
+    WARMUP_RETRY_MAX_S) between failures. Readiness probes hold traffic back while warm-up fails, so no query
+    would ever load the model or indexes lazily; retrying is what lets /api/ready recover.
+    """
+    retry_s = WARMUP_RETRY_S if retry_s is None else retry_s
+    while True:
+        status = await asyncio.to_thread(warm_up)
+        if warmup_state["error"] is None:
+            return status
+        print(f"🔁 Retrying warm-up in {retry_s:.0f}s")
+        await asyncio.sleep(retry_s)
+        retry_s = min(retry_s * 2, WARMUP_RETRY_MAX_S)
+
+def readiness() -> Dict:
+    """
+    Whether the embedding model and the live index generation are loaded (never loads anything itself).
+    status is "ready", "warming" (attempt in progress), "failed" (last attempt raised, error in warmup) or "cold".
+    """
+    generation = live_generation()
+    indexes_loaded = generation is not None and bool(generation.loaded_indexes())
+    ready = embedder.loaded and indexes_loaded
+    if ready:
+        status = "ready"
+    elif warmup_state["error"] is not None:
+        status = "failed"
+    elif warmup_state["started_at"] is not None and warmup_state["finished_at"] is None:
+        status = "warming"
+    else:
+        status = "cold"
+    return {
+        "ready": ready,
+        "status": status,
+        "embedder": embedder.info(),
+        "indexes": generation.info() if generation is not None else None,
+        "warmup": dict(warmup_state),
+    }
+
+def query_weights(expanded_queries: List[str]) -> List[float]:
+    return [2.0] + [1.0] * len(expanded_queries)  # raw query counts double
+
+def search_vectors(
+    query_vecs: np.ndarray,
+    weights: List[float],
+    top_k: int = 5,
+    entry_types: List[str] = None,
+    company_ids: List[str] = None,
+    type_quotas: Dict[str, int] = None,
+    layout: str = INDEX_LAYOUT,
+    overfetch: str = RETRIEVAL_OVERFETCH,
+    mode: str = RETRIEVAL_MODE,
+    generation: IndexGeneration = None
+) -> List[Dict]:
+    """
+    CPU side of retrieval: search the embedded raw + expanded queries, group by company.
+    Optional filters: entry_types (e.g. ["description"]), company_ids, and
+    type_quotas capping hits per type per query. layout is "split" or "unified".
+    overfetch="adaptive" widens the search (doubling k) until the candidates cover top_k
+    distinct companies, within OVERFETCH_MAX_RATIO * top_k; "fixed" searches top_k * 2 once.
+    mode="coarse" first picks top_k * COARSE_COMPANY_RATIO companies per query from the company
+    centroid index, then searches only their chunks (exact distances with flat indexes);
+    "chunks" searches every chunk. Coarse needs a company index and no company_ids filter.
+    generation defaults to the live one, pinned for the whole search (pinned_generation()).
+    """
+    if layout == "unified":
+        search = search_unified
+    elif layout == "split":
+        search = search_split
+    else:
+        raise ValueError(f"Unknown index layout: {layout}")
+    if overfetch == "adaptive":
+        search_limit, max_limit = top_k * OVERFETCH_START_RATIO, top_k * max(OVERFETCH_START_RATIO, OVERFETCH_MAX_RATIO)
+    elif overfetch == "fixed":
+        search_limit = max_limit = top_k * 2  # to increase candidate pool and avoid company overlap
+    else:
+        raise ValueError(f"Unknown over-fetch mode: {overfetch}")
+    if mode not in ("chunks", "coarse"):
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+
+    with pinned_generation(generation) as generation:  # a hot swap mid-request can't mix index and metadata rows
+        # -----SEARCH ALL EXPANSIONS (one batched call per index)-----
+        query_vecs = np.ascontiguousarray(query_vecs, dtype=np.float32)  # (n_queries, dim) for FAISS
+        weights = np.asarray(weights, dtype=np.float32)
+        entry_types = list(entry_types or SOURCE_TYPES)
+        store = generation.meta_store()
 
-    # -----LOAD INDEXES-----
-    desc_index, desc_meta = get_faiss_resources("description")
-    comm_index, comm_meta = get_faiss_resources("comment")
+        # -----COARSE: CANDIDATE COMPANIES FROM THE CENTROID INDEX-----
+        # chunk search below is then restricted to their rows, so its cost follows top_k, not corpus size
+        if mode == "coarse" and company_ids is None and generation.has_index("company"):
+            company_ids = select_companies(query_vecs, top_k * COARSE_COMPANY_RATIO, generation)
+            print(f"Coarse: {len(company_ids)} candidate companies from the company index")
 
-    # -----SEARCH EACH EXPANSION-----
-    all_results = []
-    search_limit = top_k * 2  # to increase candidate pool and avoid company overlap
+        wanted = top_k if company_ids is None else min(top_k, len(set(company_ids)))  # a filter can't yield more companies than it names
 
-    for vec in query_vecs:
-        vec = vec.reshape(1, -1)  # (dim,) → (1, dim) for FAISS
-        desc_scores, desc_indices = desc_index.search(vec, search_limit)
-        comm_scores, comm_indices = comm_index.search(vec, search_limit)
-        for idx, i in enumerate(desc_indices[0]):
-            all_results.append((i, desc_scores[0][idx], "description"))
+        n_searches, n_candidates = 0, -1
+        while True:
+            n_searches += 1
+            searches = search(query_vecs, search_limit, entry_types, company_ids, type_quotas, generation)
+            if not searches:
+                return [], calculate_uniqueness([], top_k)
+            candidates = merge_search_results(searches, weights)
+            grouping = load_grouping_rows(candidates, store)
+            n_companies = count_companies(grouping)
+            # stop once top_k companies are covered, at the budget, or when a wider search found nothing new (index/filter exhausted)
+            if n_companies >= wanted or search_limit >= max_limit or len(candidates[0]) <= n_candidates:
+                break
+            n_candidates = len(candidates[0])
+            search_limit = min(search_limit * 2, max_limit)
 
-        for idx, i in enumerate(comm_indices[0]):
-            all_results.append((i, comm_scores[0][idx], "comment"))
+        ratio = search_limit // max(top_k, 1)
+        overfetch_stats.record(ratio, n_searches, n_companies < wanted, n_companies < wanted and search_limit >= max_limit)
+        print(f"Over-fetch: {ratio}x top_k ({search_limit} hits per index per query), {n_searches} search(es), {n_companies} companies")
 
+        # -----DEDUPLICATE & SORT COMBINED RESULTS-----
+        # Merge both sources and return unified top_k list
+        return dedupe_by_company(candidates, store, top_k=top_k, grouping=grouping)
 
-    # -----DEDUPLICATE & SORT COMBINED RESULTS-----
-    # Merge both sources and return unified top_k list
-    return dedupe_by_company(all_results, desc_meta, comm_meta, top_k=top_k)
\ No newline at end of file
+def retrieve_top_k(raw_query: str, top_k: int = 5, **filters) -> List[Dict]:
+    """
+    Given a startup idea (query), retrieve top_k most relevant entries
+    across both description and comment indexes, ranked by similarity.
+    filters are passed to search_vectors (entry_types, company_ids, type_quotas, layout, overfetch, mode, generation).
+    """
+    # -----EXPAND & EMBED QUERY-----
+    expanded_queries = create_query_expansions(raw_query)  # expand raw query into n_expansions strings
+    query_vecs = embed_queries([raw_query] + expanded_queries)  # embed all expansions
+    return search_vectors(query_vecs, query_weights(expanded_queries), top_k, **filters)
+
+async def retrieve_top_k_async(raw_query: str, top_k: int = 5, **filters) -> List[Dict]:
+    """
+    Async retrieve_top_k for the API: expansion awaits the async LLM client, embedding
+    is coalesced with concurrent requests by the micro-batcher, FAISS runs on the CPU executor.
+    """
+    expanded_queries = await create_query_expansions_async(raw_query)
+    query_vecs = await embed_queries_async([raw_query] + expanded_queries)
+    return await run_cpu(search_vectors, query_vecs, query_weights(expanded_queries), top_k, **filters)
\ No newline at end of file
@@ -0,0 +1,108 @@
+# request-coalescing micro-batcher: concurrent callers share one encode() forward pass
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects texts submitted from many threads and encodes them together.
+    A batch is flushed once max_batch texts are pending or window_ms has passed
+    since the first pending text, whichever comes first. Each caller blocks until
+    its own rows come back.
+    """
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], window_ms: float = 5.0, max_batch: int = 64):
+        self.encode = encode
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []  # (texts, future, enqueued_at)
+        self._pending_texts = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stats = {"batches": 0, "texts": 0, "requests": 0, "max_batch_seen": 0, "wait_ms_total": 0.0}
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+            self._thread.start()
+
+    def submit_future(self, texts: List[str]) -> Future:
+        """Queue texts for the next batch; the future resolves to their (n, dim) rows."""
+        future = Future()
+        with self._cond:
+            self._ensure_worker()
+            self._pending.append((list(texts), future, time.perf_counter()))
+            self._pending_texts += len(texts)
+            self._cond.notify()
+        return future
+
+    def submit(self, texts: List[str]) -> np.ndarray:
+        """Encode texts as part of the next batch; blocks until the rows are ready."""
+        return self.submit_future(texts).result()
+
+    async def submit_async(self, texts: List[str]) -> np.ndarray:
+        """Awaitable submit for the event loop; no executor thread is held while waiting."""
+        return await asyncio.wrap_future(self.submit_future(texts))
+
+    def _take_batch(self) -> list:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = self._pending[0][2] + self.window
+            while self._pending_texts < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # take whole requests up to max_batch texts (always at least one request)
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch):
+                item = self._pending.pop(0)
+                batch.append(item)
+                size += len(item[0])
+            self._pending_texts -= size
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            texts = [text for item in batch for text in item[0]]
+            started = time.perf_counter()
+            try:
+                vectors = np.asarray(self.encode(texts), dtype=np.float32)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future, enqueued_at in batch:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+                self._stats["wait_ms_total"] += (started - enqueued_at) * 1000
+
+            self._stats["batches"] += 1
+            self._stats["texts"] += len(texts)
+            self._stats["requests"] += len(batch)
+            self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(texts))
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        batches = max(stats["batches"], 1)
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": stats["batches"],
+            "requests": stats["requests"],
+            "texts": stats["texts"],
+            "avg_batch_size": stats["texts"] / batches,
+            "avg_requests_per_batch": stats["requests"] / batches,
+            "max_batch_seen": stats["max_batch_seen"],
+            "avg_queue_wait_ms": stats["wait_ms_total"] / max(stats["requests"], 1),
+            "pending_texts": self._pending_texts,
+        }
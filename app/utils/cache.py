@@ -0,0 +1,234 @@
+# in-process caches: LRU + TTL values (optional SQLite tier shared across workers) and float32 embedding rows
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.lazy import Lazy
+
+
+class SqliteCache:
+    """
+    Tiny key -> JSON value store with per-entry expiry.
+    WAL mode so several uvicorn workers can read while one writes.
+    The file (and its directory) is only created on the first get / set, so declaring one at import costs nothing.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = Lazy(self._connect, f"SQLite cache {path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        conn.commit()
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._connection.get()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl)
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),)).rowcount
+            self._conn.commit()
+        return deleted
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries expire after ttl seconds.
+    Misses fall through to the optional disk tier before counting as a miss.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, disk: Optional[SqliteCache] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk = disk
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _get_memory(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                if item[0] >= time.time():
+                    self._data.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return item[1]
+                del self._data[key]  # expired
+        return None
+
+    def _fill_from_disk(self, key: str, value: Optional[Any]) -> Optional[Any]:
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._put(key, value, time.time())
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        return self._fill_from_disk(key, self.disk.get(key) if self.disk else None)
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        """get() for the event loop: the SQLite tier is read on a worker thread."""
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        return self._fill_from_disk(key, await asyncio.to_thread(self.disk.get, key) if self.disk else None)
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._put(key, value, time.time())
+        if self.disk:
+            self.disk.set(key, value, self.ttl)
+
+    async def set_async(self, key: str, value: Any):
+        """set() for the event loop: the SQLite write runs on a worker thread."""
+        with self._lock:
+            self._put(key, value, time.time())
+        if self.disk:
+            await asyncio.to_thread(self.disk.set, key, value, self.ttl)
+
+    def _put(self, key: str, value: Any, now: float):
+        self._data[key] = (now + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._data), "maxsize": self.maxsize}
+
+
+class VectorCache:
+    """
+    Content-hash keyed cache of float32 embedding rows, capped at max_bytes.
+    Rows live in one preallocated matrix; the least recently used slot is reused when full.
+    The namespace (e.g. the embedding model name) is part of the cache identity:
+    a different namespace drops every cached row.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, namespace: str = ""):
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        self._matrix = None           # (capacity, dim) float32, allocated on first store
+        self._slots = OrderedDict()   # content hash -> row in _matrix, oldest first
+        self._free = []
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _reset(self, namespace: str):
+        self.namespace = namespace
+        self._matrix = None
+        self._slots.clear()
+        self._free = []
+
+    def _allocate(self, dim: int):
+        capacity = max(1, self.max_bytes // (dim * 4))
+        self._matrix = np.empty((capacity, dim), dtype=np.float32)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def _store(self, key: str, vector: np.ndarray):
+        if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+            self._slots.clear()
+            self._allocate(vector.shape[0])
+        if key in self._slots:
+            slot = self._slots[key]
+            self._slots.move_to_end(key)
+        elif self._free:
+            slot = self._free.pop()
+            self._slots[key] = slot
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self._stats["evictions"] += 1
+            self._slots[key] = slot
+        self._matrix[slot] = vector
+
+    def lookup(self, texts: List[str], namespace: str = None) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """
+        Split texts into cached rows ({text: vector}) and misses (deduplicated, first-seen order).
+        A namespace different from the cache's drops every cached row first.
+        """
+        with self._lock:
+            if namespace is not None and namespace != self.namespace:
+                self._reset(namespace)
+            found, missing = {}, []
+            for text in dict.fromkeys(texts):
+                key = self.content_hash(text)
+                if key in self._slots:
+                    self._slots.move_to_end(key)
+                    found[text] = self._matrix[self._slots[key]].copy()
+                else:
+                    missing.append(text)
+            self._stats["hits"] += sum(1 for text in texts if text in found)
+            self._stats["misses"] += len(missing)
+        return found, missing
+
+    def store(self, texts: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                self._store(self.content_hash(text), vector)
+
+    def get_or_compute(
+        self,
+        texts: List[str],
+        encode: Callable[[List[str]], np.ndarray],
+        namespace: str = None
+    ) -> np.ndarray:
+        """
+        Return an (n, dim) float32 matrix for texts, calling encode once with only
+        the cache misses (deduplicated, in first-seen order).
+        """
+        found, missing = self.lookup(texts, namespace)
+        if missing:
+            vectors = np.asarray(encode(missing), dtype=np.float32)
+            self.store(missing, vectors)
+            found.update(zip(missing, vectors))
+        return np.stack([found[text] for text in texts])
+
+    def clear(self):
+        with self._lock:
+            self._reset(self.namespace)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            capacity = 0 if self._matrix is None else self._matrix.shape[0]
+            return {**self._stats, "size": len(self._slots), "capacity": capacity}
@@ -0,0 +1,60 @@
+# streaming corpus files for imports into / exports from the corpus database (app/core/corpus_db.py):
+# one JSON record per line (.jsonl), optionally zstd-compressed (.jsonl.zst). Legacy .json arrays are
+# still readable (loaded whole) for migration; files may repeat an id, and the database upserts keep the last one.
+import io
+import json
+import os
+from typing import Dict, Iterable, Iterator
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for .zst corpora
+    zstandard = None
+
+ZSTD_LEVEL = 10
+
+
+def _open_text(path: str, mode: str):
+    """Text handle for path in mode "r" or "w"; .zst files are read across zstd frames."""
+    if not path.endswith(".zst"):
+        return open(path, mode, encoding="utf-8")
+    if zstandard is None:
+        raise RuntimeError(f"{path} is zstd-compressed: pip install zstandard")
+    raw = open(path, mode + "b")
+    if mode == "r":
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+    else:
+        stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Stream records from path (missing file = no records)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    skipped = 0
+    with _open_text(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                skipped += 1  # a record whose write was interrupted
+    if skipped:
+        print(f"⚠️ Skipped {skipped} truncated record(s) in {path}")
+
+def write_records(path: str, records: Iterable[Dict]) -> int:
+    """Replace path with records (streamed to a temp file, then renamed). Returns the count."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = os.path.join(os.path.dirname(path), ".tmp-" + os.path.basename(path))  # keeps the .zst suffix
+    count = 0
+    with _open_text(tmp_path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
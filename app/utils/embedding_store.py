@@ -0,0 +1,123 @@
+# on-disk embedding store for index builds: append-only float32 rows + content hash -> row index
+import os
+import re
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app.utils.cache import VectorCache
+
+VECTORS_NAME = "vectors.f32"
+INDEX_NAME = "index.sqlite"
+SQLITE_MAX_PARAMS = 900
+
+
+def embedding_store_dir(root: str, model_name: str) -> str:
+    """One store per embedding model under root, e.g. .cache/embeddings/sentence-transformers__all-mpnet-base-v2."""
+    return os.path.join(root, re.sub(r"[^A-Za-z0-9._-]+", "__", model_name))
+
+
+class EmbeddingStore:
+    """
+    Persistent embedding rows keyed by the content hash of the embedded text.
+    vectors.f32 only ever grows (row i at byte offset i * dim * 4); index.sqlite maps hash -> row
+    and records the model name, normalization flag and dim. Opening the store with a different
+    model or normalization raises instead of handing back vectors from another embedding space.
+    """
+    def __init__(self, directory: str, model_name: str, normalize: bool):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, VECTORS_NAME)
+        self._conn = sqlite3.connect(os.path.join(directory, INDEX_NAME))
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS rows (hash TEXT PRIMARY KEY, row INTEGER NOT NULL) WITHOUT ROWID")
+        self._conn.commit()
+        self.stats = {"hits": 0, "misses": 0}
+
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        expected = {"model_name": model_name, "normalize": str(bool(normalize))}
+        for key, value in expected.items():
+            if key in meta and meta[key] != value:
+                raise ValueError(
+                    f"Embedding store {directory} holds {key}={meta[key]}, refusing to reuse it for {key}={value}"
+                )
+        self._conn.executemany("INSERT OR IGNORE INTO meta VALUES (?, ?)", expected.items())
+        self._conn.commit()
+        self.dim = int(meta["dim"]) if "dim" in meta else None
+        self.size = self._recover()
+
+    def _recover(self) -> int:
+        # vectors are appended before their hashes are committed: drop any tail an interrupted add left behind
+        size = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+        valid_bytes = size * self.dim * 4 if self.dim is not None else 0
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) > valid_bytes:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return size
+
+    def _vectors(self) -> np.ndarray:
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.size, self.dim))
+
+    def lookup(self, texts: List[str]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """Split texts into stored vectors ({text: vector}) and misses (deduplicated, first-seen order)."""
+        unique = list(dict.fromkeys(texts))
+        hashes = {VectorCache.content_hash(text): text for text in unique}
+        rows = {}
+        keys = list(hashes)
+        for i in range(0, len(keys), SQLITE_MAX_PARAMS):
+            chunk = keys[i:i + SQLITE_MAX_PARAMS]
+            query = f"SELECT hash, row FROM rows WHERE hash IN ({','.join('?' * len(chunk))})"
+            rows.update(self._conn.execute(query, chunk))
+
+        found = {}
+        if rows:
+            order = sorted(rows, key=rows.get)  # sequential reads through the file
+            vectors = np.array(self._vectors()[[rows[h] for h in order]])
+            found = {hashes[h]: vector for h, vector in zip(order, vectors)}
+        missing = [text for text in unique if text not in found]
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(missing)
+        return found, missing
+
+    def add(self, texts: List[str], vectors: np.ndarray):
+        """Append vectors for texts (already stored hashes are skipped)."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self.dim),))
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding store {self.directory} holds dim={self.dim}, got vectors of dim {vectors.shape[1]}")
+
+        new = {}
+        for text, vector in zip(texts, vectors):
+            key = VectorCache.content_hash(text)
+            if key not in new and self._conn.execute("SELECT 1 FROM rows WHERE hash = ?", (key,)).fetchone() is None:
+                new[key] = vector
+        if not new:
+            self._conn.commit()
+            return
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.stack(list(new.values())).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._conn.executemany("INSERT INTO rows VALUES (?, ?)", ((key, self.size + i) for i, key in enumerate(new)))
+        self._conn.commit()
+        self.size += len(new)
+
+    def get_or_compute(self, texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Return an (n, dim) float32 matrix for texts, calling encode once with only the texts
+        not stored yet, and storing what it returns.
+        """
+        found, missing = self.lookup(texts)
+        if missing:
+            vectors = np.asarray(encode(missing), dtype=np.float32)
+            self.add(missing, vectors)
+            found.update(zip(missing, vectors))
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.stack([found[text] for text in texts])
+
+    def close(self):
+        self._conn.close()
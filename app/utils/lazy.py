@@ -0,0 +1,42 @@
+# lazily constructed, thread-safe singletons for heavy resources (embedding model, LLM clients)
+import threading
+import time
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    Builds its value with factory() on the first get(), once, even when many threads ask at the same time
+    (double-checked lock). Importing a module that declares one costs nothing; a failed build raises
+    to the caller and is retried on the next get().
+    """
+    def __init__(self, factory: Callable[[], T], name: str = None):
+        self._factory = factory
+        self.name = name or getattr(factory, "__name__", "lazy")
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_s: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+
+    def get(self) -> T:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    self._value = self._factory()
+                    self.load_s = time.perf_counter() - start
+                    self.loaded_at = time.time()
+                    self._loaded = True
+                    print(f"⚙️ Loaded {self.name} in {self.load_s:.2f}s")
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def info(self) -> Dict:
+        return {"name": self.name, "loaded": self._loaded, "load_s": round(self.load_s, 3) if self.load_s is not None else None,
+                "loaded_at": self.loaded_at}
@@ -0,0 +1,21 @@
+# per-process memory usage, split into private heap vs. file-backed (mmapped, shareable) pages
+import resource
+from typing import Dict
+
+
+def memory_usage() -> Dict[str, float]:
+    """
+    Resident memory of this process in MB. On Linux rss_file is the mmapped / page-cache part
+    (shared between uvicorn workers), rss_anon the worker's private heap.
+    """
+    usage = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile"):
+                    usage[{"VmRSS": "rss", "RssAnon": "rss_anon", "RssFile": "rss_file"}[key]] = int(value.split()[0]) / 1024
+    except OSError:
+        # not Linux: peak RSS only (KB on Linux/BSD, bytes on macOS; this branch is mostly macOS)
+        usage["rss_peak"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+    return {key: round(value, 1) for key, value in usage.items()}
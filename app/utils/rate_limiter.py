@@ -0,0 +1,123 @@
+# token-bucket rate limiter shared by LLM worker threads: requests/s + tokens/min, adaptive on 429s
+import email.utils
+import threading
+import time
+from datetime import timezone
+from typing import Mapping, Optional
+
+MAX_BACKOFF = 120.0  # seconds, cap for 429 backoff without a retry-after header
+RATE_LIMIT_ERROR = "RateLimitError"  # together / openai SDK exception class, matched by name so neither is imported
+
+
+def retry_after_seconds(headers: Optional[Mapping]) -> Optional[float]:
+    """Seconds to wait from retry-after-ms / retry-after (delta seconds or HTTP date) headers."""
+    if not headers:
+        return None
+    headers = {str(k).lower(): v for k, v in dict(headers).items()}
+    try:
+        if "retry-after-ms" in headers:
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        if "retry-after" in headers:
+            value = str(headers["retry-after"])
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                when = email.utils.parsedate_to_datetime(value)
+                if when.tzinfo is None:  # "-0000" dates parse naive; they are UTC, not local time
+                    when = when.replace(tzinfo=timezone.utc)
+                return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def rate_limit_delay(error: Exception) -> Optional[float]:
+    """
+    None if error isn't a rate limit, else the server's retry-after in seconds (0.0 when it didn't send one).
+    A rate limit is an HTTP 429 status on the error (directly or via .response) or an SDK RateLimitError;
+    the message text is never parsed, so a 429 in some other error's body doesn't count.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "http_status", None) or getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429 and not any(cls.__name__ == RATE_LIMIT_ERROR for cls in type(error).__mro__):
+        return None
+    delay = retry_after_seconds(getattr(error, "headers", None) or getattr(response, "headers", None))
+    return delay if delay is not None else 0.0
+
+
+class TokenBucketLimiter:
+    """
+    Two token buckets shared by all worker threads: requests (refilled at requests_per_s, bursts of
+    up to one second's worth) and LLM tokens (refilled at tokens_per_min, 0 = unlimited).
+    acquire() blocks until both have room. On a 429 every worker pauses for the retry-after
+    (or an exponential backoff) and the request rate is halved; successes win it back gradually.
+    """
+    def __init__(self, requests_per_s: float, tokens_per_min: float = 0, min_rate_ratio: float = 0.125):
+        if requests_per_s <= 0:
+            raise ValueError(f"requests_per_s must be > 0 (CORPUS_LLM_REQUESTS_PER_S), got {requests_per_s}")
+        if tokens_per_min < 0:
+            raise ValueError(f"tokens_per_min must be >= 0 (CORPUS_LLM_TOKENS_PER_MIN, 0 = unlimited), got {tokens_per_min}")
+        self.max_rate = float(requests_per_s)
+        self.rate = self.max_rate
+        self.min_rate = self.max_rate * min_rate_ratio
+        self.tokens_per_s = tokens_per_min / 60.0
+        self._request_capacity = max(1.0, self.max_rate)
+        self._token_capacity = float(tokens_per_min)
+        self._requests = 1.0  # start with a single request's allowance, no initial burst
+        self._tokens = self._token_capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._strikes = 0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "waited_s": 0.0}
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        paused_elapsed = max(0.0, now - max(self._updated, self._paused_until))  # no request refill while paused
+        self._updated = now
+        self._requests = min(self._request_capacity, self._requests + paused_elapsed * self.rate)
+        if self.tokens_per_s:
+            self._tokens = min(self._token_capacity, self._tokens + elapsed * self.tokens_per_s)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until a request costing ~tokens may be sent; returns the seconds waited."""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                tokens = min(tokens, self._token_capacity) if self.tokens_per_s else 0
+                wait = self._paused_until - now
+                if wait <= 0:
+                    request_short = 1.0 - self._requests
+                    token_short = tokens - self._tokens if self.tokens_per_s else 0.0
+                    if request_short <= 0 and token_short <= 0:
+                        self._requests -= 1.0
+                        self._tokens -= tokens
+                        waited = now - start
+                        self.stats["requests"] += 1
+                        self.stats["waited_s"] += waited
+                        return waited
+                    wait = max(request_short / self.rate, token_short / self.tokens_per_s if self.tokens_per_s else 0.0)
+            time.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Charge the difference once the response reports its real token usage."""
+        if self.tokens_per_s and actual_tokens is not None:
+            with self._lock:
+                self._tokens -= actual_tokens - min(estimated_tokens, self._token_capacity)
+
+    def on_success(self):
+        with self._lock:
+            self._strikes = 0
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> float:
+        """Pause all workers and halve the rate; returns the pause in seconds."""
+        with self._lock:
+            self._strikes += 1
+            self.stats["rate_limited"] += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = retry_after if retry_after else min(MAX_BACKOFF, 2.0 ** self._strikes)
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._requests = min(self._requests, 0.0)  # no burst right after the pause
+            return pause
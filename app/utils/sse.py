@@ -0,0 +1,40 @@
+# Server-Sent Events framing for StreamingResponse bodies
+import json
+from typing import Any, AsyncIterator, Callable, Dict
+
+from fastapi.responses import StreamingResponse
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # keep reverse proxies from buffering the stream
+}
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def sse_stream(events: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    """Frame {"event", "data"} dicts as SSE; a failure mid-stream is sent as an error event."""
+    try:
+        async for event in events:
+            yield format_sse(event["event"], event["data"])
+    except Exception as e:
+        print(f"❌ Stream failed: {e}")
+        yield format_sse("error", {"detail": str(e)})
+
+
+class SSEResponse(StreamingResponse):
+    """
+    text/event-stream response that calls on_close() once the response has ended, however it ends:
+    stream finished or failed, or the client gone before the body was iterated (a generator that
+    never started never runs its finally). Used to hand back concurrency slots the handler acquired.
+    """
+    def __init__(self, content: AsyncIterator[str], on_close: Callable[[], None] = None):
+        super().__init__(content, media_type="text/event-stream", headers=SSE_HEADERS)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
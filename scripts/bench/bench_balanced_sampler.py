@@ -0,0 +1,64 @@
+# benchmark: per-batch cost of drawing balanced enhancement batches (scripts/corpus/enhance_ph_corpus)
+# before: filter all remaining entries against seen_ids + re-partition by type on every batch, O(N) per batch
+# after:  BalancedSampler swap-remove pools, O(batch) per batch
+import argparse
+import random
+import time
+
+from scripts.bench.bench_utils import latency_stats, time_calls, print_latency_table, make_synthetic_corpus
+from scripts.corpus.balanced_sampler import BalancedSampler
+
+
+def legacy_balanced_batch(remaining, seen_ids, batch_size=5, desc_ratio=0.4):
+    available = [entry for entry in remaining if entry["id"] not in seen_ids]
+    if not available:
+        return []
+    descriptions = [e for e in available if e["type"] == "description"]
+    comments = [e for e in available if e["type"] == "comment"]
+    desc_sample_size = max(1, int(batch_size * desc_ratio))
+    comment_sample_size = batch_size - desc_sample_size
+    batch = random.sample(descriptions, min(desc_sample_size, len(descriptions))) \
+        + random.sample(comments, min(comment_sample_size, len(comments)))
+    random.shuffle(batch)
+    return batch
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=50, help="batches timed for the legacy sampler")
+    args = parser.parse_args()
+
+    corpus = make_synthetic_corpus(args.entries // 3)[:args.entries]
+    n_batches = len(corpus) // args.batch_size + (len(corpus) % args.batch_size > 0)
+    print(f"{len(corpus)} entries, batch size {args.batch_size}, {n_batches} batches per full run\n")
+
+    seen_ids = set()
+    def before():
+        seen_ids.update(entry["id"] for entry in legacy_balanced_batch(corpus, seen_ids, args.batch_size))
+
+    sampler = BalancedSampler(corpus, seed=0)
+    def after():
+        sampler.sample(args.batch_size)
+
+    before_stats = latency_stats(time_calls(before, args.runs))
+    after_stats = latency_stats(time_calls(after, args.runs))
+    print_latency_table({"before (filter)": before_stats, "after (pools)": after_stats})
+
+    # whole run with the new sampler; the legacy one is extrapolated from its per-batch mean
+    sampler = BalancedSampler(corpus, seed=0)
+    start = time.perf_counter()
+    drawn = 0
+    while batch := sampler.sample(args.batch_size):
+        drawn += len(batch)
+    full_run_s = time.perf_counter() - start
+    print(f"\nfull run: after {full_run_s:.2f} s ({drawn} entries drawn), "
+          f"before ~{before_stats['mean'] * n_batches / 1000:.0f} s (extrapolated)")
+
+    # same seed, same batches
+    first, second = BalancedSampler(corpus, seed=42), BalancedSampler(corpus, seed=42)
+    assert all([e["id"] for e in first.sample(args.batch_size)] == [e["id"] for e in second.sample(args.batch_size)]
+               for _ in range(100))
+
+if __name__ == "__main__":
+    main()
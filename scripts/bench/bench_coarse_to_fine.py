@@ -0,0 +1,85 @@
+# benchmark: chunk search cost as comments per company grow, full chunk search vs coarse-to-fine
+# before: exact search over every description + comment chunk
+# after:  nearest company centroids first (top_k * COARSE_COMPANY_RATIO), then exact search over their chunks only
+# Synthetic clustered vectors; recall is the overlap of the top_k companies (by best chunk) with the full search.
+import argparse
+import os
+import tempfile
+
+import faiss
+import numpy as np
+
+from app.core.config import COARSE_COMPANY_RATIO, COMPANY_CENTROID_DESC_WEIGHT
+from app.core.index_factory import MemmapFlatIndex, build_index, save_mmap_vectors
+from scripts.bench.bench_utils import latency_stats, time_calls, print_latency_table
+from scripts.rag.build_corpus_index import company_centroids
+
+
+def make_chunks(n_companies: int, per_company: int, dim: int, rng):
+    """One description + per_company comments per company, scattered around a company center."""
+    centers = rng.standard_normal((n_companies, dim)).astype(np.float32)
+    owners = np.repeat(np.arange(n_companies), per_company + 1)
+    vectors = centers[owners] + 0.8 * rng.standard_normal((len(owners), dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    is_description = np.zeros(len(owners), dtype=bool)
+    is_description[::per_company + 1] = True
+    return vectors, owners, is_description
+
+def top_companies(scores: np.ndarray, rows: np.ndarray, owners: np.ndarray, top_k: int) -> list:
+    best = {}
+    for score, row in zip(scores.ravel().tolist(), rows.ravel().tolist()):
+        if row >= 0:
+            company = int(owners[row])
+            best[company] = min(best.get(company, score), score)
+    return sorted(best, key=best.get)[:top_k]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--per-company", type=int, nargs="+", default=[4, 16, 64], help="comments per company")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=3, help="raw query + expansions per request")
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    k = args.top_k * 2
+    with tempfile.TemporaryDirectory(prefix="bench-coarse-") as tmp_dir:
+        for per_company in args.per_company:
+            vectors, owners, is_description = make_chunks(args.companies, per_company, args.dim, rng)
+            chunk_path = os.path.join(tmp_dir, f"chunks_{per_company}.faiss")
+            save_mmap_vectors(build_index(vectors, "flat"), chunk_path)
+            chunks = MemmapFlatIndex(chunk_path)
+
+            metas = {
+                "description": [{"company_id": f"c{c}"} for c in owners[is_description].tolist()],
+                "comment": [{"company_id": f"c{c}"} for c in owners[~is_description].tolist()],
+            }
+            embeddings = {"description": vectors[is_description], "comment": vectors[~is_description]}
+            company_ids, centroids = company_centroids(metas, embeddings, COMPANY_CENTROID_DESC_WEIGHT)
+            company_rows = {f"c{company}": rows for company, rows in enumerate(np.split(np.arange(len(owners)), args.companies))}
+
+            queries = vectors[rng.choice(len(vectors), args.queries, replace=False)] + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+            queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+            def full():
+                return chunks.search(queries, k)
+
+            def coarse():
+                _, nearest = faiss.knn(queries, centroids, args.top_k * COARSE_COMPANY_RATIO)
+                selected = [company_ids[i] for i in dict.fromkeys(nearest.ravel().tolist())]
+                return chunks.search(queries, k, ids=np.concatenate([company_rows[c] for c in selected]))
+
+            truth = top_companies(*full(), owners, args.top_k)
+            found = top_companies(*coarse(), owners, args.top_k)
+            recall = len(set(truth) & set(found)) / len(truth)
+            print(f"\n{per_company} comments per company: {len(vectors)} chunks, {len(company_ids)} companies, "
+                  f"company recall@{args.top_k} {recall:.2f}")
+            print_latency_table({
+                "full chunk search": latency_stats(time_calls(full, args.runs)),
+                "coarse-to-fine": latency_stats(time_calls(coarse, args.runs)),
+            })
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# benchmark: per-query cost of resolving product descriptions for comment-first companies
+# before:   full parse + linear scan of the raw corpus per company (old extract_product_description_meta)
+# registry: in-memory company registry built from the whole raw corpus per worker (previous fallback)
+# after:    indexed point query on the corpus database (faiss_loader.describe_company)
+# End to end: retrieve_top_k over a synthetic generation (flat indexes + SQLite metadata store), with the
+# expansions and query vectors pre-cached so the timings cover search, grouping and description lookups only.
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Dict, Iterable
+
+import faiss
+import numpy as np
+
+from app.core.config import CORPUS_DB_PATH, LLM_MODEL_NAME
+from app.core.corpus_db import CorpusDB
+from app.core.faiss_loader import IndexGeneration
+from app.core.generations import generation_paths
+from app.core.index_factory import ENTRY_TYPES, build_index
+from app.core.meta_store import build_meta_store
+from app.llm.expander import expansion_cache, expansion_cache_key
+from app.services import retriever
+from app.utils.corpus_io import read_records, write_records
+from scripts.bench.bench_utils import latency_stats, time_calls, print_latency_table, make_synthetic_corpus
+
+
+def legacy_lookup(corpus_path: str, company_id: str):
+    for entry in read_records(corpus_path):
+        if entry.get("company_id") == company_id:
+            return entry
+
+def build_company_registry(corpus: Iterable[Dict]) -> Dict[str, Dict]:
+    registry = {}
+    for entry in corpus:
+        if entry.get("company_id") and entry.get("type") == "description":
+            registry[entry["company_id"]] = entry
+    return registry
+
+def build_generation(generation_dir: str, db: CorpusDB, dim: int, rng) -> IndexGeneration:
+    """Flat index + metadata rows per entry type and the SQLite metadata store, random unit vectors."""
+    paths = generation_paths(generation_dir)
+    metas = {entry_type: list(db.iter_entries(entry_type=entry_type)) for entry_type in ENTRY_TYPES}
+    for entry_type, meta in metas.items():
+        vectors = rng.standard_normal((len(meta), dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        faiss.write_index(build_index(vectors, "flat"), paths[entry_type])
+    build_meta_store(paths["meta_store"], metas, metas["description"])
+    return IndexGeneration(None, paths)
+
+def seed_query_caches(ideas, dim: int, rng):
+    """Expansions + query vectors for each idea, so retrieve_top_k makes no LLM call and loads no model."""
+    expansion_cache.disk = None  # keep synthetic expansions out of the shared SQLite tier
+    for idea in ideas:
+        expansions = [f"{idea} (paraphrase {i})" for i in range(2)]
+        expansion_cache.set(expansion_cache_key(idea, 2, LLM_MODEL_NAME), expansions)
+        vectors = rng.standard_normal((3, dim)).astype(np.float32)
+        retriever.query_embedding_cache.store([idea] + expansions, vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic companies instead of the corpus database")
+    parser.add_argument("--lookups", type=int, default=5, help="comment-first companies per query")
+    parser.add_argument("--top-k", type=int, default=5, help="companies per retrieve_top_k call")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory(prefix="bench-lookup-")
+    if args.synthetic or not os.path.exists(CORPUS_DB_PATH):
+        n_companies = args.synthetic or 20000
+        print(f"Using synthetic corpus with {n_companies} companies")
+        db = CorpusDB(os.path.join(tmp_dir.name, "corpus.sqlite"))
+        db.upsert_entries(make_synthetic_corpus(n_companies))
+    else:
+        db = CorpusDB(CORPUS_DB_PATH)
+
+    try:
+        # the scan baseline reads a JSONL export of the same entries
+        corpus_path = os.path.join(tmp_dir.name, "raw_corpus_bench.jsonl")
+        n_entries = write_records(corpus_path, db.iter_entries())
+        company_ids = [entry["company_id"] for entry in db.iter_entries(entry_type="description")]
+        start = time.perf_counter()
+        registry = build_company_registry(db.iter_entries())
+        registry_ms = (time.perf_counter() - start) * 1000
+        rng = random.Random(0)
+
+        def before():
+            for company_id in rng.sample(company_ids, args.lookups):
+                legacy_lookup(corpus_path, company_id)
+
+        def from_registry():
+            for company_id in rng.sample(company_ids, args.lookups):
+                registry.get(company_id)
+
+        def after():
+            for company_id in rng.sample(company_ids, args.lookups):
+                db.company_description(company_id)
+
+        print(f"{n_entries} entries, {args.lookups} description lookups per query, {args.runs} queries")
+        print(f"registry build (per worker, at first lookup): {registry_ms:.1f} ms\n")
+        print_latency_table({
+            "before (scan)": latency_stats(time_calls(before, args.runs)),
+            "registry (in memory)": latency_stats(time_calls(from_registry, args.runs)),
+            "after (corpus db)": latency_stats(time_calls(after, args.runs)),
+        })
+
+        # -----END TO END: retrieve_top_k-----
+        np_rng = np.random.default_rng(0)
+        generation_dir = os.path.join(tmp_dir.name, "generation")
+        os.makedirs(generation_dir)
+        generation = build_generation(generation_dir, db, args.dim, np_rng)
+        ideas = [f"bench idea {i}" for i in range(args.runs + 1)]
+        seed_query_caches(ideas, args.dim, np_rng)
+
+        def query_loop():
+            calls = iter(ideas * 2)
+            return lambda: retriever.retrieve_top_k(next(calls), args.top_k, generation=generation, overfetch="fixed")
+
+        current = retriever.extract_product_description_meta
+        try:
+            retriever.extract_product_description_meta = lambda company_id, store=None: legacy_lookup(corpus_path, company_id)
+            before_ms = time_calls(query_loop(), args.runs)
+        finally:
+            retriever.extract_product_description_meta = current
+        after_ms = time_calls(query_loop(), args.runs)
+
+        print(f"\nretrieve_top_k end to end (top_k={args.top_k}, raw query + 2 expansions, flat indexes)")
+        print_latency_table({
+            "before (scan)": latency_stats(before_ms),
+            "after (metadata store)": latency_stats(after_ms),
+        })
+    finally:
+        db.close()
+        tmp_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
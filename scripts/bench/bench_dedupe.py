@@ -0,0 +1,130 @@
+# benchmark: company grouping cost in dedupe_by_company with large top_k and many query expansions
+# before: per-candidate rebuild of the company's source_id map + extra full passes + full sort, O(matches^2) per company
+# after:  persistent (company, source_id) map, scoring on flat match-score arrays (app.llm.evaluator.score_companies)
+# A few companies own most comments, so repeated hits pile up on the same companies.
+import argparse
+import copy
+
+import numpy as np
+
+from app.core.meta_store import ListMetaStore, GROUPING_FIELDS
+from app.services.retriever import SOURCE_TYPES, dedupe_by_company, hydrate_companies, merge_search_results
+from scripts.bench.bench_utils import latency_stats, time_calls, print_latency_table
+
+
+def legacy_calculate_uniqueness(top_k_companies, expected_k=5):
+    if not top_k_companies:
+        return 100
+    def sim(d): return np.exp(-d)
+    for company in top_k_companies:
+        chunk_scores = [match["score"] for match in company["matches"]]
+        company["avg_score"] = np.mean(chunk_scores)
+    avg_sim = np.mean([sim(c["avg_score"]) for c in top_k_companies])
+    max_sim = max(sim(c["min_score"]) for c in top_k_companies)
+    combined = 0.2 * max_sim + 0.8 * avg_sim
+    return max(0, min(100, int((1 - combined) * 100)))
+
+def legacy_dedupe_by_company(candidates, store, top_k=5):
+    company_groups = {}
+    match_rows = {}
+    indices, scores, sources = candidates
+    grouping = {}
+    for code in np.unique(sources).tolist():
+        rows = indices[sources == code].tolist()
+        grouping[code] = dict(zip(rows, store.get_rows(SOURCE_TYPES[code], rows, GROUPING_FIELDS)))
+
+    for idx, score, code in zip(indices.tolist(), scores.tolist(), sources.tolist()):
+        source = SOURCE_TYPES[code]
+        doc = grouping[code][idx]
+        company_id = doc.get("company_id")
+        source_id = doc.get("id")
+        if not company_id:
+            continue
+        if company_id not in company_groups:
+            company_groups[company_id] = {
+                "company_id": company_id,
+                "product_meta": (source, idx) if source == "description" else None,
+                "min_score": float(score),
+                "matches": [],
+                "match_percent": 0,
+                "avg_score": 0,
+            }
+        existing_ids = {match["match_meta"]["id"]: i for i, match in enumerate(company_groups[company_id]["matches"])}
+        if source_id in existing_ids:
+            existing_match = company_groups[company_id]["matches"][existing_ids[source_id]]
+            if score < existing_match["score"]:
+                existing_match["score"] = float(score)
+                match_rows[(company_id, source_id)] = (source, idx)
+        else:
+            company_groups[company_id]["matches"].append({"type": source, "score": float(score), "match_meta": doc})
+            match_rows[(company_id, source_id)] = (source, idx)
+        if score < company_groups[company_id]["min_score"]:
+            company_groups[company_id]["min_score"] = float(score)
+
+    if not company_groups:
+        return [], legacy_calculate_uniqueness([], top_k)
+    all_l2 = [match["score"] for company in company_groups.values() for match in company["matches"]]
+    L2_MIN = min(all_l2)
+    L2_MAX = max(all_l2)
+    for company in company_groups.values():
+        avg_l2 = sum(m["score"] for m in company["matches"]) / len(company["matches"])
+        company["avg_score"] = avg_l2
+        normalized = (avg_l2 - L2_MIN) / (L2_MAX - L2_MIN) if L2_MAX != L2_MIN else 0.0
+        company["match_percent"] = round(1.0 - normalized, 4)
+    uniqueness = legacy_calculate_uniqueness(company_groups.values(), top_k)
+    top_companies = sorted(company_groups.values(), key=lambda x: x["match_percent"], reverse=True)[:top_k]
+    hydrate_companies(top_companies, match_rows, store)
+    return top_companies, uniqueness
+
+def make_store(n_companies: int, n_comments: int, hot_companies: int, rng) -> ListMetaStore:
+    descriptions = [{"id": f"ph_{c}", "type": "description", "company_id": f"ph_{c}", "text": "d", "meta": {"name": str(c)}}
+                    for c in range(n_companies)]
+    # most comments belong to a handful of "hot" companies
+    owners = np.where(rng.random(n_comments) < 0.8, rng.integers(0, hot_companies, n_comments), rng.integers(0, n_companies, n_comments))
+    comments = [{"id": f"ph_{owner}_c{i}", "type": "comment", "company_id": f"ph_{owner}", "text": "c", "meta": {}}
+                for i, owner in enumerate(owners.tolist())]
+    return ListMetaStore({"description": descriptions, "comment": comments},
+                         describe=lambda company_id: descriptions[int(company_id[3:])])
+
+def make_candidates(store: ListMetaStore, n_queries: int, k: int, rng):
+    # overlapping hits across expansions, like real query variants of one idea
+    searches = []
+    for code, entry_type in enumerate(SOURCE_TYPES):
+        n = store.count(entry_type)
+        pool = rng.choice(n, size=min(n, k * 3), replace=False)
+        rows = np.stack([rng.choice(pool, size=min(k, len(pool)), replace=False) for _ in range(n_queries)])
+        scores = np.sort(rng.random(rows.shape).astype(np.float32) * 2, axis=1)
+        searches.append((scores, rows.astype(np.int64), code))
+    weights = np.asarray([2.0] + [1.0] * (n_queries - 1), dtype=np.float32)
+    return merge_search_results(searches, weights)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-k", type=int, default=200)
+    parser.add_argument("--expansions", type=int, default=30)
+    parser.add_argument("--companies", type=int, default=5000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--hot", type=int, default=3, help="companies owning 80%% of the comments")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    store = make_store(args.companies, args.comments, args.hot, rng)
+    candidates = make_candidates(store, args.expansions + 1, args.top_k * 2, rng)
+
+    before, after = legacy_dedupe_by_company(candidates, store, args.top_k), dedupe_by_company(candidates, store, args.top_k)
+    assert copy.deepcopy(before) == copy.deepcopy(after), "grouping changed the results"
+
+    per_company = {}
+    for code, entry_type in enumerate(SOURCE_TYPES):
+        for doc in store.get_rows(entry_type, candidates[0][candidates[2] == code].tolist(), GROUPING_FIELDS):
+            per_company.setdefault(doc["company_id"], set()).add(doc["id"])
+    print(f"{len(candidates[0])} candidates, top_k={args.top_k}, {args.expansions} expansions, "
+          f"{len(per_company)} companies, up to {max(map(len, per_company.values()))} distinct matches per company\n")
+    print_latency_table({
+        "before (rebuilt maps, loops)": latency_stats(time_calls(lambda: legacy_dedupe_by_company(candidates, store, args.top_k), args.runs)),
+        "after (one pass, arrays)": latency_stats(time_calls(lambda: dedupe_by_company(candidates, store, args.top_k), args.runs)),
+    })
+
+if __name__ == "__main__":
+    main()
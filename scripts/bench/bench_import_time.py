@@ -0,0 +1,62 @@
+# benchmark: import-time cost of the app and pipeline modules (python -X importtime), to keep startup cheap
+# Importing must not load the embedding model, LLM clients or indexes; those are lazy (app.utils.lazy)
+# and loaded by the startup warm-up (WARMUP_MODE) or the first request.
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+MODULES = ["app.main", "app.services.retriever", "app.llm.expander", "app.llm.standardizer", "app.core.faiss_loader"]
+
+# "import time: self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def import_profile(module: str) -> tuple:
+    """Wall time of a fresh interpreter importing module, plus its -X importtime rows (cumulative us, name)."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True)
+    wall_s = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.splitlines()[-1] if proc.stderr else f"exit code {proc.returncode}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append((int(match.group(1)), match.group(2)))
+    return wall_s, rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--top", type=int, default=8, help="heaviest packages to list per module")
+    args = parser.parse_args()
+
+    baseline_s, baseline_rows = import_profile("sys")  # interpreter start-up, subtracted from the wall times
+    startup_packages = {name.split(".")[0] for _, name in baseline_rows}
+    print(f"interpreter start-up: {baseline_s * 1000:.0f} ms\n")
+    print(f"{'module':<28} {'import (ms)':>12} {'wall (ms)':>10}")
+    details = {}
+    for module in args.modules:
+        try:
+            wall_s, rows = import_profile(module)
+        except RuntimeError as e:
+            print(f"{module:<28} ❌ {e}")
+            continue
+        own = next((us for us, name in rows if name == module), 0)
+        print(f"{module:<28} {own / 1000:>12.1f} {max(0.0, wall_s - baseline_s) * 1000:>10.1f}")
+        packages = {}  # top-level package -> its largest cumulative time (nested rows would double count)
+        for us, name in rows:
+            package = name.split(".")[0]
+            if package not in ("app", "scripts", module) and package not in startup_packages:
+                packages[package] = max(packages.get(package, 0), us)
+        details[module] = sorted(((us, package) for package, us in packages.items()), reverse=True)[:args.top]
+
+    for module, heaviest in details.items():
+        print(f"\n{module}: heaviest packages")
+        for us, package in heaviest:
+            print(f"  {package:<40} {us / 1000:>8.1f} ms")
+
+if __name__ == "__main__":
+    main()
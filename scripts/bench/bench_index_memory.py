@@ -0,0 +1,70 @@
+# benchmark: cold-start time + resident memory per worker for a flat index loaded onto the heap vs. memory-mapped
+# memory: faiss.read_index, every worker holds a private copy (rss_anon grows with the index)
+# mmap:   MemmapFlatIndex over the .vectors.npy file, workers share the page cache (rss_file, counted once)
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from app.core.index_factory import MemmapFlatIndex, build_index, save_mmap_vectors
+from app.utils.memory import memory_usage
+from scripts.bench.bench_utils import latency_stats, time_calls, print_latency_table
+
+
+def _worker(mode: str, index_path: str, n_queries: int, results):
+    start = time.perf_counter()
+    index = MemmapFlatIndex(index_path) if mode == "mmap" else faiss.read_index(index_path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    queries = np.random.default_rng(os.getpid()).standard_normal((n_queries, index.d)).astype(np.float32)
+    samples = time_calls(lambda: index.search(queries[:1], 10), n_runs=n_queries)
+    index.search(queries, 10)  # touch every vector once so resident memory reflects a warm worker
+    results.put((mode, os.getpid(), load_ms, latency_stats(samples), memory_usage()))
+
+def run(mode: str, index_path: str, workers: int, n_queries: int) -> list:
+    results = mp.Queue()
+    procs = [mp.Process(target=_worker, args=(mode, index_path, n_queries, results)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    rows = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_path = os.path.join(tmp_dir, "bench_index.faiss")
+        print(f"Building flat index over {args.vectors} x {args.dim} synthetic vectors...")
+        vectors = np.random.default_rng(0).standard_normal((args.vectors, args.dim)).astype(np.float32)
+        index = build_index(vectors, "flat")
+        faiss.write_index(index, index_path)
+        save_mmap_vectors(index, index_path)
+        del index, vectors
+        print(f"Index file: {os.path.getsize(index_path) / (1024 * 1024):.1f} MB\n")
+
+        latencies = {}
+        print(f"{'mode':<8} {'pid':>8} {'load ms':>10} {'rss MB':>10} {'anon MB':>10} {'file MB':>10}")
+        for mode in ("memory", "mmap"):
+            rows = run(mode, index_path, args.workers, args.queries)
+            for _, pid, load_ms, stats, mem in rows:
+                print(f"{mode:<8} {pid:>8} {load_ms:>10.1f} {mem.get('rss', 0):>10.1f} "
+                      f"{mem.get('rss_anon', 0):>10.1f} {mem.get('rss_file', 0):>10.1f}")
+            private = sum(mem.get("rss_anon", 0) for *_, mem in rows)
+            print(f"{mode:<8} private memory across {args.workers} workers: {private:.1f} MB\n")
+            latencies[f"{mode} search (1 query, k=10)"] = rows[0][3]
+        print_latency_table(latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# shared helpers for the benchmark scripts in scripts/bench
+import random
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+def latency_stats(samples_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of latencies (ms) into p50 / p99 / mean."""
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "p50": float(np.percentile(arr, 50)),
+        "p99": float(np.percentile(arr, 99)),
+        "mean": float(arr.mean()),
+    }
+
+def time_calls(fn: Callable[[], object], n_runs: int, warmup: int = 1) -> List[float]:
+    """Call fn n_runs times (after warmup) and return per-call latency in ms."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def print_latency_table(rows: Dict[str, Dict[str, float]]):
+    """Print {label: latency_stats} as an aligned table."""
+    width = max(len(label) for label in rows)
+    print(f"{'':<{width}}  {'p50 (ms)':>10}  {'p99 (ms)':>10}  {'mean (ms)':>10}")
+    for label, stats in rows.items():
+        print(f"{label:<{width}}  {stats['p50']:>10.3f}  {stats['p99']:>10.3f}  {stats['mean']:>10.3f}")
+
+def make_synthetic_corpus(n_companies: int, comments_per_company: int = 3, seed: int = 0) -> List[Dict]:
+    """Build a raw-corpus-shaped list of description + comment entries."""
+    rng = random.Random(seed)
+    corpus = []
+    for c in range(n_companies):
+        company_id = f"ph_{c}"
+        corpus.append({
+            "type": "description",
+            "id": company_id,
+            "company_id": company_id,
+            "text": f"Product {c} description",
+            "meta": {"name": f"Product {c}", "website": f"https://p{c}.example", "tags": ["ai"]},
+        })
+        for i in range(rng.randint(0, comments_per_company * 2)):
+            corpus.append({
+                "type": "comment",
+                "id": f"{company_id}_c{i+1}",
+                "company_id": company_id,
+                "text": f"Comment {i} on product {c}",
+                "meta": {"parent_id": company_id, "parent_name": f"Product {c}"},
+            })
+    return corpus
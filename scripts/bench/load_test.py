@@ -0,0 +1,83 @@
+# load test for a running API: req/s, p50/p99 and 429s per concurrency level
+# run once against the old server and once against the new one, compare req/s at the same p99 target:
+#   uvicorn app.main:app --workers 1 &
+#   python -m scripts.bench.load_test --endpoint query --levels 1,2,4,8,16 --p99-target-ms 3000
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from scripts.bench.bench_utils import latency_stats
+
+IDEAS = [
+    "Uber for mental health therapists",
+    "AI copilot that writes SQL from plain English for analysts",
+    "Voice assistant that summarizes meetings and files action items",
+    "Marketplace matching indie game devs with freelance composers",
+    "Personal finance app that negotiates bills with an LLM agent",
+]
+
+
+async def fetch_analysis_payload(client: httpx.AsyncClient, idea: str) -> dict:
+    response = await client.post("/api/query", json={"idea": idea, "top_k": 5})
+    response.raise_for_status()
+    return {"idea": idea, "results": response.json()["results"]}
+
+async def run_level(client: httpx.AsyncClient, endpoint: str, concurrency: int, duration: float, payloads: list) -> dict:
+    latencies, status_counts = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            payload = random.choice(payloads)
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"/api/{endpoint}", json=payload)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = "error"
+            status_counts[status] = status_counts.get(status, 0) + 1
+            if status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            elif status == 429:
+                await asyncio.sleep(0.1)  # honor backpressure instead of spinning
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stats = latency_stats(latencies) if latencies else {"p50": float("nan"), "p99": float("nan"), "mean": float("nan")}
+    return {"concurrency": concurrency, "rps": len(latencies) / elapsed, "statuses": status_counts, **stats}
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="query", choices=["query", "analyze"])
+    parser.add_argument("--levels", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--p99-target-ms", type=float, default=3000.0)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=120.0) as client:
+        if args.endpoint == "query":
+            payloads = [{"idea": idea, "top_k": 5} for idea in IDEAS]
+        else:
+            payloads = [await fetch_analysis_payload(client, idea) for idea in IDEAS]
+
+        rows = []
+        for level in (int(level) for level in args.levels.split(",")):
+            row = await run_level(client, args.endpoint, level, args.duration, payloads)
+            rows.append(row)
+            print(f"c={row['concurrency']:<4} {row['rps']:>8.2f} req/s  p50 {row['p50']:>9.1f} ms  p99 {row['p99']:>9.1f} ms  statuses {row['statuses']}")
+
+    within = [row for row in rows if row["p99"] <= args.p99_target_ms]
+    if within:
+        best = max(within, key=lambda row: row["rps"])
+        print(f"\n✅ Best throughput with p99 <= {args.p99_target_ms:.0f} ms: {best['rps']:.2f} req/s at concurrency {best['concurrency']}")
+    else:
+        print(f"\n⚠️ No level met p99 <= {args.p99_target_ms:.0f} ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
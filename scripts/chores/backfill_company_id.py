@@ -1,22 +1,8 @@
-import json
-
-INPUT_FILE = "app/data/corpus/ph_enhanced_corpus.json"
-OUTPUT_FILE = "app/data/corpus/ph_enhanced_corpus_with_company_id.json"
-
-def append_company_id(corpus):
-    for entry in corpus:
-        if entry["type"] == "description":
-            entry["company_id"] = entry["id"]
-        elif entry["type"] == "comment":
-            entry["company_id"] = entry["meta"]["parent_id"]
-    return corpus
+from app.core.config import CORPUS_DB_PATH
+from app.core.corpus_db import CorpusDB
 
 # Example usage
 if __name__ == "__main__":
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    updated_data = append_company_id(data)
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(updated_data, f, indent=2, ensure_ascii=False)
+    # descriptions are their own company, comments belong to meta.parent_id
+    updated = CorpusDB(CORPUS_DB_PATH).backfill_company_ids()
+    print(f"✅ Backfilled company_id on {updated} entries in {CORPUS_DB_PATH}")
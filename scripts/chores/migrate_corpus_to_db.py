@@ -0,0 +1,35 @@
+# one-off migration: load the scrape / raw / enhanced corpus files (.json arrays or .jsonl) into the corpus database
+import argparse
+
+from app.core.config import CORPUS_DB_PATH
+from app.core.corpus_db import CorpusDB
+from app.utils.corpus_io import read_records, write_records
+
+SCRAPE_FILES = ["app/data/scrapes/ph_scrape.json", "app/data/scrapes/ph_scrape.jsonl"]
+RAW_FILES = ["app/data/corpus/ph_raw_corpus.json", "app/data/corpus/ph_raw_corpus.jsonl"]
+ENHANCED_FILES = ["app/data/corpus/ph_enhanced_corpus.json", "app/data/corpus/ph_enhanced_corpus.jsonl"]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=CORPUS_DB_PATH)
+    parser.add_argument("--export", action="store_true", help="write the enhanced corpus back out as JSONL instead")
+    args = parser.parse_args()
+
+    db = CorpusDB(args.db)
+    if args.export:
+        count = write_records(ENHANCED_FILES[1], db.iter_enhanced())
+        print(f"✅ Exported {count} enhanced entries to {ENHANCED_FILES[1]}")
+        return
+
+    # raw before enhanced: enhancement state attaches to the raw rows
+    for label, paths, load in (("posts", SCRAPE_FILES, db.upsert_posts),
+                               ("raw entries", RAW_FILES, db.upsert_entries),
+                               ("enhanced entries", ENHANCED_FILES, db.save_enhanced)):
+        for path in paths:
+            count = load(read_records(path))
+            if count:
+                print(f"✅ {path}: {count} {label}")
+    print(f"📦 {db.count('posts')} posts, {db.count()} entries ({db.count(enhanced=True)} enhanced) in {args.db}")
+
+if __name__ == "__main__":
+    main()
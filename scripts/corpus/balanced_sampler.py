@@ -0,0 +1,50 @@
+# balanced random batches of description + comment entries for enhance_ph_corpus, O(batch) per draw
+import random
+from typing import Dict, List, Optional
+
+
+class BalancedSampler:
+    """
+    Description and comment pools as swap-remove arrays: a draw picks a random slot,
+    moves the last entry into it and pops, so sampling without replacement never
+    rescans or re-partitions the remaining corpus. Entries of other types are ignored.
+    Seeded for reproducible batch order.
+    """
+    def __init__(self, entries: List[Dict], seed: Optional[int] = None):
+        self._rng = random.Random(seed)
+        self._pools = {"description": [], "comment": []}
+        for entry in entries:
+            pool = self._pools.get(entry["type"])
+            if pool is not None:
+                pool.append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(pool) for pool in self._pools.values())
+
+    def _draw(self, pool: List[Dict], k: int) -> List[Dict]:
+        drawn = []
+        for _ in range(min(k, len(pool))):
+            i = self._rng.randrange(len(pool))
+            pool[i], pool[-1] = pool[-1], pool[i]
+            drawn.append(pool.pop())
+        return drawn
+
+    def sample(self, batch_size: int = 5, desc_ratio: float = 0.4) -> List[Dict]:
+        """
+        Same split as before: max(1, int(batch_size * desc_ratio)) descriptions, the rest comments,
+        each capped by what is left in its pool (a short pool isn't topped up from the other).
+        Drawn entries leave the pools; hand unprocessed ones back with put_back.
+        """
+        desc_sample_size = max(1, int(batch_size * desc_ratio))
+        comment_sample_size = batch_size - desc_sample_size
+
+        batch = self._draw(self._pools["description"], desc_sample_size) + self._draw(self._pools["comment"], comment_sample_size)
+        self._rng.shuffle(batch)
+        return batch
+
+    def put_back(self, entries: List[Dict]):
+        """Return entries to their pools (e.g. a failed batch), to be drawn again later."""
+        for entry in entries:
+            pool = self._pools.get(entry["type"])
+            if pool is not None:
+                pool.append(entry)
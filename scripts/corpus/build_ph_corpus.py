@@ -1,11 +1,8 @@
 # scripts/build_corpus_from_ph.py
 
-import json
-import os
 from tqdm import tqdm
-
-INPUT_FILE = "app/data/scrapes/ph_scrape.json"
-OUTPUT_FILE = "app/data/corpus/ph_raw_corpus.json"
+from app.core.config import CORPUS_DB_PATH
+from app.core.corpus_db import CorpusDB
 
 # extract tags from post
 def extract_tags(topics):
@@ -58,24 +55,20 @@ def generate_corpus_entry(post):
 
     return [entry], comments
 
-def main():
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-
-    with open(INPUT_FILE, "r") as f:
-        posts = json.load(f)
-
-    full_corpus = []
-    # Process each post with tqdm progress bar
-    for post in tqdm(posts, desc="Processing posts"):
+def generate_corpus(posts):
+    for post in posts:
         entries, comments = generate_corpus_entry(post)
-        full_corpus.extend(entries)
-        full_corpus.extend(comments)
+        yield from entries
+        yield from comments
+
+def main():
+    db = CorpusDB(CORPUS_DB_PATH)
 
-    # Write completed raw corpus to output file
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(full_corpus, f, indent=2)
+    # Stream posts in and entries out; upserting keeps the enhancement state of existing entries
+    posts = tqdm(db.iter_posts(), total=db.count("posts"), desc="Processing posts")
+    total = db.upsert_entries(generate_corpus(posts))
 
-    print(f"\n✅ Corpus written to {OUTPUT_FILE} with {len(full_corpus)} entries")
+    print(f"\n✅ Corpus written to {CORPUS_DB_PATH} with {total} entries")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
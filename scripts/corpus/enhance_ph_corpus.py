@@ -1,130 +1,93 @@
-import json, os, signal, sys
-from tqdm import tqdm
+import os, signal, sys
 from datetime import datetime
-from app.llm.standardizer import standardize_batch
-import random
+from app.llm.standardizer import standardize_concurrently, rate_limiter
+from app.core.config import CORPUS_DB_PATH
+from app.core.corpus_db import CorpusDB
+from scripts.corpus.balanced_sampler import BalancedSampler
 
-INPUT_FILE = "app/data/corpus/ph_raw_corpus.json"
-OUTPUT_FILE = "app/data/corpus/ph_enhanced_corpus.json"
 BATCH_SIZE = 5
 CACHE_FOLDER = ".cache/corpus/checkpoints/"
 CACHE_EVERY_N_BATCHES = 100
+SAMPLE_SEED = None # set an int to reproduce a run's batch order
+BATCHES_PER_ROUND = 20 # batches sampled per concurrent round; failed entries rejoin the pool between rounds
 
 # --- Enhancement Version ---
 # v1: initial enhancement
 # v2: natural formatting and word limiting in prompts to improve output quality and prevent RAG embedding failures
 CURRENT_ENHANCEMENT_VERSION = "v2"
 
-# --- Global Variables ---
-enhanced_corpus = [] # Global corpus for Ctrl+C save
+def save_corpus(db, batch):
+    # store only the new batch: O(batch) however large the enhanced corpus already is
+    db.save_enhanced(batch)
 
-def load_corpus(path):
-    try:
-        if os.path.exists(path) and os.path.getsize(path) > 0:
-            with open(path, "r") as f:
-                return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        print(f"⚠️ No valid corpus found at {path}, starting fresh")
-    return []
-
-def save_corpus(path, data):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
-
-def save_checkpoint(data, batch_idx):
+def save_checkpoint(db, batch_idx):
     os.makedirs(CACHE_FOLDER, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    path = os.path.join(CACHE_FOLDER, f"ph_enhanced_cp_batch{batch_idx}_{timestamp}.json")
-    save_corpus(path, data)
+    path = os.path.join(CACHE_FOLDER, f"ph_corpus_cp_batch{batch_idx}_{timestamp}.sqlite")
+    db.backup(path)
     print(f"💾 Cached checkpoint at {path}")
 
 def handle_exit(sig, frame):
-    print("\n⚠️ Interrupted. Saving current progress...")
-    save_corpus(OUTPUT_FILE, enhanced_corpus)
-    print("✅ Saved. Exiting.")
+    print("\n⚠️ Interrupted. Enhanced batches are already saved.")
     sys.exit(0)
 
 signal.signal(signal.SIGINT, handle_exit)
 
-def random_balanced_batch(remaining, seen_ids, batch_size=5, desc_ratio=0.4):
-    """
-    Returns a balanced random batch of description and comment entries.
-    Filters out entries already in seen_ids.
-    """
-    available = [entry for entry in remaining if entry["id"] not in seen_ids]
-    if not available:
-        return []
+def enhance_corpus():
+    db = CorpusDB(CORPUS_DB_PATH)
 
-    descriptions = [e for e in available if e["type"] == "description"]
-    comments = [e for e in available if e["type"] == "comment"]
+    # ENTRIES TO ENHANCE - never been enhanced yet (enhanced IS NULL)
+    remaining = list(db.iter_entries(enhanced=False))
+    enhanced_count = db.count(enhanced=True)
 
-    desc_sample_size = max(1, int(batch_size * desc_ratio))
-    comment_sample_size = batch_size - desc_sample_size
+    print("Out of a total of", db.count(), "entries in raw corpus:")
+    print(f"🔍 {enhanced_count} entries already enhanced.")
+    print(f"🧠 Enhancing {len(remaining)} remaining entries...\n")
 
-    desc_sample = random.sample(descriptions, min(desc_sample_size, len(descriptions)))
-    comment_sample = random.sample(comments, min(comment_sample_size, len(comments)))
+    # drawn entries leave the sampler's pools, failed ones are put back
+    sampler = BalancedSampler(remaining, seed=SAMPLE_SEED)
+    progress = {"batches": 0, "enhanced": enhanced_count}
 
-    batch = desc_sample + comment_sample
-    random.shuffle(batch)
-    return batch
+    # called in sampling order by standardize_concurrently, on this thread
+    def on_batch_complete(enhanced_batch, batch):
+        progress["batches"] += 1
+        progress["enhanced"] += len(enhanced_batch)
 
+        # Store the batch's enhancement state
+        save_corpus(db, enhanced_batch)
+        print(f"✅ Batch {progress['batches']}: saved {len(enhanced_batch)}/{len(batch)} entries, {progress['enhanced']} enhanced in total")
 
-def enhance_corpus():
-    global enhanced_corpus
-
-    total_raw_corpus = load_corpus(INPUT_FILE)
-    enhanced_corpus = load_corpus(OUTPUT_FILE)
-
-    # ENTRIES TO ENHANCE - never been enhanced yet
-    # Build ID map of already enhanced entries
-    enhanced_ids = {entry["id"] for entry in enhanced_corpus}
-    # Filter: keep only entries that haven't yet been enhanced
-    remaining = [entry for entry in total_raw_corpus if entry["id"] not in enhanced_ids]
-    
-    print("Out of a total of", len(total_raw_corpus), "entries in raw corpus:")
-    print(f"🔍 {len(enhanced_corpus)} entries already enhanced.")
-    print(f"🧠 Enhancing {len(remaining)} remaining entries...\n")
+        # Entries the LLM failed on go back into the pool
+        enhanced_ids = {entry["id"] for entry in enhanced_batch}
+        sampler.put_back([entry for entry in batch if entry["id"] not in enhanced_ids])
 
-    seen_ids = set() # track seen IDs to avoid duplicates in this run
-    total_batches = len(remaining) // BATCH_SIZE + (len(remaining) % BATCH_SIZE > 0)
+        # Save checkpoint every N batches - learnt the hard way...
+        if progress["batches"] % CACHE_EVERY_N_BATCHES == 0:
+            save_checkpoint(db, progress["batches"])
 
-    for batch_num in tqdm(range(1, total_batches + 1)):
-        # Randomly sample BATCH_SIZE entries from available in remaining
-        batch = random_balanced_batch(remaining, seen_ids, batch_size=BATCH_SIZE, desc_ratio=0.4)
-        if not batch:
+    while len(sampler):
+        # Randomly sample a round of balanced batches from the not yet enhanced entries
+        batches = [batch for batch in (sampler.sample(batch_size=BATCH_SIZE, desc_ratio=0.4) for _ in range(BATCHES_PER_ROUND)) if batch]
+        if not batches:
             print("⚠️ No more entries to sample from.")
             break
 
-        try:
-            print(f"🔍 Enhancing Batch {batch_num} ~ ['{batch[0]['id']}'... '{batch[-1]['id']}']")
-            enhanced_batch = standardize_batch(batch, version=CURRENT_ENHANCEMENT_VERSION)
-            enhanced_corpus.extend(enhanced_batch)
-
-            # Rewrite to corpus at each batch
-            save_corpus(OUTPUT_FILE, enhanced_corpus)
-            print(f"✅ Appended and saved {len(enhanced_batch)} new entries!")
-            print(f"✅ Total enhanced entries: {len(enhanced_corpus)}")
-
-            # Update seen IDs to keep sample pool unique
-            seen_ids.update(entry["id"] for entry in enhanced_batch)
-
-            # Save checkpoint every N batches - learnt the hard way...
-            if batch_num % CACHE_EVERY_N_BATCHES == 0:
-                save_checkpoint(enhanced_corpus, batch_num)
-        except Exception as e:
-            error_msg = str(e).lower()
-            print(f"❌ Error in batch {batch_num}: {e}")
-            # Check for rate limit-related error and exit
-            if "rate limit" in error_msg or "429" in error_msg or "too many requests" in error_msg:
-                print("⛔ Rate limit detected. Exiting to avoid further issues.")
-                save_corpus(OUTPUT_FILE, enhanced_corpus)
-                sys.exit(1)
-            continue
+        enhanced_before = progress["enhanced"]
+        standardize_concurrently(
+            [entry for batch in batches for entry in batch],
+            version=CURRENT_ENHANCEMENT_VERSION,
+            batch_size=BATCH_SIZE,
+            on_batch_complete=on_batch_complete
+        )
+        if progress["enhanced"] == enhanced_before:
+            # every request failed even after rate-limit backoff: quota exhausted or provider down
+            print("⛔ Nothing enhanced in a whole round. Exiting to avoid further issues.")
+            break
 
     # Save final checkpoint
-    save_checkpoint(enhanced_corpus, total_batches)
-    print(f"\n✅ All done. Enhanced corpus saved to {OUTPUT_FILE}")
+    save_checkpoint(db, progress["batches"])
+    print(f"📈 LLM requests: {rate_limiter.stats} (final rate {rate_limiter.rate:.2f} req/s)")
+    print(f"\n✅ All done. Enhanced corpus saved to {CORPUS_DB_PATH}")
 
 if __name__ == "__main__":
     enhance_corpus()
\ No newline at end of file
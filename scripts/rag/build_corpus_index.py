@@ -1,61 +1,166 @@
+import argparse
+import hashlib
 import json
 import os
+import shutil
+import time
 
 #cleanup
 import gc
-import torch
 
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from typing import List, Dict
 
-from app.core.config import EMBED_MODEL_NAME, INDEX_DIR, META_DIR, DESCRIPTION_INDEX_PATH, COMMENT_INDEX_PATH, DESCRIPTION_META_PATH, COMMENT_META_PATH
-
-META_OUTPUT_DIR = META_DIR
-INDEX_OUTPUT_DIR = INDEX_DIR
+from app.core.config import EMBED_MODEL_NAME, INDEX_TYPE, INDEX_LAYOUT, CORPUS_DB_PATH, GENERATIONS_DIR, EMBEDDING_STORE_DIR
+from app.core.config import COMPANY_CENTROID_DESC_WEIGHT
+from app.core.config import EMBED_BUILD_WORKERS, EMBED_BUILD_BATCH_SIZE, EMBED_SHARD_SIZE
+from app.core.corpus_db import CorpusDB
+from app.core.meta_store import build_meta_store
+from app.core.generations import new_generation, generation_paths, write_manifest, read_manifest, publish_generation, current_generation_id
+from app.core.index_factory import (
+    INDEX_TYPES, ENTRY_TYPES, build_index, build_id_index, build_unified_index, update_index,
+    encode_ids, set_search_params, save_mmap_vectors
+)
+from app.utils.embedding_store import EmbeddingStore, embedding_store_dir
+from scripts.rag.embed_pipeline import parallel_encode
 
+# keys into app.core.generations.generation_paths
 INDEX_SCHEMA = [{
     "type": "description",
-    "index_path": DESCRIPTION_INDEX_PATH,
-    "meta_path": DESCRIPTION_META_PATH
+    "index_key": "description",
+    "meta_key": "description_meta"
 }, {
     "type": "comment",
-    "index_path": COMMENT_INDEX_PATH,
-    "meta_path": COMMENT_META_PATH
+    "index_key": "comment",
+    "meta_key": "comment_meta"
 }]
 # test file with about 1300 entries - 521 descriptions, 785 comments
-# CORPUS_FILE = "app/data/corpus/test_enhanced_corpus.json"
+# CORPUS_DB = "app/data/corpus/test_corpus.sqlite"
 
 # production file with about 3000 entries - 1495 descriptions, 2248 comments
-CORPUS_FILE = "app/data/corpus/ph_enhanced_corpus.json"
+CORPUS_DB = CORPUS_DB_PATH
+
+# incremental builds warn once this share of an index's vectors are tombstones (HNSW can't delete)
+MAX_TOMBSTONE_RATIO = 0.2
 
 
 # UTILS
-def load_corpus(file_path: str) -> List[Dict]: # load ENHANCEDcorpus from file
-    with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+def load_corpus(db_path: str) -> List[Dict]: # load ENHANCED corpus entries from the corpus database
+    db = CorpusDB(db_path)
+    try:
+        return list(db.iter_enhanced())
+    finally:
+        db.close()
 
 def save_json(data, path): # save metadata for future reference
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
+NORMALIZE_EMBEDDINGS = True # for cosine or L2 distance, must match the API's query embeddings
+
+# encoder settings, overridable from the command line
+EMBED_SETTINGS = {"workers": EMBED_BUILD_WORKERS, "batch_size": EMBED_BUILD_BATCH_SIZE, "shard_size": EMBED_SHARD_SIZE}
+
+_model_cache = {}
+
+def get_model(): # loaded on first encode, so fully stored rebuilds never load it (nor import torch)
+    if "model" not in _model_cache:
+        from sentence_transformers import SentenceTransformer
+        _model_cache["model"] = SentenceTransformer(EMBED_MODEL_NAME)
+    return _model_cache["model"]
+
+def open_embedding_store() -> EmbeddingStore:
+    return EmbeddingStore(embedding_store_dir(EMBEDDING_STORE_DIR, EMBED_MODEL_NAME), EMBED_MODEL_NAME, NORMALIZE_EMBEDDINGS)
+
 # Embedding all texts entries into dense vectors -> multiple queries
-def embed_texts(texts: List[str], model: SentenceTransformer) -> np.ndarray: # convert into dense vectors
-    return np.array(model.encode(
+def encode_texts(texts: List[str]) -> np.ndarray: # convert into dense vectors
+    return np.array(get_model().encode(
         texts,
         convert_to_numpy=True,
-        normalize_embeddings=True, # for cosine or L2 distance
+        normalize_embeddings=NORMALIZE_EMBEDDINGS,
         show_progress_bar=True,
-        batch_size=16,
+        batch_size=EMBED_SETTINGS["batch_size"],
         num_workers=0
     ))
 
-def build_faiss_index(embeddings: np.ndarray):
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
-    return index
+def embed_texts(texts: List[str], store: EmbeddingStore = None) -> np.ndarray:
+    """
+    Embeddings for texts; with a store only texts it hasn't seen are encoded (then appended to it).
+    With more than one worker, encoding runs in the process pool and each finished shard is stored
+    right away, so rerunning an interrupted build resumes where it stopped.
+    """
+    if store is None and EMBED_SETTINGS["workers"] <= 1:
+        return encode_texts(texts)
+
+    found, missing = store.lookup(texts) if store is not None else ({}, list(dict.fromkeys(texts)))
+    if store is not None:
+        print(f"Embedding store: {len(found)} reused, {len(missing)} to encode")
+
+    def collect(shard: List[str], vectors: np.ndarray):
+        if store is not None:
+            store.add(shard, vectors)
+        found.update(zip(shard, vectors))
+
+    if missing and EMBED_SETTINGS["workers"] > 1:
+        parallel_encode(missing, collect, EMBED_MODEL_NAME, NORMALIZE_EMBEDDINGS, **EMBED_SETTINGS)
+    elif missing:
+        collect(missing, encode_texts(missing))
+    if not texts:
+        return np.empty((0, store.dim or 0) if store is not None else (0, 0), dtype=np.float32)
+    return np.stack([found[text] for text in texts])
+
+def build_faiss_index(embeddings: np.ndarray, index_type: str = INDEX_TYPE):
+    return build_index(embeddings, index_type) # flat / ivf / ivfpq / hnsw, see app.core.index_factory
+
+# Search knob sweeps for the recall vs. latency report
+SEARCH_SWEEPS = {
+    "ivf": ("nprobe", [1, 4, 16, 64]),
+    "ivfpq": ("nprobe", [1, 4, 16, 64]),
+    "hnsw": ("efSearch", [16, 32, 64, 128]),
+}
+
+def _timed_search(index, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    _, indices = index.search(queries, k)
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return indices, latency_ms
+
+def compare_index_types(embeddings: np.ndarray, k: int = 10, n_queries: int = 200, seed: int = 0):
+    """
+    Print a recall@k vs. per-query latency table for each ANN type and search knob,
+    using the exact flat index as ground truth. Queries are sampled from the embeddings.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    queries = embeddings[rng.choice(len(embeddings), min(n_queries, len(embeddings)), replace=False)]
+
+    flat = build_faiss_index(embeddings, "flat")
+    truth, flat_ms = _timed_search(flat, queries, k)
+
+    print(f"\n📊 recall@{k} vs latency over {len(queries)} queries ({len(embeddings)} vectors)")
+    print(f"{'index':<8} {'param':<14} {'build (s)':>10} {'recall':>8} {'ms/query':>10}")
+    print(f"{'flat':<8} {'-':<14} {'-':>10} {1.0:>8.4f} {flat_ms:>10.4f}")
+
+    for index_type, (param, values) in SEARCH_SWEEPS.items():
+        start = time.perf_counter()
+        index = build_faiss_index(embeddings, index_type)
+        build_s = time.perf_counter() - start
+        for value in values:
+            if param == "nprobe":
+                set_search_params(index, nprobe=value)
+            else:
+                set_search_params(index, ef_search=value)
+            found, latency_ms = _timed_search(index, queries, k)
+            recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+            print(f"{index_type:<8} {f'{param}={value}':<14} {build_s:>10.2f} {recall:>8.4f} {latency_ms:>10.4f}")
+
+def synthetic_embeddings(n: int, dim: int = 768, n_clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Clustered, L2-normalized random vectors to size index settings for corpora we don't have yet."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    vecs = centers[rng.integers(0, n_clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
 
 def extract_entries(corpus: List[Dict], entry_type: str): # use this to extract entries by type ("Comment" or "Description")
     texts = []
@@ -66,14 +171,121 @@ def extract_entries(corpus: List[Dict], entry_type: str): # use this to extract
             metas.append(entry)
     return texts, metas
 
+# INCREMENTAL BUILD HELPERS
+# The manifest maps each entry type to {entry id: [row, enhancementVersion, text hash]}. Rows are FAISS ids
+# and metadata rows; they are never reused, so unchanged entries keep theirs across incremental builds.
+def entry_fingerprint(entry: Dict) -> list:
+    text_hash = hashlib.blake2b(entry["standardized"].encode("utf-8"), digest_size=8).hexdigest()
+    return [entry.get("enhancementVersion"), text_hash]
+
+def row_map(metas: List[Dict]) -> Dict[str, list]:
+    return {entry.get("id"): [row, *entry_fingerprint(entry)] for row, entry in enumerate(metas)}
+
+def diff_entries(previous: Dict[str, list], metas: List[Dict], next_row: int):
+    """
+    Match current entries against the previous id -> [row, version, hash] map.
+    Unchanged entries keep their row; new or re-enhanced ones are appended at fresh rows and
+    the rows of removed or re-enhanced entries are returned for tombstoning.
+    Returns (row map, [(row, entry) to embed], removed rows, next free row, metadata list by row).
+    """
+    rows, added, alive = {}, [], {}
+    for entry in metas:
+        entry_id = entry.get("id")
+        if entry_id in rows:
+            continue  # duplicate id, first one wins
+        fingerprint = entry_fingerprint(entry)
+        old = previous.get(entry_id)
+        if old is not None and old[1:] == fingerprint:
+            rows[entry_id] = old
+        else:
+            rows[entry_id] = [next_row, *fingerprint]
+            added.append((next_row, entry))
+            next_row += 1
+        alive[rows[entry_id][0]] = entry
+
+    removed = sorted(old[0] for entry_id, old in previous.items() if rows.get(entry_id, [None])[0] != old[0])
+    return rows, added, removed, next_row, [alive.get(row) for row in range(next_row)]
+
+# COMPANY CENTROIDS - one vector per company, searched first in coarse-to-fine retrieval (RETRIEVAL_MODE="coarse")
+def company_centroids(metas_by_type: Dict[str, List[Dict]], embeddings_by_type: Dict[str, np.ndarray],
+                      desc_weight: float = COMPANY_CENTROID_DESC_WEIGHT):
+    """
+    desc_weight * description embedding + (1 - desc_weight) * mean comment embedding per company,
+    L2-normalized like the query embeddings; a company with only one kind of entry uses that alone.
+    Embeddings are aligned row for row with the metas (None metas are tombstoned rows and skipped).
+    Returns (company ids, centroids) in first-seen order.
+    """
+    company_ids = list(dict.fromkeys(
+        entry["company_id"] for entry_type in ENTRY_TYPES for entry in metas_by_type.get(entry_type, [])
+        if entry and entry.get("company_id")
+    ))
+    position = {company_id: i for i, company_id in enumerate(company_ids)}
+    dim = next(e.shape[1] for e in embeddings_by_type.values() if e is not None and len(e))
+
+    means = {}
+    for entry_type in ENTRY_TYPES:
+        sums, counts = np.zeros((len(company_ids), dim), dtype=np.float32), np.zeros(len(company_ids), dtype=np.float32)
+        rows = [(row, position[entry["company_id"]]) for row, entry in enumerate(metas_by_type.get(entry_type, []))
+                if entry and entry.get("company_id")]
+        if rows:
+            rows, companies = map(np.asarray, zip(*rows))
+            np.add.at(sums, companies, embeddings_by_type[entry_type][rows])
+            np.add.at(counts, companies, 1)
+        means[entry_type] = (sums / np.maximum(counts, 1)[:, None], counts > 0)
+
+    (descriptions, has_description), (comments, has_comments) = means["description"], means["comment"]
+    weight = np.where(has_description & has_comments, desc_weight, has_description.astype(np.float32))[:, None]
+    centroids = weight * descriptions + (1 - weight) * comments
+    centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return company_ids, centroids.astype(np.float32)
+
+def write_company_index(paths: Dict[str, str], metas_by_type: Dict[str, List[Dict]],
+                        embeddings_by_type: Dict[str, np.ndarray], index_type: str) -> int:
+    print(f"\n📦 Building company centroid index ({index_type})...")
+    if not any(e is not None and len(e) for e in embeddings_by_type.values()):
+        print("No embeddings, skipping the company index")
+        return 0
+    company_ids, centroids = company_centroids(metas_by_type, embeddings_by_type)
+    index = build_id_index(centroids, np.arange(len(company_ids)), index_type)
+    faiss.write_index(index, paths["company"])
+    save_mmap_vectors(index, paths["company"])
+    save_json(company_ids, paths["company_ids"])
+    print(f"Done: {paths['company']} ({len(company_ids)} companies)")
+    return len(company_ids)
+
+def stored_rows(metas: List[Dict], store: EmbeddingStore) -> np.ndarray:
+    """
+    Embeddings aligned with a row-indexed metadata list (zeros at tombstoned rows), read from the store only.
+    Raises LookupError when texts aren't stored (e.g. the last build ran without the store): encoding them
+    here would silently turn an incremental build into a full re-embed.
+    """
+    alive = [row for row, entry in enumerate(metas) if entry is not None]
+    if not alive:
+        return None
+    texts = [metas[row]["standardized"] for row in alive]
+    found, missing = store.lookup(texts)
+    if missing:
+        raise LookupError(f"{len(missing)} of {len(set(texts))} texts aren't in the embedding store")
+    embeddings = np.zeros((len(metas), store.dim), dtype=np.float32)
+    embeddings[alive] = np.stack([found[text] for text in texts])
+    return embeddings
+
+def layout_index_names(layout: str) -> List[str]:
+    return {"split": list(ENTRY_TYPES), "unified": ["unified"], "both": [*ENTRY_TYPES, "unified"]}[layout]
+
 # MAIN PIPELINE - extract, embed, build index, save metadata
-def embed_and_index():
-    # Make output directories if they don't exist
-    os.makedirs(META_OUTPUT_DIR, exist_ok=True)
-    os.makedirs(INDEX_OUTPUT_DIR, exist_ok=True)
+# layout: "split" (index per entry type), "unified" (one id index over both) or "both"
+# Output goes to a new generation directory that is published (and hot-swapped by the API) once complete
+def embed_and_index(index_type: str = INDEX_TYPE, compare: bool = False, layout: str = INDEX_LAYOUT, use_store: bool = True):
+    generation_id, generation_dir = new_generation()
+    paths = generation_paths(generation_dir)
+    print(f"📁 Building index generation {generation_id} in {generation_dir}")
 
-    corpus = load_corpus(CORPUS_FILE)
-    model = SentenceTransformer(EMBED_MODEL_NAME)
+    corpus = load_corpus(CORPUS_DB)
+    store = open_embedding_store() if use_store else None
+
+    embeddings_by_type = {}
+    metas_by_type = {}
 
     # process each entry type
     for entry in INDEX_SCHEMA:
@@ -82,21 +294,161 @@ def embed_and_index():
         print(f"Found {len(texts)} {entry['type']} entries.")
 
         print("Embedding...")
-        embeddings = embed_texts(texts, model)
+        embeddings = embed_texts(texts, store)
+        embeddings_by_type[entry["type"]] = embeddings
+
+        if layout in ("split", "both"):
+            print(f"Building FAISS index ({index_type})...")
+            # labelled with id = row (build_id_index), so incremental builds can append / remove by row
+            index = build_id_index(embeddings, np.arange(len(embeddings)), index_type)
+            faiss.write_index(index, paths[entry["index_key"]])
+            save_mmap_vectors(index, paths[entry["index_key"]])
+
+        print("Saving metadata...")
+        save_json(metas, paths[entry["meta_key"]])
+        metas_by_type[entry["type"]] = metas
+
+        print(f"Done: {paths[entry['index_key']]} | {paths[entry['meta_key']]}")
+
+        if compare:
+            compare_index_types(embeddings)
+
+    write_meta_store(paths["meta_store"], metas_by_type)
+    companies = write_company_index(paths, metas_by_type, embeddings_by_type, index_type)
 
-        print("Building FAISS index...")
-        index = build_faiss_index(embeddings)
+    if layout in ("unified", "both"):
+        print(f"\n📦 Building unified FAISS index ({index_type}) over all entry types...")
+        index = build_unified_index(embeddings_by_type, index_type)
+        faiss.write_index(index, paths["unified"])
+        save_mmap_vectors(index, paths["unified"])
+        print(f"Done: {paths['unified']} ({index.ntotal} vectors)")
 
-        print("Saving index and metadata...")
-        faiss.write_index(index, entry["index_path"])
-        save_json(metas, entry["meta_path"])
+    rows = {entry_type: row_map(metas) for entry_type, metas in metas_by_type.items()}
+    finish_generation(generation_id, generation_dir, index_type, layout, rows,
+                      {entry_type: len(metas) for entry_type, metas in metas_by_type.items()}, {}, companies)
 
-        print(f"Done: {entry['index_path']} | {entry['meta_path']}")
-    
     gc.collect()
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
+    if "model" in _model_cache:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+# INCREMENTAL PIPELINE - embed only new / re-enhanced entries and patch the current generation's indexes
+def incremental_index(layout: str = INDEX_LAYOUT, use_store: bool = True):
+    previous_id = current_generation_id()
+    previous_dir = os.path.join(GENERATIONS_DIR, previous_id) if previous_id else None
+    manifest = read_manifest(previous_dir) if previous_dir else {}
+    previous_paths = generation_paths(previous_dir) if previous_dir else {}
+    names = layout_index_names(layout)
+    if (manifest.get("embed_model") != EMBED_MODEL_NAME or "rows" not in manifest
+            or not all(os.path.exists(previous_paths[name]) for name in names)):
+        print("⚠️ No compatible generation to update (model, row map or layout differs), running a full build")
+        return embed_and_index(manifest.get("index_type", INDEX_TYPE), layout=layout, use_store=use_store)
+
+    generation_id, generation_dir = new_generation()
+    paths = generation_paths(generation_dir)
+    print(f"📁 Updating generation {previous_id} -> {generation_id}")
+
+    corpus = load_corpus(CORPUS_DB)
+    store = open_embedding_store() if use_store else None
+    rows, next_row, changes, metas_by_type = {}, dict(manifest["next_row"]), {}, {}
+    for entry in INDEX_SCHEMA:
+        entry_type = entry["type"]
+        _, metas = extract_entries(corpus, entry_type)
+        rows[entry_type], added, removed, next_row[entry_type], metas_by_type[entry_type] = diff_entries(
+            manifest["rows"].get(entry_type, {}), metas, next_row.get(entry_type, 0)
+        )
+        print(f"📦 {entry_type}: {len(added)} new/re-enhanced, {len(removed)} removed, "
+              f"{len(rows[entry_type]) - len(added)} unchanged")
+
+        embeddings = None
+        if added:
+            embeddings = embed_texts([e["standardized"] for _, e in added], store)
+        changes[entry_type] = (np.array([row for row, _ in added], dtype=np.int64), embeddings, np.array(removed, dtype=np.int64))
+        save_json(metas_by_type[entry_type], paths[entry["meta_key"]])
+
+    tombstones = dict(manifest.get("tombstones", {}))
+    for name in names:
+        index = faiss.read_index(previous_paths[name])
+        if name == "unified":
+            typed = [(code, changes[t]) for code, t in enumerate(ENTRY_TYPES)]
+            ids = np.concatenate([encode_ids(code, added) for code, (added, _, _) in typed])
+            removed = np.concatenate([encode_ids(code, removed) for code, (_, _, removed) in typed])
+            blocks = [embeddings for _, (_, embeddings, _) in typed if embeddings is not None]
+            embeddings = np.concatenate(blocks) if blocks else None
+        else:
+            ids, embeddings, removed = changes[name]
+        try:
+            tombstones[name] = tombstones.get(name, 0) + update_index(index, embeddings, ids, removed)
+        except ValueError as e:  # IVF under an IndexIDMap from an older build
+            print(f"⚠️ {name}: {e}, running a full build")
+            shutil.rmtree(generation_dir)
+            return embed_and_index(manifest["index_type"], layout=layout, use_store=use_store)
+        faiss.write_index(index, paths[name])
+        save_mmap_vectors(index, paths[name])
+        print(f"Done: {paths[name]} ({index.ntotal} vectors, {tombstones[name]} tombstones)")
+        if tombstones[name] > MAX_TOMBSTONE_RATIO * max(index.ntotal, 1):
+            print(f"⚠️ {name}: over {MAX_TOMBSTONE_RATIO:.0%} of vectors are tombstones, run a full build to compact")
+
+    write_meta_store(paths["meta_store"], metas_by_type)
+
+    # centroids move with every changed entry, so the (small) company index is rebuilt from stored vectors
+    companies = None
+    if store is not None:
+        try:
+            embeddings_by_type = {entry_type: stored_rows(metas, store) for entry_type, metas in metas_by_type.items()}
+            companies = write_company_index(paths, metas_by_type, embeddings_by_type, manifest["index_type"])
+        except LookupError as e:
+            print(f"❌ Company index not rebuilt: {e}. Run a full build to refill the store and rebuild it "
+                  f"(coarse retrieval falls back to chunk search until then)")
+    else:
+        print("⚠️ Company index needs the embedding store, skipped (coarse retrieval falls back to chunk search)")
+    finish_generation(generation_id, generation_dir, manifest["index_type"], layout, rows, next_row, tombstones, companies)
+
+def write_meta_store(path: str, metas_by_type: Dict[str, List[Dict]]):
+    # Projection store read by the API; company descriptions come from the raw corpus so
+    # comment-only companies still resolve their product metadata
+    print(f"\n📦 Writing metadata store to {path}...")
+    db = CorpusDB(CORPUS_DB)
+    try:
+        build_meta_store(path, metas_by_type, db.iter_entries(entry_type="description"))
+    finally:
+        db.close()
+
+def finish_generation(generation_id, generation_dir, index_type, layout, rows, next_row, tombstones, companies=None):
+    # manifest last: a generation without one is incomplete and never published
+    write_manifest(generation_dir, {
+        "generation": generation_id,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "embed_model": EMBED_MODEL_NAME,
+        "index_type": index_type,
+        "layouts": ["split", "unified"] if layout == "both" else [layout],
+        "counts": {entry_type: len(entry_rows) for entry_type, entry_rows in rows.items()},
+        "companies": companies,  # company centroid index size, None when not built
+        "next_row": next_row,
+        "tombstones": tombstones,
+        "rows": rows,
+    })
+    publish_generation(generation_id)
+    print(f"🚀 Published index generation {generation_id}")
 
 
 if __name__ == "__main__":
-    embed_and_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index-type", default=INDEX_TYPE, choices=INDEX_TYPES)
+    parser.add_argument("--layout", default=INDEX_LAYOUT, choices=["split", "unified", "both"])
+    parser.add_argument("--compare", action="store_true", help="print recall@k vs latency for each ANN type")
+    parser.add_argument("--synthetic", type=int, default=0, help="only run --compare on N synthetic vectors")
+    parser.add_argument("--incremental", action="store_true", help="embed only new / re-enhanced entries into the current generation")
+    parser.add_argument("--no-embedding-store", action="store_true", help="encode every text, skip the on-disk embedding store")
+    parser.add_argument("--workers", type=int, default=EMBED_SETTINGS["workers"], help="encoder processes (1 = in-process)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_SETTINGS["batch_size"])
+    args = parser.parse_args()
+    EMBED_SETTINGS.update(workers=args.workers, batch_size=args.batch_size)
+
+    if args.synthetic:
+        compare_index_types(synthetic_embeddings(args.synthetic))
+    elif args.incremental:
+        incremental_index(args.layout, not args.no_embedding_store)
+    else:
+        embed_and_index(args.index_type, args.compare, args.layout, not args.no_embedding_store)
\ No newline at end of file
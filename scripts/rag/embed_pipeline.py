@@ -0,0 +1,91 @@
+# parallel corpus embedding for CPU-only build hosts: length-sorted shards encoded by a process pool
+import multiprocessing as mp
+import os
+import time
+from typing import Callable, List
+
+import numpy as np
+
+_worker = {}
+
+def length_sorted_shards(texts: List[str], shard_size: int) -> List[List[str]]:
+    """
+    Deduplicate texts, sort by length and cut into shards, so every batch inside a shard
+    pads to a similar length instead of to the one long outlier.
+    """
+    ordered = sorted(dict.fromkeys(texts), key=len)
+    return [ordered[i:i + shard_size] for i in range(0, len(ordered), shard_size)]
+
+def _init_worker(model_name: str, normalize: bool, batch_size: int, threads: int):
+    # a raising initializer makes Pool respawn workers forever; keep the error for the first shard instead
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        torch.set_num_threads(threads)  # workers split the cores instead of each grabbing all of them
+        _worker.update(model=SentenceTransformer(model_name), normalize=normalize, batch_size=batch_size)
+    except Exception as e:
+        _worker["error"] = e
+
+def _encode_shard(shard: List[str]):
+    if "error" in _worker:
+        raise RuntimeError(f"Embedding worker failed to start: {_worker['error']!r}")
+    start = time.perf_counter()
+    vectors = _worker["model"].encode(
+        shard,
+        convert_to_numpy=True,
+        normalize_embeddings=_worker["normalize"],
+        show_progress_bar=False,
+        batch_size=_worker["batch_size"]
+    )
+    return shard, np.asarray(vectors, dtype=np.float32), time.perf_counter() - start, os.getpid()
+
+def parallel_encode(
+    texts: List[str],
+    on_shard: Callable[[List[str], np.ndarray], None],
+    model_name: str,
+    normalize: bool,
+    workers: int,
+    batch_size: int = 32,
+    shard_size: int = 1024
+) -> dict:
+    """
+    Encode texts with a pool of worker processes, each running its own model copy on
+    cpu_count // workers threads. Finished shards are handed to on_shard (e.g. EmbeddingStore.add)
+    as they arrive, so an interrupted run only loses the shards still in flight.
+    Returns throughput stats (texts/s overall, per worker process and per core).
+    """
+    shards = length_sorted_shards(texts, shard_size)
+    n_texts = sum(len(shard) for shard in shards)
+    if not shards:
+        return {"texts": 0}
+    workers = max(1, min(workers, len(shards)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"⚙️ Encoding {n_texts} texts in {len(shards)} shards on {workers} workers x {threads} threads...")
+
+    busy = {}  # pid -> (texts, seconds encoding)
+    done = 0
+    start = time.perf_counter()
+    # spawn: torch and forked OpenMP thread pools don't mix
+    with mp.get_context("spawn").Pool(workers, _init_worker, (model_name, normalize, batch_size, threads)) as pool:
+        for shard, vectors, seconds, pid in pool.imap_unordered(_encode_shard, shards):
+            on_shard(shard, vectors)
+            texts_done, busy_seconds = busy.get(pid, (0, 0.0))
+            busy[pid] = (texts_done + len(shard), busy_seconds + seconds)
+            done += len(shard)
+            elapsed = time.perf_counter() - start
+            print(f"  {done}/{n_texts} texts ({done / elapsed:.1f} texts/s)")
+    elapsed = time.perf_counter() - start
+
+    per_worker = [texts_done / seconds for texts_done, seconds in busy.values() if seconds > 0]
+    stats = {
+        "texts": n_texts,
+        "seconds": round(elapsed, 2),
+        "texts_per_s": round(n_texts / elapsed, 1),
+        "texts_per_s_per_worker": round(float(np.mean(per_worker)), 1) if per_worker else 0.0,
+        "texts_per_s_per_core": round(n_texts / elapsed / (workers * threads), 2),
+        "workers": workers,
+        "threads_per_worker": threads,
+    }
+    print(f"✅ {stats['texts_per_s']} texts/s total, {stats['texts_per_s_per_worker']} per worker, "
+          f"{stats['texts_per_s_per_core']} per core ({workers} workers x {threads} threads, {elapsed:.1f} s incl. model load)")
+    return stats
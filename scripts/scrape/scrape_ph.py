@@ -4,6 +4,8 @@ import requests
 import signal, sys
 from datetime import datetime
 from app.utils.ph_auth import get_cached_token
+from app.core.config import CORPUS_DB_PATH
+from app.core.corpus_db import CorpusDB
 
 # Config - each post crawl takes 10 complexity credits - 6250 per 15 minutes
 GRAPHQL_URL = "https://api.producthunt.com/v2/api/graphql"
@@ -14,7 +16,7 @@ MAX_WAIT_TIME = 900 + POLITE_DELTA # 15 minutes + 5 seconds for polite
 MAX_FAILURES = 10  # Number of consecutive failed attempts allowed
 CONSECUTIVE_FAILURES = 0
 
-OUTPUT_FILE = "app/data/scrapes/ph_scrape.json"
+OUTPUT_DB = CORPUS_DB_PATH # posts table, a re-scraped post replaces its earlier version
 PROGRESS_CACHE_FILE = ".cache/scrapes/meta_ph/ph_progress_cache.json"
 CACHE_FOLDER = ".cache/scrapes/checkpoints_ph/"
 CACHE_EVERY_N_BATCHES = 400
@@ -27,7 +29,7 @@ HEADERS = {
 }
 
 # Globals to use in SIGINT handler
-existing_map = {}
+corpus_db = None
 cache_map = {
     "after": None,
     "remaining_credits": INITIAL_COMPLEXITY_CREDITS,
@@ -53,26 +55,16 @@ def save_cache():
     with open(PROGRESS_CACHE_FILE, "w") as f:
         json.dump(cache_map, f, indent=2)
 
-def save_checkpoint(data, batch_idx):
+def save_checkpoint(batch_idx):
     os.makedirs(CACHE_FOLDER, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    path = os.path.join(CACHE_FOLDER, f"ph_scrape_cp_batch{batch_idx}_{timestamp}.json")
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+    path = os.path.join(CACHE_FOLDER, f"ph_scrape_cp_batch{batch_idx}_{timestamp}.sqlite")
+    corpus_db.backup(path)
     print(f"💾 Cached checkpoint at {path}")
 
-def load_existing_posts():
-    if os.path.exists(OUTPUT_FILE):
-        with open(OUTPUT_FILE, "r") as f:
-            try:
-                return json.load(f)
-            except:
-                return []
-    return []
-
 def save_posts(posts):
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(posts, f, indent=2)
+    # upsert only the new batch, however many posts are already stored
+    corpus_db.upsert_posts(posts)
 
 def make_graphql_request(query: str):
     response = requests.post(GRAPHQL_URL, headers=HEADERS, json={"query": query})
@@ -133,18 +125,17 @@ def get_batch_query():
 
 def handle_exit(signum, frame):
     print("\n⚠️ Interrupted. Saving current state...")
-    save_posts(list(existing_map.values()))
-    save_cache()
+    save_cache() # posts are already stored, batch by batch
     print("✅ State saved. Exiting.")
     sys.exit(0)
 
 signal.signal(signal.SIGINT, handle_exit)
 
 def main():
-    global existing_map
+    global corpus_db
 
     load_cache()
-    existing_map = {p["id"]: p for p in load_existing_posts()}
+    corpus_db = CorpusDB(OUTPUT_DB)
 
     print("🔁 Infinite Scraper started. Press [ctrl] + [c] anytime to quit gracefully.\n")
 
@@ -169,7 +160,6 @@ def main():
 
             if failure_count >= MAX_FAILURES:
                 print("🛑 Too many consecutive failures. Exiting scraper.")
-                save_posts(list(existing_map.values()))
                 save_cache()
                 break
 
@@ -180,28 +170,24 @@ def main():
         cache_map["batch_count"] += 1
         print(f"✅ Successful batch {cache_map['batch_count']} | Remaining credits: {cache_map['remaining_credits']}")
 
-        collected_edges = result["data"]["posts"]["edges"]
-        for edge in collected_edges:
-            post = edge["node"]
-            existing_map[post["id"]] = post
+        batch_posts = [edge["node"] for edge in result["data"]["posts"]["edges"]]
+        save_posts(batch_posts)
 
         page_info = result["data"]["posts"]["pageInfo"]
         cache_map["after"] = page_info["endCursor"]
-        print(f"✅ Stored {len(existing_map)} unique entries so far.")
+        print(f"✅ Stored {corpus_db.count('posts')} unique entries so far.")
 
         if not page_info["hasNextPage"]:
             print("✅ Reached end of feed. Exiting.")
             break;
 
         if cache_map["batch_count"] % CACHE_EVERY_N_BATCHES == 0:
-            save_checkpoint(list(existing_map.values()), cache_map["batch_count"])
+            save_checkpoint(cache_map["batch_count"])
 
-        save_posts(list(existing_map.values()))
         save_cache()
         time.sleep(POLITE_DELTA)
 
-    save_posts(list(existing_map.values()))
-    print(f"🔁 Terminated! Saving {len(existing_map)} unique entries to {OUTPUT_FILE}.")
+    print(f"🔁 Terminated! {corpus_db.count('posts')} unique entries stored in {OUTPUT_DB}.")
     save_cache()
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+# shared fixtures: small random corpora of unit vectors, like normalized sentence embeddings,
+# and index generations built from them in a temp dir
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from app.core import faiss_loader, generations
+from app.core.config import EMBED_MODEL_NAME
+from app.core.faiss_loader import IndexGeneration
+from app.core.generations import generation_paths, new_generation, write_manifest
+from app.core.index_factory import ENTRY_TYPES, build_index, build_unified_index
+from app.core.meta_store import build_meta_store
+
+
+def unit_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def make_corpus(n_companies: int = 40, dim: int = 16, seed: int = 0) -> tuple:
+    """
+    Metadata lists + embeddings per entry type: one description and 0-5 comments per company,
+    comments scattered around their company's description so companies collect several hits.
+    """
+    rng = np.random.default_rng(seed)
+    centers = unit_vectors(n_companies, dim, seed)
+    metas = {"description": [], "comment": []}
+    vectors = {"description": [], "comment": []}
+    for c in range(n_companies):
+        company_id = f"ph_{c}"
+        metas["description"].append({"id": company_id, "type": "description", "company_id": company_id,
+                                     "text": f"Product {c}", "meta": {"name": f"Product {c}"}})
+        vectors["description"].append(centers[c])
+        for i in range(int(rng.integers(0, 6))):
+            metas["comment"].append({"id": f"{company_id}_c{i}", "type": "comment", "company_id": company_id,
+                                     "text": f"Comment {i} on product {c}", "meta": {"parent_id": company_id}})
+            vectors["comment"].append(centers[c] + 0.3 * rng.standard_normal(dim).astype(np.float32))
+    embeddings = {}
+    for entry_type, rows in vectors.items():
+        rows = np.asarray(rows, dtype=np.float32)
+        embeddings[entry_type] = rows / np.linalg.norm(rows, axis=1, keepdims=True)
+    return metas, embeddings
+
+def write_generation(generation_dir: str, metas: dict, embeddings: dict, index_type: str = "flat") -> IndexGeneration:
+    """Split + unified indexes and the SQLite metadata store, as build_corpus_index lays them out."""
+    os.makedirs(generation_dir, exist_ok=True)
+    paths = generation_paths(generation_dir)
+    for entry_type in ENTRY_TYPES:
+        faiss.write_index(build_index(embeddings[entry_type], index_type), paths[entry_type])
+    faiss.write_index(build_unified_index(embeddings, index_type), paths["unified"])
+    build_meta_store(paths["meta_store"], metas, metas["description"])
+    return IndexGeneration(None, paths)
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    return unit_vectors(1000, 32)
+
+@pytest.fixture
+def corpus() -> tuple:
+    return make_corpus()
+
+@pytest.fixture
+def generation(tmp_path, corpus) -> IndexGeneration:
+    return write_generation(str(tmp_path / "generation"), *corpus)
+
+@pytest.fixture
+def generations_dir(tmp_path, monkeypatch) -> str:
+    """GENERATIONS_DIR + CURRENT in a temp dir, and no generation loaded in this process."""
+    root = str(tmp_path / "generations")
+    os.makedirs(root)
+    monkeypatch.setattr(generations, "GENERATIONS_DIR", root)
+    monkeypatch.setattr(generations, "CURRENT_GENERATION_PATH", os.path.join(root, "CURRENT"))
+    monkeypatch.setattr(faiss_loader, "GENERATIONS_DIR", root)
+    monkeypatch.setattr(faiss_loader, "_generation", None)
+    return root
+
+def build_generation(metas: dict, embeddings: dict) -> str:
+    """Write a complete generation into GENERATIONS_DIR (manifest last, unpublished); returns its id."""
+    generation_id, generation_dir = new_generation()
+    write_generation(generation_dir, metas, embeddings)
+    write_manifest(generation_dir, {"embed_model": EMBED_MODEL_NAME, "counts": {t: len(m) for t, m in metas.items()}})
+    return generation_id
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from app.utils.cache import SqliteCache, TTLCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / "expansions.sqlite")
+    TTLCache(ttl=60, disk=SqliteCache(path)).set("idea", ["a", "b"])
+
+    other_worker = TTLCache(ttl=60, disk=SqliteCache(path))
+    assert other_worker.get("idea") == ["a", "b"]
+    assert other_worker.get("idea") == ["a", "b"]
+    assert other_worker.get("other") is None
+    assert {k: other_worker.stats()[k] for k in ("hits", "disk_hits", "misses")} == {"hits": 1, "disk_hits": 1, "misses": 1}
+
+def test_async_access_matches_sync(tmp_path):
+    path = str(tmp_path / "expansions.sqlite")
+
+    async def roundtrip():
+        await TTLCache(ttl=60, disk=SqliteCache(path)).set_async("idea", ["a"])
+        other_worker = TTLCache(ttl=60, disk=SqliteCache(path))
+        return await other_worker.get_async("idea"), await other_worker.get_async("missing"), other_worker.stats()
+
+    value, missing, stats = asyncio.run(roundtrip())
+    assert value == ["a"] and missing is None
+    assert (stats["disk_hits"], stats["misses"]) == (1, 1)
+
+def test_expired_entries_miss(tmp_path):
+    cache = TTLCache(ttl=-1, disk=SqliteCache(str(tmp_path / "expansions.sqlite")))
+    cache.set("idea", ["a"])
+    assert cache.get("idea") is None
+
+def test_disk_tier_is_created_on_first_lookup(tmp_path):
+    path = tmp_path / "query" / "expansions.sqlite"
+    script = (
+        "import os, sys\n"
+        "from app.llm.expander import expansion_cache\n"
+        "assert not os.path.exists(sys.argv[1]), 'created at import'\n"
+        "assert expansion_cache.get('idea') is None\n"
+        "assert os.path.exists(sys.argv[1]), 'not created on lookup'\n"
+    )
+    env = dict(os.environ, EXPANSION_CACHE_DB=str(path))
+    proc = subprocess.run([sys.executable, "-c", script, str(tmp_path / "query")], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
@@ -0,0 +1,71 @@
+import json
+import sys
+
+import pytest
+
+from app.core.corpus_db import CorpusDB
+from app.utils.corpus_io import read_records, write_records
+from scripts.chores import migrate_corpus_to_db
+
+
+def raw_entry(entry_id, entry_type="description", company_id=None, text="raw"):
+    return {"id": entry_id, "type": entry_type, "company_id": company_id or entry_id, "text": text, "meta": {}}
+
+@pytest.fixture
+def legacy_files(tmp_path, monkeypatch):
+    """The scrape / raw / enhanced corpus files in both legacy formats, written where the migration looks."""
+    paths = {name: [str(tmp_path / f"{name}.json"), str(tmp_path / f"{name}.jsonl")] for name in ("scrape", "raw", "enhanced")}
+    monkeypatch.setattr(migrate_corpus_to_db, "SCRAPE_FILES", paths["scrape"])
+    monkeypatch.setattr(migrate_corpus_to_db, "RAW_FILES", paths["raw"])
+    monkeypatch.setattr(migrate_corpus_to_db, "ENHANCED_FILES", paths["enhanced"])
+
+    with open(paths["scrape"][0], "w") as f:
+        json.dump([{"id": "p1", "name": "one"}, {"id": "p2", "name": "two"}], f)
+    write_records(paths["scrape"][1], [{"id": "p2", "name": "two (rescraped)"}])
+    with open(paths["raw"][0], "w") as f:
+        json.dump([raw_entry("p1"), raw_entry("p1_c1", "comment", "p1")], f)
+    # appended JSONL: a later record with the same id supersedes the earlier one, plus a torn last line
+    write_records(paths["raw"][1], [raw_entry("p2", text="old"), raw_entry("p2", text="new")])
+    with open(paths["raw"][1], "a") as f:
+        f.write('{"id": "p3", "ty')
+    write_records(paths["enhanced"][1], [dict(raw_entry("p1", text="standardized"), enhancementVersion="v1")])
+    return paths
+
+def migrate(db_path, *flags, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["migrate_corpus_to_db", "--db", db_path, *flags])
+    migrate_corpus_to_db.main()
+
+def test_migration_loads_every_legacy_file(tmp_path, legacy_files, monkeypatch):
+    db_path = str(tmp_path / "corpus.sqlite")
+    migrate(db_path, monkeypatch=monkeypatch)
+    migrate(db_path, monkeypatch=monkeypatch)  # re-running is an upsert, not a duplicate import
+
+    db = CorpusDB(db_path)
+    assert [post["name"] for post in db.iter_posts()] == ["one", "two (rescraped)"]
+    assert [(e["id"], e["text"]) for e in db.iter_entries()] == [("p1", "raw"), ("p1_c1", "raw"), ("p2", "new")]
+    assert [e["id"] for e in db.iter_entries(enhanced=False)] == ["p1_c1", "p2"]
+    enhanced = list(db.iter_enhanced())
+    assert [(e["id"], e["text"], e["enhancementVersion"], e["isEnhanced"]) for e in enhanced] == [("p1", "standardized", "v1", True)]
+    assert db.company_description("p1")["text"] == "raw"
+    assert db.company_description("p1_c1") is None
+    db.close()
+
+def test_export_round_trips_enhanced_entries(tmp_path, legacy_files, monkeypatch):
+    db_path = str(tmp_path / "corpus.sqlite")
+    migrate(db_path, monkeypatch=monkeypatch)
+    migrate(db_path, "--export", monkeypatch=monkeypatch)
+
+    db = CorpusDB(db_path)
+    assert list(read_records(legacy_files["enhanced"][1])) == list(db.iter_enhanced())
+    db.close()
+
+def test_rebuilding_raw_entries_keeps_enhancement_state(tmp_path):
+    db = CorpusDB(str(tmp_path / "corpus.sqlite"))
+    db.upsert_entries([raw_entry("p1"), raw_entry("p1_c1", "comment", "p1")])
+    db.save_enhanced([dict(raw_entry("p1", text="standardized"), enhancementVersion="v1")])
+    db.upsert_entries([raw_entry("p1", text="rescraped")])
+
+    assert db.company_description("p1")["text"] == "rescraped"
+    assert [e["text"] for e in db.iter_enhanced()] == ["standardized"]
+    assert (db.count(), db.count(enhanced=True), db.count(entry_type="comment")) == (2, 1, 1)
+    db.close()
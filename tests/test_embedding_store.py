@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.utils.embedding_store import EmbeddingStore
+
+
+def encoder(dim=8):
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.stack([np.random.default_rng(abs(hash(text)) % 2**32).standard_normal(dim) for text in texts]).astype(np.float32)
+    return encode, calls
+
+def test_reopened_store_encodes_only_new_texts(tmp_path):
+    encode, calls = encoder()
+    store = EmbeddingStore(str(tmp_path), "model", normalize=True)
+    first = store.get_or_compute(["a", "b", "a"], encode)
+    store.close()
+
+    store = EmbeddingStore(str(tmp_path), "model", normalize=True)
+    second = store.get_or_compute(["b", "c", "a"], encode)
+    assert calls == [["a", "b"], ["c"]]
+    np.testing.assert_array_equal(second[[0, 2]], first[[1, 0]])
+    assert store.size == 3 and os.path.getsize(store.vectors_path) == 3 * 8 * 4
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    encode, calls = encoder()
+    store = EmbeddingStore(str(tmp_path), "model", normalize=True)
+    stored = store.get_or_compute(["a", "b"], encode)
+    store.close()
+    # an add interrupted after its vectors were appended but before the hashes were committed
+    with open(os.path.join(str(tmp_path), "vectors.f32"), "ab") as f:
+        f.write(np.ones((2, 8), dtype=np.float32).tobytes() + b"\x00\x01")
+
+    store = EmbeddingStore(str(tmp_path), "model", normalize=True)
+    assert store.size == 2 and os.path.getsize(store.vectors_path) == 2 * 8 * 4
+    vectors = store.get_or_compute(["a", "c", "b"], encode)
+    assert calls[-1] == ["c"]
+    np.testing.assert_array_equal(vectors[[0, 2]], stored)
+    np.testing.assert_array_equal(vectors[1], encode(["c"])[0])
+    np.testing.assert_array_equal(store.lookup(["c"])[0]["c"], vectors[1])
+
+def test_torn_first_add_leaves_an_empty_store(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "model", normalize=True)
+    store.close()
+    with open(os.path.join(str(tmp_path), "vectors.f32"), "wb") as f:
+        f.write(b"\x00" * 20)
+
+    store = EmbeddingStore(str(tmp_path), "model", normalize=True)
+    assert store.size == 0 and os.path.getsize(store.vectors_path) == 0
+    assert store.lookup(["a"]) == ({}, ["a"])
+
+def test_refuses_another_embedding_space(tmp_path):
+    EmbeddingStore(str(tmp_path), "model", normalize=True).close()
+    with pytest.raises(ValueError, match="model_name"):
+        EmbeddingStore(str(tmp_path), "other-model", normalize=True)
+    with pytest.raises(ValueError, match="normalize"):
+        EmbeddingStore(str(tmp_path), "model", normalize=False)
@@ -0,0 +1,69 @@
+import faiss
+import numpy as np
+import pytest
+
+from app.core import faiss_loader
+from app.core.faiss_loader import _load_faiss_index
+from app.core.index_factory import MemmapFlatIndex, build_id_index, build_index, encode_ids, save_mmap_vectors, search_index
+
+
+def write(index: faiss.Index, path: str, with_vectors: bool) -> str:
+    faiss.write_index(index, path)
+    if with_vectors:
+        save_mmap_vectors(index, path)
+    return path
+
+@pytest.mark.parametrize("index_type, with_vectors, loaded_as", [
+    ("flat", True, MemmapFlatIndex),
+    ("flat", False, faiss.Index),  # built before .vectors.npy existed: FAISS mmap IO flags
+    ("ivf", True, faiss.Index),    # no .vectors.npy; IO_FLAG_MMAP_IFC is refused for IVF lists, retried without it
+    ("hnsw", False, faiss.Index),
+])
+def test_mmap_loading_matches_memory_loading(tmp_path, embeddings, monkeypatch, index_type, with_vectors, loaded_as):
+    path = write(build_index(embeddings, index_type), str(tmp_path / "index.faiss"), with_vectors)
+    queries = embeddings[:5] + 0.01
+
+    monkeypatch.setattr(faiss_loader, "INDEX_LOAD_MODE", "memory")
+    expected = _load_faiss_index(path).search(queries, 10)
+    monkeypatch.setattr(faiss_loader, "INDEX_LOAD_MODE", "mmap")
+    index = _load_faiss_index(path)
+
+    assert isinstance(index, loaded_as)
+    scores, rows = index.search(queries, 10)
+    assert rows.tolist() == expected[1].tolist()
+    np.testing.assert_allclose(scores, expected[0], rtol=1e-5)
+
+def test_mmap_id_index_returns_ids_and_filters(tmp_path, embeddings, monkeypatch):
+    ids = encode_ids(1, np.arange(len(embeddings)))
+    path = write(build_id_index(embeddings, ids, "flat"), str(tmp_path / "unified.faiss"), with_vectors=True)
+    monkeypatch.setattr(faiss_loader, "INDEX_LOAD_MODE", "mmap")
+    index = _load_faiss_index(path)
+
+    _, hits = search_index(index, embeddings[[7, 8]], 1)
+    assert hits[:, 0].tolist() == ids[[7, 8]].tolist()
+    _, hits = search_index(index, embeddings[[7]], 3, ids=ids[[100, 200, 300]])
+    assert sorted(hits[0].tolist()) == sorted(ids[[100, 200, 300]].tolist())
+    _, hits = search_index(index, embeddings[[7]], 3, type_codes=[0])
+    assert hits.tolist() == [[-1, -1, -1]]
+
+@pytest.mark.parametrize("sorted_on_disk", [True, False])
+def test_mmap_filters_match_the_faiss_id_index(tmp_path, embeddings, sorted_on_disk):
+    # two types, ids out of order and with gaps, like an id index after incremental updates
+    rng = np.random.default_rng(0)
+    ids = np.concatenate([encode_ids(0, rng.choice(5000, 400, replace=False)), encode_ids(1, rng.choice(5000, 600, replace=False))])
+    ids = ids[rng.permutation(len(ids))]
+    faiss_index = build_id_index(embeddings, ids, "flat")
+    path = write(faiss_index, str(tmp_path / "unified.faiss"), with_vectors=True)
+    if not sorted_on_disk:  # an older build's .npy files, in index order
+        np.save(str(tmp_path / "unified.vectors.npy"), embeddings)
+        np.save(str(tmp_path / "unified.ids.npy"), ids)
+    index = MemmapFlatIndex(path)
+    assert (index._order is None) == sorted_on_disk
+    queries = embeddings[:4] + 0.01
+
+    allowed = np.concatenate([ids[rng.choice(len(ids), 50, replace=False)], encode_ids(1, [9999])])  # plus an unknown id
+    for filters in ({}, {"ids": allowed}, {"type_codes": [0]}, {"type_codes": [1]}, {"type_codes": [0, 1]}):
+        expected = search_index(faiss_index, queries, 10, **filters)
+        scores, hits = search_index(index, queries, 10, **filters)
+        assert hits.tolist() == expected[1].tolist()
+        np.testing.assert_allclose(scores, expected[0], rtol=1e-5)
@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.core import faiss_loader, generations
+from app.core.faiss_loader import current_generation, pinned_generation, reload_generation
+from app.core.generations import (
+    acquire_lease, current_generation_id, is_leased, prune_generations, publish_generation, release_lease
+)
+from app.services.retriever import search_vectors
+from tests.conftest import build_generation, make_corpus, unit_vectors, write_generation
+
+
+def on_disk(root: str) -> list:
+    return sorted(name for name in os.listdir(root) if name != "CURRENT")
+
+def dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+def search(generation=None, layout="split"):
+    companies, _ = search_vectors(unit_vectors(3, 16, seed=1), [2.0, 1.0, 1.0], 3, layout=layout, overfetch="fixed", generation=generation)
+    return [company["company_id"] for company in companies]
+
+def test_publish_points_current_at_the_build_and_prunes_old_ones(generations_dir, monkeypatch):
+    monkeypatch.setattr(generations, "GENERATIONS_KEEP", 2)
+    built = []
+    for seed in range(4):
+        built.append(build_generation(*make_corpus(seed=seed)))
+        publish_generation(built[-1])
+        assert current_generation_id() == built[-1]
+    assert on_disk(generations_dir) == built[-2:]
+
+def test_prune_keeps_generations_leased_by_running_workers(generations_dir):
+    old, leased, current = (build_generation(*make_corpus(seed=seed)) for seed in range(3))
+    publish_generation(current)
+    lease = acquire_lease(leased)
+    os.mkdir(os.path.join(generations_dir, old, generations.LEASES_DIR))
+    open(os.path.join(generations_dir, old, generations.LEASES_DIR, str(dead_pid())), "w").close()
+
+    prune_generations(keep=0)
+    assert on_disk(generations_dir) == [leased, current]
+    release_lease(leased, lease)
+    assert not is_leased(leased)
+    prune_generations(keep=0)
+    assert on_disk(generations_dir) == [current]
+
+def test_lease_on_a_pruned_generation_fails(generations_dir):
+    with pytest.raises(FileNotFoundError):
+        acquire_lease("20260101-000000")
+    assert on_disk(generations_dir) == []
+
+def test_hot_swap_keeps_the_pinned_generation_until_the_request_ends(generations_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(generations, "GENERATIONS_KEEP", 1)
+    first = build_generation(*make_corpus(seed=0))
+    publish_generation(first)
+    unified_before = search(write_generation(str(tmp_path / "copy"), *make_corpus(seed=0)), layout="unified")
+
+    with pinned_generation() as pinned:
+        assert pinned.generation_id == first
+        second = build_generation(*make_corpus(seed=1))
+        publish_generation(second)
+        assert reload_generation()["swapped"]
+        assert current_generation().generation_id == second
+        third = build_generation(*make_corpus(seed=2))
+        publish_generation(third)  # first is GENERATIONS_KEEP publishes old, but still pinned here
+        assert first in on_disk(generations_dir)
+        # the unified index was never loaded on the first generation: lazy load after the prune
+        assert search(pinned, layout="unified") == unified_before
+
+    assert not is_leased(first)
+    prune_generations(keep=1)
+    assert first not in on_disk(generations_dir)
+    assert search() == search(faiss_loader.load_generation(second))
+
+def test_reload_is_a_no_op_without_a_new_generation(generations_dir):
+    publish_generation(build_generation(*make_corpus()))
+    generation = current_generation()
+    assert reload_generation()["swapped"] is False
+    assert current_generation() is generation
+
+def test_a_stale_object_releases_only_its_own_lease(generations_dir):
+    first, second, third = (build_generation(*make_corpus(seed=seed)) for seed in range(3))
+    publish_generation(first)
+    with pinned_generation() as stale:
+        publish_generation(second)
+        reload_generation()
+        publish_generation(first)  # roll back: a new object for the same generation goes live
+        reload_generation()
+        assert current_generation() is not stale and current_generation().generation_id == first
+    # the stale object's last unpin dropped its lease; the live object's lease still keeps first on disk
+    publish_generation(third)
+    prune_generations(keep=0)
+    assert on_disk(generations_dir) == [first, third]
+
+def test_forced_reload_of_the_same_generation_keeps_it_leased(generations_dir):
+    generation_id = build_generation(*make_corpus())
+    publish_generation(generation_id)
+    previous = current_generation()
+    reload_generation(force=True)
+    assert current_generation() is not previous
+    leases = os.listdir(os.path.join(generations_dir, generation_id, generations.LEASES_DIR))
+    assert leases == [current_generation().lease]
@@ -0,0 +1,107 @@
+import json
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from app.core import index_factory
+from app.core.index_factory import (
+    INDEX_TYPES, build_id_index, decode_ids, encode_ids, make_index, search_index, set_search_params, update_index
+)
+from app.services.retriever import search_vectors
+from scripts.rag.build_corpus_index import diff_entries, row_map
+from tests.conftest import make_corpus, unit_vectors, write_generation
+
+
+@pytest.fixture(autouse=True)
+def small_pq(monkeypatch):
+    monkeypatch.setattr(index_factory, "PQ_NBITS", 4)  # 256-entry codebooks take ~40s to train on one core
+
+def searchable(index):
+    return set_search_params(index, nprobe=1024, ef_search=256)
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_search_after_removing_rows_returns_the_right_ids(embeddings, index_type):
+    index = build_id_index(embeddings[:1000], np.arange(1000), index_type)
+    added = unit_vectors(100, 32, seed=7)
+    tombstones = update_index(index, added, np.arange(1000, 1100), np.arange(100))
+
+    _, ids = searchable(index).search(np.concatenate([embeddings[[500, 999]], added[[50]]]), 1)
+    assert ids[:, 0].tolist() == [500, 999, 1050]
+    if index_type == "hnsw":
+        assert tombstones == 100 and index.ntotal == 1100  # can't delete: metadata rows are gone instead
+    else:
+        assert tombstones == 0 and index.ntotal == 1000
+        _, ids = index.search(embeddings[:100], 1)
+        assert ids.min() >= 100
+
+@pytest.mark.parametrize("index_type", ["ivf", "ivfpq"])
+def test_unified_ivf_keeps_typed_ids_after_removal(embeddings, index_type):
+    ids = np.concatenate([encode_ids(0, np.arange(500)), encode_ids(1, np.arange(500))])
+    index = searchable(build_id_index(embeddings, ids, index_type))
+    update_index(index, None, np.array([], dtype=np.int64), encode_ids(0, np.arange(250)))
+
+    _, hits = search_index(index, embeddings[[300, 700]], 1)
+    codes, rows = decode_ids(hits[:, 0])
+    assert list(zip(codes.tolist(), rows.tolist())) == [(0, 300), (1, 200)]
+    _, hits = search_index(index, embeddings[[300]], 5, type_codes=[1])
+    assert (decode_ids(hits)[0] == 1).all()
+
+def test_removal_from_an_ivf_under_an_id_map_is_refused(embeddings):
+    # how IVF indexes were built before they kept their own ids
+    index = faiss.IndexIDMap(make_index(embeddings, "ivf"))
+    index.add_with_ids(embeddings, np.arange(1000))
+    assert update_index(index, embeddings[:2], np.array([1000, 1001]), np.array([], dtype=np.int64)) == 0
+    with pytest.raises(ValueError):
+        update_index(index, None, np.array([], dtype=np.int64), np.arange(100))
+
+def entry(entry_id: str, text: str, version: int = 1) -> dict:
+    return {"id": entry_id, "standardized": text, "enhancementVersion": version}
+
+def test_diff_keeps_unchanged_rows_and_never_reuses_rows():
+    before = [entry("a", "A"), entry("b", "B"), entry("c", "C")]
+    previous = row_map(before)
+
+    after = [entry("a", "A"), entry("c", "C2"), entry("d", "D"), entry("a", "dup")]
+    rows, added, removed, next_row, metas = diff_entries(previous, after, next_row=3)
+
+    assert {entry_id: row[0] for entry_id, row in rows.items()} == {"a": 0, "c": 3, "d": 4}
+    assert [(row, e["id"]) for row, e in added] == [(3, "c"), (4, "d")]
+    assert removed == [1, 2]  # b deleted, c superseded by its re-enhanced text
+    assert next_row == 5
+    assert [e and e["id"] for e in metas] == ["a", None, None, "c", "d"]
+
+    # a second run with nothing changed is a no-op
+    assert diff_entries(rows, after, next_row)[1:4] == ([], [], 5)
+
+def test_retrieval_skips_tombstoned_rows(tmp_path):
+    # as an incremental build leaves an HNSW index: the vector is still indexed, its metadata row is gone
+    metas, embeddings = make_corpus()
+    generation = write_generation(str(tmp_path / "generation"), metas, embeddings, index_type="hnsw")
+    tombstoned = metas["description"][0]["company_id"]
+    metas["description"][0] = None
+    os.remove(generation.paths["meta_store"])  # JSON metadata lists instead (ListMetaStore)
+    for entry_type, meta in metas.items():
+        with open(generation.paths[f"{entry_type}_meta"], "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    companies, _ = search_vectors(embeddings["description"][[0]], [1.0], 3, overfetch="fixed", generation=generation)
+    matches = [(m["type"], m["match_meta"]["id"]) for company in companies for m in company["matches"]]
+    assert ("description", tombstoned) not in matches
+    assert all(match_id for _, match_id in matches)
+
+def test_company_centroid_rows_come_only_from_the_store(tmp_path):
+    from app.utils.embedding_store import EmbeddingStore
+    from scripts.rag.build_corpus_index import stored_rows
+
+    store = EmbeddingStore(str(tmp_path / "store"), "model", normalize=True)
+    store.add(["A", "C"], unit_vectors(2, 8))
+    metas = [entry("a", "A"), None, entry("c", "C")]
+    embeddings = stored_rows(metas, store)
+    np.testing.assert_array_equal(embeddings, np.stack([unit_vectors(2, 8)[0], np.zeros(8), unit_vectors(2, 8)[1]]))
+
+    # an unstored text is reported, never encoded
+    with pytest.raises(LookupError, match="1 of 3"):
+        stored_rows(metas + [entry("d", "D")], store)
+    assert stored_rows([None, None], store) is None
@@ -0,0 +1,58 @@
+import faiss
+import numpy as np
+import pytest
+
+from app.core import index_factory
+from app.core.index_factory import (
+    ENTRY_TYPES, INDEX_TYPES, build_index, build_unified_index, decode_ids, encode_ids, index_factory_string,
+    search_index, set_search_params
+)
+
+
+def test_factory_string_scales_params_to_corpus_size():
+    assert index_factory_string("flat", 10, 32) == "Flat"
+    assert index_factory_string("ivf", 390, 32) == "IVF10,Flat"  # 39 points per centroid
+    assert index_factory_string("ivf", 10, 32) == "IVF1,Flat"
+    assert index_factory_string("ivfpq", 1000, 32) == "IVF25,PQ16x8"
+    assert index_factory_string("ivfpq", 100, 32) == "IVF2,PQ16x6"  # 2^nbits codebook entries need training points
+
+def test_factory_string_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        index_factory_string("annoy", 100, 32)
+    with pytest.raises(ValueError):
+        index_factory_string("ivfpq", 100, 30)  # PQ_M doesn't divide the dim
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_every_type_finds_an_indexed_vector(embeddings, index_type, monkeypatch):
+    monkeypatch.setattr(index_factory, "PQ_NBITS", 4)  # 256-entry codebooks take ~40s to train on one core
+    index = set_search_params(build_index(embeddings, index_type), nprobe=64, ef_search=64)
+    assert index.ntotal == len(embeddings)
+    _, rows = index.search(embeddings[[3, 500, 999]], 1)
+    assert rows[:, 0].tolist() == [3, 500, 999]
+
+def test_set_search_params_only_touches_matching_knobs(embeddings):
+    ivf = set_search_params(build_index(embeddings, "ivf"), nprobe=7, ef_search=11)
+    assert faiss.extract_index_ivf(ivf).nprobe == 7
+    hnsw = set_search_params(build_index(embeddings, "hnsw"), nprobe=7, ef_search=11)
+    assert hnsw.hnsw.efSearch == 11
+    set_search_params(build_index(embeddings, "flat"), nprobe=7, ef_search=11)  # nothing to set, no error
+
+def test_unified_ids_round_trip():
+    rows = np.array([0, 1, 12345, (1 << 32) - 1])
+    for code in range(len(ENTRY_TYPES)):
+        codes, decoded = decode_ids(encode_ids(code, rows))
+        assert codes.tolist() == [code] * len(rows)
+        assert decoded.tolist() == rows.tolist()
+
+def test_decode_keeps_faiss_padding_missing():
+    codes, rows = decode_ids(np.array([[encode_ids(1, 7), -1]]))
+    assert rows.tolist() == [[7, -1]]
+    assert codes.tolist() == [[1, 0]]
+
+def test_type_selector_only_returns_that_type(embeddings):
+    index = build_unified_index({"description": embeddings[:500], "comment": embeddings[500:]}, "flat")
+    _, ids = search_index(index, embeddings[:3], 10, type_codes=[1])
+    codes, rows = decode_ids(ids)
+    assert (codes == 1).all() and (rows >= 0).all()
+    _, ids = search_index(index, embeddings[:3], 1, type_codes=[0])
+    assert decode_ids(ids)[1][:, 0].tolist() == [0, 1, 2]
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from app.services import retriever
+from app.services.retriever import OverfetchStats, search_vectors
+from tests.conftest import make_corpus, unit_vectors, write_generation
+from tests.test_retriever import WEIGHTS, company_ranking, queries
+
+
+@pytest.fixture
+def stats(monkeypatch) -> OverfetchStats:
+    stats = OverfetchStats()
+    monkeypatch.setattr(retriever, "overfetch_stats", stats)
+    return stats
+
+@pytest.fixture
+def hot_generation(tmp_path):
+    """ph_0 gets 60 comments right next to its description, enough to fill a small comment search on its own."""
+    metas, embeddings = make_corpus()
+    center = embeddings["description"][0]
+    hot = center + 0.05 * unit_vectors(60, center.shape[0], seed=7)
+    metas["comment"] += [{"id": f"ph_0_hot{i}", "type": "comment", "company_id": "ph_0", "text": f"Hot comment {i}", "meta": {}}
+                         for i in range(len(hot))]
+    embeddings["comment"] = np.concatenate([embeddings["comment"], hot / np.linalg.norm(hot, axis=1, keepdims=True)])
+    return write_generation(str(tmp_path / "hot"), metas, embeddings), np.repeat(center[None], 3, axis=0)
+
+def test_covered_first_search_matches_fixed(generation, stats):
+    adaptive = search_vectors(queries(), WEIGHTS, 5, overfetch="adaptive", generation=generation)
+    assert company_ranking(adaptive) == company_ranking(search_vectors(queries(), WEIGHTS, 5, overfetch="fixed", generation=generation))
+    assert (stats.stats()["searches"], stats.stats()["ratios"]) == (2, {2: 2})  # one search each
+
+def test_widens_until_top_k_companies_are_covered(hot_generation, stats):
+    generation, query_vecs = hot_generation
+    fixed, _ = search_vectors(query_vecs, WEIGHTS, 5, entry_types=["comment"], overfetch="fixed", generation=generation)
+    adaptive, _ = search_vectors(query_vecs, WEIGHTS, 5, entry_types=["comment"], overfetch="adaptive", generation=generation)
+    assert [c["company_id"] for c in fixed] == ["ph_0"]
+    assert len(adaptive) == 5 and adaptive[0]["company_id"] == "ph_0"
+    s = stats.stats()
+    assert s["searches"] == 1 + 4 and s["underfilled"] == 1  # fixed: one under-filled search; adaptive: 2x, 4x, 8x, 16x
+    assert s["ratios"] == {2: 1, 16: 1}
+
+def test_stops_at_the_budget(hot_generation, stats, monkeypatch):
+    generation, query_vecs = hot_generation
+    monkeypatch.setattr(retriever, "OVERFETCH_MAX_RATIO", 4)
+    companies, _ = search_vectors(query_vecs, WEIGHTS, 5, entry_types=["comment"], overfetch="adaptive", generation=generation)
+    assert [c["company_id"] for c in companies] == ["ph_0"]
+    assert {k: stats.stats()[k] for k in ("searches", "underfilled", "capped", "ratio_max")} == \
+        {"searches": 2, "underfilled": 1, "capped": 1, "ratio_max": 4}
+
+def test_stops_when_a_wider_search_adds_nothing(generation, stats):
+    # 40 companies, each with one description: every round past the first returns the same 40 candidates
+    companies, _ = search_vectors(queries(), WEIGHTS, 50, entry_types=["description"], overfetch="adaptive", generation=generation)
+    assert len(companies) == 40
+    assert {k: stats.stats()[k] for k in ("searches", "underfilled", "capped")} == {"searches": 2, "underfilled": 1, "capped": 0}
+
+def test_company_filter_caps_the_target(generation, stats):
+    companies, _ = search_vectors(queries(), WEIGHTS, 5, company_ids=["ph_3", "ph_7"], overfetch="adaptive", generation=generation)
+    assert {c["company_id"] for c in companies} == {"ph_3", "ph_7"}
+    assert (stats.stats()["searches"], stats.stats()["underfilled"]) == (1, 0)
@@ -0,0 +1,111 @@
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import rate_limiter
+from app.utils.rate_limiter import rate_limit_delay, retry_after_seconds
+
+NOW = datetime(2026, 10, 21, 7, 28, 0, tzinfo=timezone.utc).timestamp()
+
+
+class RateLimitError(Exception):
+    """Same class name as the together / openai SDK errors."""
+
+class APIError(Exception):
+    def __init__(self, message, http_status=None, headers=None):
+        super().__init__(message)
+        self.http_status = http_status
+        self.headers = headers
+
+def test_rate_limits_are_detected_from_status_or_type():
+    assert rate_limit_delay(APIError("slow down", http_status=429, headers={"Retry-After": "3"})) == 3.0
+    assert rate_limit_delay(APIError("slow down", http_status=429, headers={"retry-after-ms": "1500"})) == 1.5
+    response = SimpleNamespace(status_code=429, headers={"retry-after": "2"})
+    assert rate_limit_delay(type("HTTPError", (Exception,), {"response": response})("x")) == 2.0
+    assert rate_limit_delay(RateLimitError("quota")) == 0.0
+
+def test_other_errors_are_not_rate_limits_whatever_they_say():
+    assert rate_limit_delay(APIError("upstream returned 429 too many requests", http_status=500)) is None
+    assert rate_limit_delay(ValueError("rate limit of 429 tokens exceeded")) is None
+    assert rate_limit_delay(TimeoutError()) is None
+
+@pytest.fixture
+def away_from_utc(monkeypatch):
+    """A local timezone 5h off UTC, so a date read as local time would be off by hours."""
+    monkeypatch.setenv("TZ", "EST+05")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+@pytest.mark.parametrize("value", ["Wed, 21 Oct 2026 07:28:30 GMT", "Wed, 21 Oct 2026 07:28:30 -0000", "Wed, 21 Oct 2026 09:28:30 +0200"])
+def test_retry_after_http_dates_are_utc(away_from_utc, monkeypatch, value):
+    monkeypatch.setattr(rate_limiter.time, "time", lambda: NOW)
+    assert retry_after_seconds({"Retry-After": value}) == 30.0
+
+def test_retry_after_in_the_past_or_garbled():
+    assert retry_after_seconds({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+    assert retry_after_seconds({"retry-after": "soon"}) is None
+    assert retry_after_seconds(None) is None
+
+class FakeClock:
+    """monotonic() / sleep() for the limiter: sleeping just advances the clock."""
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep, time=lambda: NOW))
+    return clock
+
+def test_requests_per_second_refill(clock):
+    limiter = rate_limiter.TokenBucketLimiter(requests_per_s=2)
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.5, 0.5]  # no initial burst, then one every 1/rate s
+    clock.sleep(10)
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.5]  # idle time refills up to one second's worth
+
+def test_tokens_per_minute_refill_and_usage_correction(clock):
+    limiter = rate_limiter.TokenBucketLimiter(requests_per_s=100, tokens_per_min=600)  # 10 tokens/s
+    clock.sleep(1)  # fill the request bucket so only tokens are limiting
+    assert limiter.acquire(500) == 0.0
+    assert limiter.acquire(100) == 0.0
+    assert limiter.acquire(50) == pytest.approx(5.0)
+    clock.sleep(60)
+    assert limiter.acquire(100) == 0.0
+    limiter.record_usage(100, 400)  # the response used 300 more than estimated
+    assert limiter.acquire(500) == pytest.approx(30.0)
+    limiter.record_usage(500, None)  # no usage reported: the estimate stands
+    assert limiter.acquire(10) == pytest.approx(1.0)
+
+def test_rate_limits_pause_everyone_and_slow_down(clock):
+    limiter = rate_limiter.TokenBucketLimiter(requests_per_s=8)
+    limiter.acquire()
+    assert limiter.on_rate_limited(retry_after=3.0) == 3.0
+    assert limiter.rate == 4.0
+    assert limiter.acquire() == pytest.approx(3.25)  # retry-after, then one request at the halved rate
+    assert [limiter.on_rate_limited() for _ in range(3)] == [4.0, 8.0, 16.0]  # no header: exponential backoff
+    assert limiter.rate == 1.0  # min_rate_ratio floor
+    assert limiter.stats["rate_limited"] == 4
+
+    for _ in range(5):
+        limiter.on_success()
+    assert limiter.rate == pytest.approx(3.0)  # additive recovery, 5% of max per success
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 8.0
+    assert limiter.on_rate_limited() == 2.0  # successes reset the backoff
+
+def test_rejects_a_rate_that_would_stall(clock):
+    with pytest.raises(ValueError, match="CORPUS_LLM_REQUESTS_PER_S"):
+        rate_limiter.TokenBucketLimiter(requests_per_s=0)
+    with pytest.raises(ValueError, match="CORPUS_LLM_TOKENS_PER_MIN"):
+        rate_limiter.TokenBucketLimiter(requests_per_s=1, tokens_per_min=-1)
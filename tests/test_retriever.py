@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from app.services import retriever
+from app.services.retriever import SOURCE_TYPES, merge_search_results, search_split, search_unified, search_vectors
+from tests.conftest import unit_vectors
+
+WEIGHTS = [2.0, 1.0, 1.0]
+
+
+def queries(seed: int = 1) -> np.ndarray:
+    return unit_vectors(3, 16, seed)
+
+def company_ranking(results) -> list:
+    companies, uniqueness = results
+    return [(c["company_id"], c["match_percent"], [(m["type"], m["match_meta"]["id"], m["score"]) for m in c["matches"]])
+            for c in companies], uniqueness
+
+def hits_by_type(searches) -> dict:
+    """entry type -> per-query row lists in distance order, for split (one code per search) or unified (per hit) results."""
+    hits = {}
+    for _, rows, codes in searches:
+        codes = np.broadcast_to(np.asarray(codes), rows.shape)
+        for code in np.unique(codes[rows >= 0]).tolist():
+            per_query = [row[(row >= 0) & (code_row == code)].tolist() for row, code_row in zip(rows, codes)]
+            hits[SOURCE_TYPES[code]] = [a + b for a, b in zip(hits.get(SOURCE_TYPES[code], [[]] * len(rows)), per_query)]
+    return hits
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"entry_types": ["comment"]},
+    {"type_quotas": {"comment": 2}},
+    {"company_ids": ["ph_3", "ph_7", "ph_11"]},
+])
+def test_unified_hits_are_the_nearest_of_each_split_search(generation, filters, monkeypatch):
+    calls = []
+    search_index = retriever.search_index
+    monkeypatch.setattr(retriever, "search_index", lambda *args, **kwargs: calls.append(args[2]) or search_index(*args, **kwargs))
+
+    split = hits_by_type(search_split(queries(), 10, filters.get("entry_types", list(SOURCE_TYPES)), generation=generation,
+                                      **{k: v for k, v in filters.items() if k != "entry_types"}))
+    calls.clear()
+    unified = hits_by_type(search_unified(queries(), 10, filters.get("entry_types", list(SOURCE_TYPES)), generation=generation,
+                                          **{k: v for k, v in filters.items() if k != "entry_types"}))
+    budgets = {t: min(10, filters.get("type_quotas", {}).get(t, 10)) for t in filters.get("entry_types", SOURCE_TYPES)}
+    assert calls == [sum(budgets.values())]  # one search for every type
+    assert unified and set(unified) <= set(split)
+    for entry_type, per_query in unified.items():
+        for unified_rows, split_rows in zip(per_query, split[entry_type]):
+            assert len(unified_rows) <= budgets[entry_type]
+            assert unified_rows == split_rows[:len(unified_rows)]
+
+def test_layouts_agree_when_types_are_searched_alone(generation):
+    for entry_type in SOURCE_TYPES:
+        split = search_vectors(queries(), WEIGHTS, 5, entry_types=[entry_type], layout="split", overfetch="fixed", generation=generation)
+        unified = search_vectors(queries(), WEIGHTS, 5, entry_types=[entry_type], layout="unified", overfetch="fixed", generation=generation)
+        assert company_ranking(split) == company_ranking(unified)
+
+def test_type_quotas_cap_hits_per_type_per_query(generation):
+    per_type = {t: list(map(len, rows)) for t, rows in
+                hits_by_type(search_split(queries(), 10, list(SOURCE_TYPES), type_quotas={"comment": 2}, generation=generation)).items()}
+    assert per_type == {"description": [10, 10, 10], "comment": [2, 2, 2]}
+    unified = hits_by_type(search_unified(queries(), 10, list(SOURCE_TYPES), type_quotas={"comment": 2}, generation=generation))
+    assert all(len(rows) <= 2 for rows in unified.get("comment", []))
+    assert all(len(rows) <= 10 for rows in unified["description"])
+
+@pytest.mark.parametrize("search", [search_split, search_unified])
+def test_company_filter_only_returns_those_companies(generation, search):
+    store = generation.meta_store()
+    hits = hits_by_type(search(queries(), 10, list(SOURCE_TYPES), company_ids=["ph_3", "ph_7"], generation=generation))
+    assert hits
+    for entry_type, per_query in hits.items():
+        docs = store.get_rows(entry_type, sorted({row for rows in per_query for row in rows}), ["company_id"])
+        assert {doc["company_id"] for doc in docs} <= {"ph_3", "ph_7"}
+
+def test_query_weights_scale_the_ranking_scores():
+    rows = np.array([[0], [1]], dtype=np.int64)
+    scores = np.array([[0.6], [0.4]], dtype=np.float32)
+    indices, merged, sources = merge_search_results([(scores, rows, 0)], np.asarray([2.0, 1.0], dtype=np.float32))
+    # the raw query's hit is further away but counts at half its distance
+    assert indices.tolist() == [0, 1] and merged.tolist() == pytest.approx([0.3, 0.4]) and sources.tolist() == [0, 0]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from app.llm.evaluator import score_companies
+from app.services.retriever import dedupe_by_company
+from scripts.bench.bench_dedupe import legacy_calculate_uniqueness, legacy_dedupe_by_company, make_candidates, make_store
+
+
+def legacy_scores(scores, companies, n_companies):
+    """The per-company loops score_companies replaced, on the same flat arrays."""
+    groups = [{"matches": [{"score": s} for s, c in zip(scores, companies) if c == position]} for position in range(n_companies)]
+    for group in groups:
+        group["min_score"] = min(match["score"] for match in group["matches"])
+    l2_min, l2_max = min(scores), max(scores)
+    match_percent = []
+    for group in groups:
+        avg_l2 = sum(m["score"] for m in group["matches"]) / len(group["matches"])
+        normalized = (avg_l2 - l2_min) / (l2_max - l2_min) if l2_max != l2_min else 0.0
+        match_percent.append(round(1.0 - normalized, 4))
+    uniqueness = legacy_calculate_uniqueness(groups, n_companies)  # sets avg_score
+    return [g["avg_score"] for g in groups], [g["min_score"] for g in groups], match_percent, uniqueness
+
+@pytest.mark.parametrize("seed", range(5))
+def test_score_companies_is_bit_identical_to_the_loops(seed):
+    rng = np.random.default_rng(seed)
+    n_companies = int(rng.integers(1, 30))
+    companies = np.concatenate([np.arange(n_companies), rng.integers(0, n_companies, 200)])  # every company has a match
+    rng.shuffle(companies)
+    scores = (rng.random(len(companies)) * 2).astype(np.float32).astype(np.float64).tolist()
+
+    result = score_companies(np.asarray(scores), companies, n_companies)
+    avg_score, min_score, match_percent, uniqueness = legacy_scores(scores, companies.tolist(), n_companies)
+    assert result["avg_score"].tolist() == avg_score
+    assert result["min_score"].tolist() == min_score
+    assert result["match_percent"].tolist() == match_percent
+    assert result["uniqueness"] == uniqueness
+
+def test_equal_scores_and_no_companies():
+    result = score_companies(np.full(4, 0.5), np.array([0, 1, 0, 1]), 2)
+    assert result["match_percent"].tolist() == [1.0, 1.0]
+    assert result["uniqueness"] == legacy_scores([0.5] * 4, [0, 1, 0, 1], 2)[3]
+    assert score_companies(np.empty(0), np.empty(0), 0)["uniqueness"] == 100
+
+@pytest.mark.parametrize("top_k, expansions", [(5, 2), (50, 10), (200, 30)])
+def test_dedupe_by_company_matches_the_legacy_grouping(top_k, expansions):
+    rng = np.random.default_rng(top_k)
+    store = make_store(500, 5000, 3, rng)
+    candidates = make_candidates(store, expansions + 1, top_k * 2, rng)
+    assert dedupe_by_company(candidates, store, top_k) == legacy_dedupe_by_company(candidates, store, top_k)
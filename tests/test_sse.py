@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app.core.concurrency import ConcurrencyLimiter
+from app.utils.sse import SSEResponse
+
+
+async def disconnected():
+    return {"type": "http.disconnect"}
+
+async def gone(message):
+    raise OSError("client went away")
+
+def scope(spec_version: str) -> dict:
+    return {"type": "http", "asgi": {"spec_version": spec_version}}
+
+@pytest.mark.parametrize("spec_version, send", [("2.0", None), ("2.4", gone)])
+def test_slot_is_released_when_the_client_leaves_before_the_stream_starts(spec_version, send):
+    async def events():
+        yield "event: results\ndata: {}\n\n"
+
+    async def request():
+        limiter = ConcurrencyLimiter("analyze", max_concurrent=1, max_waiting=0)
+        release = await limiter.hold()
+        response = SSEResponse(events(), on_close=release)
+
+        async def ignore(message):
+            pass
+
+        try:
+            await response(scope(spec_version), disconnected, send or ignore)
+        except Exception:
+            pass  # ClientDisconnect
+        return limiter.stats()
+
+    assert asyncio.run(request())["in_flight"] == 0
+
+def test_held_slot_releases_once():
+    async def request():
+        limiter = ConcurrencyLimiter("query", max_concurrent=1, max_waiting=0)
+        release = await limiter.hold()
+        release()
+        release()  # the body and the response both release
+        await limiter.hold()
+        return limiter.stats()
+
+    assert asyncio.run(request())["in_flight"] == 1
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.services import retriever
+
+
+@pytest.fixture
+def fresh_warmup(monkeypatch):
+    monkeypatch.setattr(retriever, "warmup_state", {"started_at": None, "finished_at": None, "warmup_s": None, "error": None, "attempts": 0})
+    monkeypatch.setattr(retriever, "live_generation", lambda: None)
+    monkeypatch.setattr(main, "GENERATION_WATCH_INTERVAL", 0)
+
+def failing_warm_up(failures: int):
+    """warm_up stand-in: raises (recorded like warm_up does) for the first failures attempts."""
+    def warm_up():
+        state = retriever.warmup_state
+        state.update(started_at=time.time(), finished_at=time.time(), attempts=state["attempts"] + 1,
+                     error="FileNotFoundError: no published generation" if state["attempts"] < failures else None)
+        return retriever.readiness()
+    return warm_up
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+@pytest.mark.parametrize("mode", ["background", "blocking"])
+def test_failed_warm_up_is_reported_and_retried(fresh_warmup, monkeypatch, mode):
+    monkeypatch.setattr(main, "WARMUP_MODE", mode)
+    monkeypatch.setattr(retriever, "warm_up", failing_warm_up(failures=2))
+    monkeypatch.setattr(main, "warm_up", retriever.warm_up)
+    monkeypatch.setattr(retriever, "WARMUP_RETRY_S", 0.5)
+
+    with TestClient(main.app) as client:
+        assert wait_for(lambda: retriever.warmup_state["attempts"] >= 1 and retriever.warmup_state["error"])
+        response = client.get("/api/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "failed"
+        assert response.json()["warmup"]["error"] == "FileNotFoundError: no published generation"
+        assert wait_for(lambda: retriever.warmup_state["attempts"] == 3 and retriever.warmup_state["error"] is None)
+
+def test_off_mode_starts_cold(fresh_warmup, monkeypatch):
+    monkeypatch.setattr(main, "WARMUP_MODE", "off")
+    with TestClient(main.app) as client:
+        response = client.get("/api/ready")
+    assert (response.status_code, response.json()["status"], response.json()["warmup"]["attempts"]) == (503, "cold", 0)
+
+def test_importing_the_app_creates_no_files_and_loads_no_models(tmp_path):
+    script = (
+        "import os, sys\n"
+        "from app.main import app\n"
+        "import app.llm.expander, app.llm.evaluator\n"
+        "assert os.listdir('.') == [], os.listdir('.')\n"
+        "assert not {'sentence_transformers', 'together'} & set(sys.modules)\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE="1")
+    env.pop("EXPANSION_CACHE_DB", None)  # the default, relative .cache/ path
+    proc = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr